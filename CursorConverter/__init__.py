@@ -2,3 +2,7 @@
 # -*- coding: utf-8 -*-
 
 __version__ = "1.0.0"
+
+from CursorConverter.converter import ConversionError, convert_theme  # noqa: E402
+
+__all__ = ["ConversionError", "convert_theme"]
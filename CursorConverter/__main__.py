@@ -4,94 +4,26 @@
 import argparse
 import json
 import logging
-import os
-from io import BytesIO
-from multiprocessing.pool import Pool
+import sys
 from pathlib import Path
-from string import Template
-from typing import Any, Dict, List, Tuple
-
-from cursorgen.parser import open_blob
-from cursorgen.writer import to_x11
-from PIL import Image
-
-vcs_path = Path(__file__).parents[1]
-root_path = os.path.dirname(__file__)
-
-
-def rename_files(
-    files_to_rename: List[Path], destination: Path, rename_map: Dict[str, List[str]]
-) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[str]]:
-    old_path = []
-    new_path = []
-    unmatched_files = []
-
-    dist_dir = destination / "src"
-
-    for file_path in files_to_rename:
-        name, extension = os.path.splitext(file_path.name)
-        matched = False
-
-        for en, value in rename_map.items():
-            for jp in value:
-                if jp in name:
-                    matched = True
-                    old_name = f"{jp}{extension}"
-                    old_file_path = str(file_path.parent / file_path.name)
-                    old_path.append((old_name, old_file_path))
-
-                    new_name = f"{en}{extension}"
-                    new_file_path = str(dist_dir / new_name)
-                    new_path.append((new_name, new_file_path))
-
-                    break
-
-            if matched:
-                break
-
-        if not matched:
-            unmatched_files.append(file_path.name)
-
-    return old_path, new_path, unmatched_files
-
-
-def generate_standard_xcursors(output: Path, rename_map: dict[str, list[str]]) -> dict[str, list[str]]:
-    """Copy non standardized files to xcursors files with standardized names."""
-    mapping = {}
-    for key, value in rename_map.items():
-        new_path = [os.path.join(output, "cursors", os.path.basename(new_name)) for new_name in value]
-        mapping[key] = new_path
-    return mapping
-
-
-def list_files(directory: Path, file_format: str, recursive: bool = False) -> list:  # type: ignore
-    matched_files = []
-    file_format = f".{file_format}" if not file_format.startswith(".") else file_format
-
-    if recursive:
-        for root, _, filenames in os.walk(directory):
-            for filename in filenames:
-                if filename.endswith(file_format):
-                    matched_files.append(Path(root) / filename)
-    else:
-        for file in directory.iterdir():
-            if file.is_file() and file.name.endswith(file_format):
-                matched_files.append(file)
-
-    return matched_files
-
-
-def load_rename_map(json_file: Path) -> Any:
-    try:
-        with open(json_file, "r", encoding="utf-8") as file:
-            rename_map = json.load(file)
-        return rename_map
-    except FileNotFoundError:
-        print(f"'{json_file}' not found.")
-        exit(1)
-    except json.JSONDecodeError:
-        print(f"'{json_file}' contains invalid JSON.")
-        exit(1)
+from typing import Any
+
+from CursorConverter.cache import DEFAULT_CACHE_SIZE, ConversionCache, default_cache_dir
+from CursorConverter.check import check_tree, duplicate_tree
+from CursorConverter.converter import (
+    BACKENDS,
+    SIZE_PROFILES,
+    ConversionError,
+    convert_theme,
+    create_pool,
+    parse_sizes,
+    plan_theme,
+    root_path,
+    vcs_path,
+)
+from CursorConverter.metrics import BuildReport, profiling
+from CursorConverter.preview import ANIMATION_FORMATS
+from CursorConverter.theme import LINK_MODES
 
 
 def load_help_menu(json_file: str = f"{root_path}/config/menu.json") -> Any:
@@ -100,27 +32,6 @@ def load_help_menu(json_file: str = f"{root_path}/config/menu.json") -> Any:
     return help_menu
 
 
-def process(arg: Tuple[BytesIO, str, Path, Dict[str, List[str]], List[int]]) -> None:
-    stream, name, output, mapping, sizes = arg
-    blob = stream.getvalue()
-
-    cursors = open_blob(blob)
-    result = to_x11(frames=cursors.frames, sizes=sizes)
-
-    if name in mapping:
-        for xcursor_name in mapping[name]:
-            final = os.path.join(output, "cursors", xcursor_name)
-            with open(final, "wb") as fs:
-                fs.write(result)
-
-    if name == "idle":
-        frame = cursors.frames[0]
-        cursor = frame[0]
-        png = cursor.image
-        png = png.resize((320, 320), Image.Resampling.NEAREST)
-        png.save(f"{output}/thumb.png", "PNG")
-
-
 def main() -> None:
     help_menu = load_help_menu()
 
@@ -197,69 +108,157 @@ def main() -> None:
         "-j",
         "--jobs",
         type=int,
-        default=1,
-        help="amount of jobs",
+        default=None,
+        help="amount of jobs, defaults to the CPUs available to this process",
+    )
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        metavar="profile",
+        default="standard",
+        help=f"Cursor sizes to generate, a profile ({', '.join(SIZE_PROFILES)}) or a list like 24,32,48",
+    )
+    parser.add_argument(
+        "--backend",
+        type=str,
+        choices=BACKENDS,
+        default="xcursor",
+        help="Write an xcursor theme, a hyprcursor theme or both in one theme, default is xcursor",
+    )
+    parser.add_argument(
+        "--link-mode",
+        type=str,
+        choices=LINK_MODES,
+        default="symlink",
+        help="Write cursor aliases as symlinks, hardlinks or plain copies, default is symlink",
+    )
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        required=False,
+        metavar="dir",
+        default=default_cache_dir(),
+        help="Directory of the conversion cache",
+    )
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        required=False,
+        metavar="MiB",
+        default=DEFAULT_CACHE_SIZE // 1024**2,
+        help="Maximum size of the conversion cache in MiB, least recently used entries are evicted",
+    )
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Convert every file again without reading or writing the conversion cache",
+    )
+    parser.add_argument(
+        "--preview-sheet",
+        action="store_true",
+        help="Also write sheet.png, the first image of every cursor side by side",
+    )
+    parser.add_argument(
+        "--preview-animation",
+        type=str,
+        choices=list(ANIMATION_FORMATS),
+        default=None,
+        help="Also write an animated preview of the thumbnail cursor in this format",
+    )
+    parser.add_argument(
+        "--report",
+        type=Path,
+        required=False,
+        metavar="file",
+        help="Write the time, bytes and peak memory of every stage, as CSV for a .csv file and JSON otherwise",
+    )
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        required=False,
+        metavar="file",
+        help="Profile the conversion and every worker with cProfile into one pstats file",
+    )
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only print which file becomes which cursor, nothing is converted or written",
+    )
+    parser.add_argument(
+        "--check",
+        action="store_true",
+        help="Only inspect the headers of every cursor below the prefix, exits with 1 if any file is broken",
+    )
+    parser.add_argument(
+        "--duplicates",
+        action="store_true",
+        help="Only report how many frames of the cursors below the prefix appear in several files and themes",
     )
 
     args = parser.parse_args()
     logging.basicConfig(level=logging.INFO)
-    rename_map = load_rename_map(args.json)
-    rename_xmc = load_rename_map(Path(f"{root_path}/config/definitions.json"))
-    files_to_rename = list_files(args.prefix, args.format, args.recursive)
-
-    japanese_name, english_name, unmatched_files = rename_files(files_to_rename, args.output, rename_map)
-    new = [x[0] for x in english_name]
-
-    if args.name and args.output == args.output:
-        args.output = Path(args.output / args.name)
-        os.makedirs(args.output, exist_ok=True)
-        os.makedirs(f"{args.output}/cursors", exist_ok=True)
-
-    if args.comment and args.name:
-        template: Dict[str, Template] = {
-            "index.theme": Template('[Icon Theme]\nName="$theme_name"\nComment="$comment"\n'),
-        }
-        for file_name, string_template in template.items():
-            data = string_template.safe_substitute(theme_name=args.name, comment=args.comment)
-            fp: Path = args.output / file_name
-            fp.write_text(data)
-
-    if not files_to_rename:
-        print("No files matched the criteria for processing.")
+    cache = None if args.no_cache else ConversionCache(args.cache_dir, args.cache_size * 1024**2)
+
+    if args.check:
+        reports = check_tree(args.prefix, args.json)
+        for check_report in reports:
+            print("\n".join(check_report.describe()))
+        files = sum(len(check_report.headers) for check_report in reports)
+        broken = sum(len(check_report.broken) for check_report in reports)
+        incomplete = sum(
+            1 for check_report in reports if check_report.plan.missing_roles or check_report.plan.unmatched_files
+        )
+        print(
+            f"Checked {files} files in {len(reports)} directories: "
+            f"{broken} broken, {incomplete} directories with missing roles or unmatched files"
+        )
+        sys.exit(1 if broken else 0)
+
+    if args.plan:
+        print("\n".join(plan_theme(args.prefix, args.format, args.recursive, args.json).describe()))
         return
 
-    if unmatched_files:
-        print("Unmatched files: " + ", ".join(unmatched_files))
-        with open("unmatched.json", "w", encoding="utf-8") as file:
-            json.dump(sorted(unmatched_files), file, ensure_ascii=False, indent=1)
+    if args.duplicates:
+        with create_pool(args.jobs, args.sizes, cache) as pool:
+            print("\n".join(duplicate_tree(args.prefix, pool).describe()))
         return
-    if len(new) < 15:
-        print("Error: check definitions_jp if files match renaming scheme")
-
-    else:
-        files_to_process = []
-        for old_name, new_name in zip(japanese_name, english_name):
-            with open(old_name[1], "rb") as file:
-                stream = BytesIO(file.read())
 
-                name: str = os.path.splitext(os.path.basename(new_name[1]))[0]
-                mapping = generate_standard_xcursors(args.output, rename_xmc)
-                files_to_process.append((stream, name))
-
-        arg = [
-            (
-                stream,
-                name,
-                args.output,
-                mapping,
-                # Make compatible with every possible DE
-                # maybe except hyprland because of new cursor protocol
-                [12, 18, 24, 30, 32, 36, 42, 48, 64],
+    build_report = BuildReport()
+    try:
+        # One task per cursor file, more workers would sit idle
+        tasks = len(plan_theme(args.prefix, args.format, args.recursive, args.json).tasks)
+        with profiling(args.profile) as profile_dir, create_pool(
+            args.jobs, args.sizes, cache, profile_dir, tasks, backend=args.backend
+        ) as pool:
+            convert_theme(
+                prefix=args.prefix,
+                output=args.output,
+                name=args.name,
+                comment=args.comment,
+                file_format=args.format,
+                recursive=args.recursive,
+                json_file=args.json,
+                jobs=args.jobs,
+                cache=cache,
+                link_mode=args.link_mode,
+                sizes=args.sizes,
+                preview_sheet=args.preview_sheet,
+                preview_animation=args.preview_animation,
+                pool=pool,
+                metrics=build_report.character(str(args.prefix), args.name),
+                backend=args.backend,
             )
-            for stream, name in files_to_process
-        ]
-        with Pool(args.jobs) as pool:
-            pool.map(process, arg)
+        build_report.finish()
+        if args.report is not None:
+            build_report.save(args.report)
+    except ConversionError as e:
+        print(e)
+        if e.unmatched_files:
+            with open("unmatched.json", "w", encoding="utf-8") as file:
+                json.dump(sorted(e.unmatched_files), file, ensure_ascii=False, indent=1)
+    finally:
+        if cache is not None:
+            cache.prune()
 
 
 if __name__ == "__main__":
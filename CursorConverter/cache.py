@@ -0,0 +1,139 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import os
+import shutil
+import tempfile
+import zlib
+from functools import lru_cache
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+import PIL
+
+from CursorConverter import __version__
+
+# Bump whenever the bytes produced for the same input change
+CACHE_FORMAT = 3
+
+DEFAULT_CACHE_SIZE = 4 * 1024**3
+
+# Directory of the frame store inside the cache, see ``framestore.FrameStore``
+FRAMES_DIR = "frames"
+
+
+def default_cache_dir() -> Path:
+    xdg_cache = os.environ.get("XDG_CACHE_HOME") or os.path.join(os.path.expanduser("~"), ".cache")
+    return Path(xdg_cache) / "anime-cursors"
+
+
+@lru_cache(maxsize=None)
+def toolchain_version() -> str:
+    """Everything besides the input itself that can change the generated cursors."""
+    try:
+        from importlib.metadata import PackageNotFoundError, version
+
+        try:
+            cursorgen_version = version("cursorgen")
+        except PackageNotFoundError:
+            cursorgen_version = "unknown"
+    except ImportError:
+        cursorgen_version = "unknown"
+    return f"format={CACHE_FORMAT};anime-cursors={__version__};cursorgen={cursorgen_version};pillow={PIL.__version__}"
+
+
+class ConversionCache:
+    """Content-addressed on-disk cache of converted cursors with LRU eviction.
+
+    Entries are zlib compressed and stored under ``directory/<key[:2]>/<key>.<kind>``, xcursor images
+    are stored per size so a new size profile only renders the sizes that are missing. A hit bumps the
+    entry mtime, and ``prune`` drops the least recently used entries until the cache fits ``max_bytes``.
+    The frame store in ``frames_dir`` counts as one entry.
+    """
+
+    def __init__(self, directory: Optional[Path] = None, max_bytes: int = DEFAULT_CACHE_SIZE) -> None:
+        self.directory = Path(directory) if directory is not None else default_cache_dir()
+        self.max_bytes = max_bytes
+
+    @staticmethod
+    def key(blob: bytes) -> str:
+        digest = hashlib.sha256()
+        digest.update(toolchain_version().encode())
+        digest.update(b"\0")
+        digest.update(blob)
+        return digest.hexdigest()
+
+    @property
+    def frames_dir(self) -> Path:
+        return self.directory / FRAMES_DIR
+
+    def _path(self, key: str, kind: str) -> Path:
+        return self.directory / key[:2] / f"{key}.{kind}"
+
+    def get(self, key: str, kind: str = "xcur") -> Optional[bytes]:
+        path = self._path(key, kind)
+        try:
+            data = zlib.decompress(path.read_bytes())
+        except (FileNotFoundError, zlib.error):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return data
+
+    def put(self, key: str, data: bytes, kind: str = "xcur") -> None:
+        path = self._path(key, kind)
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Workers may race on the same key, write to a temporary file and swap it in atomically
+        fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=".tmp-")
+        try:
+            with os.fdopen(fd, "wb") as file:
+                file.write(zlib.compress(data, 1))
+            os.replace(tmp_name, path)
+        except BaseException:
+            try:
+                os.unlink(tmp_name)
+            except FileNotFoundError:
+                pass
+            raise
+
+    def prune(self) -> int:
+        """Evict least recently used entries until the cache fits, returns the number of bytes freed."""
+        if not self.directory.is_dir():
+            return 0
+
+        entries: List[Tuple[float, int, str]] = []
+        total = 0
+        for bucket in os.scandir(self.directory):
+            if not bucket.is_dir():
+                continue
+            if bucket.name == FRAMES_DIR:
+                # Its files only make sense together, it is used or dropped as a whole
+                stats = [entry.stat() for entry in os.scandir(bucket.path)]
+                if stats:
+                    size = sum(stat.st_size for stat in stats)
+                    entries.append((max(stat.st_mtime for stat in stats), size, bucket.path))
+                    total += size
+                continue
+            for entry in os.scandir(bucket.path):
+                if entry.name.startswith(".tmp-"):
+                    continue
+                stat = entry.stat()
+                entries.append((stat.st_mtime, stat.st_size, entry.path))
+                total += stat.st_size
+
+        freed = 0
+        for _, size, path in sorted(entries):
+            if total - freed <= self.max_bytes:
+                break
+            try:
+                if os.path.isdir(path):
+                    shutil.rmtree(path)
+                else:
+                    os.unlink(path)
+            except FileNotFoundError:
+                continue
+            freed += size
+        return freed
@@ -0,0 +1,119 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from CursorConverter.manifest import file_digest, write_atomic
+
+CATALOG_NAME = "asset_index.json"
+CATALOG_VERSION = 1
+
+CURSOR_EXTENSIONS = (".ani", ".cur")
+
+
+def is_cursor_file(name: str, file_format: Optional[str] = None) -> bool:
+    """Whether ``name`` is a cursor, of ``file_format`` ("ani" or "cur") if given, in any case of its extension."""
+    if file_format is None:
+        return name.lower().endswith(CURSOR_EXTENSIONS)
+    return name.lower().endswith(f".{file_format.lower().lstrip('.')}")
+
+
+class AssetRecord(NamedTuple):
+    size: int
+    mtime_ns: int
+    sha256: str
+
+
+class ScanStats(NamedTuple):
+    files: int
+    hashed: int
+    reused: int
+    removed: int
+
+
+class AssetCatalog:
+    """Index of every cursor file below ``root``, per directory relative to ``root``.
+
+    ``scan`` walks the tree once with ``os.scandir`` and only hashes files whose size or mtime
+    differ from the previous catalog, so re-indexing after a small change reads almost nothing.
+    """
+
+    def __init__(self, root: Path, directories: Optional[Dict[str, Dict[str, AssetRecord]]] = None) -> None:
+        self.root = Path(root)
+        self.directories: Dict[str, Dict[str, AssetRecord]] = directories or {}
+
+    @classmethod
+    def load(cls, path: Path, root: Path) -> "AssetCatalog":
+        """Load the catalog at ``path``, an unreadable catalog or one of another root starts empty."""
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(root)
+        if data.get("version") != CATALOG_VERSION or data.get("root") != str(Path(root).resolve()):
+            return cls(root)
+        return cls(
+            root,
+            {
+                directory: {name: AssetRecord(*record) for name, record in files.items()}
+                for directory, files in data["directories"].items()
+            },
+        )
+
+    def save(self, path: Path) -> None:
+        data = {
+            "version": CATALOG_VERSION,
+            "root": str(self.root.resolve()),
+            "directories": {
+                directory: {name: list(record) for name, record in sorted(files.items())}
+                for directory, files in sorted(self.directories.items())
+            },
+        }
+        Path(path).parent.mkdir(parents=True, exist_ok=True)
+        write_atomic(Path(path), json.dumps(data, ensure_ascii=False, indent=1).encode())
+
+    @classmethod
+    def scan(cls, root: Path, previous: Optional["AssetCatalog"] = None) -> Tuple["AssetCatalog", ScanStats]:
+        known = previous.directories if previous is not None else {}
+        directories: Dict[str, Dict[str, AssetRecord]] = {}
+        hashed = reused = 0
+
+        pending = [Path(root)]
+        while pending:
+            directory = pending.pop()
+            relative = directory.relative_to(root).as_posix()
+            files: Dict[str, AssetRecord] = {}
+            with os.scandir(directory) as entries:
+                for entry in entries:
+                    if entry.is_dir(follow_symlinks=False):
+                        pending.append(Path(entry.path))
+                        continue
+                    if not is_cursor_file(entry.name) or not entry.is_file():
+                        continue
+
+                    stat = entry.stat()
+                    record = known.get(relative, {}).get(entry.name)
+                    if record is not None and record.size == stat.st_size and record.mtime_ns == stat.st_mtime_ns:
+                        reused += 1
+                    else:
+                        record = AssetRecord(stat.st_size, stat.st_mtime_ns, file_digest(Path(entry.path)))
+                        hashed += 1
+                    files[entry.name] = record
+            if files:
+                directories[relative] = files
+
+        total = sum(len(files) for files in directories.values())
+        removed = sum(
+            1 for directory, files in known.items() for name in files if name not in directories.get(directory, {})
+        )
+        return cls(root, directories), ScanStats(total, hashed, reused, removed)
+
+    def cursor_directories(self) -> List[str]:
+        return sorted(self.directories)
+
+    def files(self, directory: str, extension: Optional[str] = None) -> List[str]:
+        names = self.directories.get(directory, {})
+        return sorted(name for name in names if is_cursor_file(name, extension))
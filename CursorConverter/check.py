@@ -0,0 +1,249 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import mmap
+import os
+import struct
+from multiprocessing.pool import Pool
+from pathlib import Path
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from CursorConverter.catalog import is_cursor_file
+from CursorConverter.converter import (
+    DEFINITIONS_JP_JSON,
+    MIN_MATCHED_FILES,
+    BuildPlan,
+    frame_usage,
+    plan_theme,
+)
+from CursorConverter.framestore import DuplicateReport, FrameUsage
+
+RIFF_HEADER = struct.Struct("<4sI4s")
+CHUNK_HEADER = struct.Struct("<4sI")
+ANIH_HEADER = struct.Struct("<IIIIIIIII")
+ICON_DIR = struct.Struct("<HHH")
+ICON_DIR_ENTRY = struct.Struct("<BBBBHHII")
+
+ICON_FLAG = 0x1
+
+
+class CursorHeader(NamedTuple):
+    """What the headers of one .ani/.cur file say, ``errors`` lists why a full decode would fail."""
+
+    path: Path
+    frames: int = 0
+    steps: int = 0
+    sizes: Tuple[Tuple[int, int], ...] = ()
+    # (min x, min y, max x, max y) over every image
+    hotspots: Optional[Tuple[int, int, int, int]] = None
+    # Display rates in jiffies, 1/60 s
+    rates: Tuple[int, ...] = ()
+    errors: Tuple[str, ...] = ()
+
+
+class DirectoryReport(NamedTuple):
+    directory: Path
+    plan: BuildPlan
+    headers: List[CursorHeader]
+
+    @property
+    def broken(self) -> List[CursorHeader]:
+        return [header for header in self.headers if header.errors]
+
+    def describe(self) -> List[str]:
+        plan = self.plan
+        covered = len(plan.mapping) - len(plan.missing_roles)
+        frames = [header.frames for header in self.headers if not header.errors]
+        rates = sorted({rate for header in self.headers for rate in header.rates})
+        sizes = sorted({size for header in self.headers for size in header.sizes})
+        lines = [
+            f"{self.directory} ({plan.file_format}): {len(self.headers)} files, {covered}/{len(plan.mapping)} roles"
+            + (f", {min(frames)}-{max(frames)} frames" if frames else "")
+            + (f", {'/'.join(f'{width}x{height}' for width, height in sizes)}" if sizes else "")
+            + (f", rates {rates[0]}-{rates[-1]} jiffies" if rates else "")
+        ]
+        for header in self.broken:
+            lines.append(f"  broken {header.path.name}: {'; '.join(header.errors)}")
+        if plan.matched_files < MIN_MATCHED_FILES:
+            lines.append(
+                f"  only {plan.matched_files} files match a cursor role, at least {MIN_MATCHED_FILES} are needed"
+            )
+        for role in plan.missing_roles:
+            lines.append(f"  missing {role}")
+        for role, paths in plan.duplicates.items():
+            lines.append(f"  duplicate {role}: {', '.join(path.name for path in paths)}")
+        for name in plan.unmatched_files:
+            lines.append(f"  unmatched: {name}")
+        return lines
+
+
+def _icon_entries(buf: "mmap.mmap | bytes", start: int, end: int) -> List[Tuple[int, int, int, int]]:
+    """(width, height, x hotspot, y hotspot) of every image of the ICO/CUR data in ``buf[start:end]``."""
+    if end - start < ICON_DIR.size:
+        raise ValueError("truncated cursor directory")
+    reserved, ico_type, count = ICON_DIR.unpack_from(buf, start)
+    if reserved != 0 or ico_type != 2:
+        raise ValueError(f"not a cursor (reserved {reserved}, type {ico_type})")
+    if count == 0:
+        raise ValueError("cursor without images")
+    if start + ICON_DIR.size + count * ICON_DIR_ENTRY.size > end:
+        raise ValueError(f"truncated cursor directory of {count} images")
+
+    entries = []
+    for index in range(count):
+        width, height, _, _, hx, hy, size, offset = ICON_DIR_ENTRY.unpack_from(
+            buf, start + ICON_DIR.size + index * ICON_DIR_ENTRY.size
+        )
+        if start + offset + size > end:
+            raise ValueError(f"image {index} points past the end of the cursor")
+        entries.append((width or 256, height or 256, hx, hy))
+    return entries
+
+
+def _read_chunk(buf: "mmap.mmap | bytes", offset: int, expected: Tuple[bytes, ...]) -> Tuple[bytes, int, int]:
+    # Same walk as cursorgen, unknown chunks are skipped without RIFF padding
+    while True:
+        if offset + CHUNK_HEADER.size > len(buf):
+            raise ValueError(f"expected chunk {b'/'.join(expected).decode()} before the end of the file")
+        name, size = CHUNK_HEADER.unpack_from(buf, offset)
+        offset += CHUNK_HEADER.size
+        if name in expected:
+            return name, size, offset
+        offset += size
+
+
+def _inspect_ani(buf: "mmap.mmap | bytes", path: Path) -> CursorHeader:
+    signature, _, subtype = RIFF_HEADER.unpack_from(buf, 0)
+    if signature != b"RIFF" or subtype != b"ACON":
+        raise ValueError("not a RIFF ACON file")
+
+    _, size, offset = _read_chunk(buf, RIFF_HEADER.size, (b"anih",))
+    if size != ANIH_HEADER.size or offset + size > len(buf):
+        raise ValueError(f"unexpected anih size {size}")
+    header_size, frame_count, step_count, _, _, _, _, display_rate, flags = ANIH_HEADER.unpack_from(buf, offset)
+    if header_size != ANIH_HEADER.size:
+        raise ValueError(f"unexpected size {header_size} in anih")
+    if not flags & ICON_FLAG:
+        raise ValueError("raw bitmap frames are not supported")
+    offset += size
+
+    images: List[Tuple[int, int, int, int]] = []
+    frames = 0
+    order: Optional[List[int]] = None
+    rates = [display_rate]
+    while offset < len(buf):
+        name, size, offset = _read_chunk(buf, offset, (b"LIST", b"seq ", b"rate"))
+        if offset + size > len(buf):
+            raise ValueError(f"chunk {name.decode()} points past the end of the file")
+        if name == b"LIST":
+            if buf[offset : offset + 4] != b"fram":
+                raise ValueError(f"unexpected list {bytes(buf[offset:offset + 4])!r}, expected fram")
+            list_end = offset + size
+            offset += 4
+            for _ in range(frame_count):
+                _, icon_size, offset = _read_chunk(buf, offset, (b"icon",))
+                images += _icon_entries(buf, offset, min(offset + icon_size, len(buf)))
+                frames += 1
+                offset += icon_size + (icon_size & 1)
+            if offset != list_end:
+                raise ValueError(f"frame list ends at {offset}, expected {list_end}")
+        elif name == b"seq ":
+            order = [step for step, in struct.iter_unpack("<I", buf[offset : offset + size])]
+            if len(order) != step_count:
+                raise ValueError(f"sequence of {len(order)} steps, expected {step_count}")
+            offset += size
+        else:
+            rates = [rate for rate, in struct.iter_unpack("<I", buf[offset : offset + size])]
+            if len(rates) != step_count:
+                raise ValueError(f"rate of {len(rates)} steps, expected {step_count}")
+            offset += size
+
+    errors = []
+    if frames != frame_count:
+        errors.append(f"{frames} frames, anih announces {frame_count}")
+    if order is None and frame_count != step_count:
+        errors.append('chunk "seq " is missing')
+    if order is not None and any(step >= frames for step in order):
+        errors.append("sequence refers to missing frames")
+    return _header(path, images, frames, step_count, rates, errors)
+
+
+def _header(
+    path: Path,
+    images: List[Tuple[int, int, int, int]],
+    frames: int,
+    steps: int,
+    rates: List[int],
+    errors: List[str],
+) -> CursorHeader:
+    for width, height, hx, hy in images:
+        if hx >= width or hy >= height:
+            errors.append(f"hotspot {hx},{hy} outside of a {width}x{height} image")
+            break
+    hotspots = None
+    if images:
+        xs = [hx for _, _, hx, _ in images]
+        ys = [hy for _, _, _, hy in images]
+        hotspots = (min(xs), min(ys), max(xs), max(ys))
+    return CursorHeader(
+        path,
+        frames,
+        steps,
+        tuple(sorted({(width, height) for width, height, _, _ in images})),
+        hotspots,
+        tuple(sorted(set(rates))),
+        tuple(errors),
+    )
+
+
+def inspect_cursor(path: Path) -> CursorHeader:
+    """Read the headers and chunk table of a .ani or .cur file without decoding any image."""
+    try:
+        with open(path, "rb") as file:
+            if os.fstat(file.fileno()).st_size == 0:
+                return CursorHeader(path, errors=("empty file",))
+            with mmap.mmap(file.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+                if buf[:4] == b"RIFF":
+                    return _inspect_ani(buf, path)
+                return _header(path, _icon_entries(buf, 0, len(buf)), 1, 1, [], [])
+    except (OSError, ValueError, struct.error) as e:
+        return CursorHeader(path, errors=(str(e),))
+
+
+def cursor_directories(prefix: Path) -> Iterator[Tuple[Path, str, List[str]]]:
+    """(directory, file format, cursor file names) of every directory below ``prefix`` that holds cursors."""
+    for root, dirs, filenames in os.walk(prefix):
+        dirs.sort()
+        by_format = {
+            file_format: [filename for filename in sorted(filenames) if is_cursor_file(filename, file_format)]
+            for file_format in ("ani", "cur")
+        }
+        # A directory is converted from its .ani files if it has any, like process_cursors.py does
+        file_format = "ani" if by_format["ani"] else "cur"
+        if by_format[file_format]:
+            yield Path(root), file_format, by_format[file_format]
+
+
+def check_tree(prefix: Path, json_file: Path = DEFINITIONS_JP_JSON) -> List[DirectoryReport]:
+    """Inspect every directory below ``prefix`` that holds cursors, as the theme it would be converted to."""
+    reports = []
+    for directory, file_format, filenames in cursor_directories(prefix):
+        plan = plan_theme(directory, file_format, json_file=json_file)
+        headers = [inspect_cursor(directory / filename) for filename in filenames]
+        reports.append(DirectoryReport(directory, plan, headers))
+    return reports
+
+
+def duplicate_tree(prefix: Path, pool: Pool) -> DuplicateReport:
+    """Decode every cursor below ``prefix`` that would be converted on ``pool`` and find the frames they share."""
+    paths = [
+        str(directory / filename) for directory, _, filenames in cursor_directories(prefix) for filename in filenames
+    ]
+    files: Dict[Path, List[FrameUsage]] = {}
+    unreadable = []
+    for path, usages in pool.imap_unordered(frame_usage, paths, chunksize=8):
+        if usages is None:
+            unreadable.append(Path(path))
+        else:
+            files[Path(path)] = usages
+    return DuplicateReport(dict(sorted(files.items())), tuple(sorted(unreadable)))
@@ -0,0 +1,689 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cProfile
+import json
+import logging
+import os
+import signal
+from functools import lru_cache, wraps
+from multiprocessing.pool import Pool
+from pathlib import Path
+from string import Template
+from typing import (
+    Any,
+    Callable,
+    Dict,
+    List,
+    NamedTuple,
+    Optional,
+    Sequence,
+    Tuple,
+    TypeVar,
+)
+
+from cursorgen.parser import open_blob
+
+from CursorConverter.cache import ConversionCache
+from CursorConverter.catalog import is_cursor_file
+from CursorConverter.cpus import worker_count
+from CursorConverter.framestore import (
+    FrameStore,
+    FrameUsage,
+    frame_store_available,
+    frame_usages,
+)
+from CursorConverter.hyprcursor import (
+    manifest_hl,
+    shape_path,
+    to_hyprcursor,
+    with_overrides,
+)
+from CursorConverter.matcher import NameMatcher
+from CursorConverter.metrics import Metrics, StageStats
+from CursorConverter.preview import (
+    PREVIEW_VERSION,
+    preview_parts,
+    render_part,
+    theme_previews,
+)
+from CursorConverter.theme import DirectoryThemeWriter, ThemeWriter
+from CursorConverter.xcursor import assemble, encode
+
+logger = logging.getLogger(__name__)
+
+vcs_path = Path(__file__).parents[1]
+root_path = os.path.dirname(__file__)
+
+DEFINITIONS_JSON = Path(f"{root_path}/config/definitions.json")
+DEFINITIONS_JP_JSON = Path(f"{root_path}/config/definitions_jp.json")
+
+# Make compatible with every possible DE
+# maybe except hyprland because of new cursor protocol, it gets hyprcursor themes from --backend
+DEFAULT_SIZES = [12, 18, 24, 30, 32, 36, 42, 48, 64]
+
+# Named size lists for --sizes, anything else is read as a comma separated list
+SIZE_PROFILES: Dict[str, List[int]] = {
+    "standard": DEFAULT_SIZES,
+    "hidpi": DEFAULT_SIZES + [72, 96, 128],
+    "minimal": [24, 32, 48],
+}
+
+# Cursor formats a theme is written in, "both" puts the two side by side in one theme
+BACKENDS = ["xcursor", "hyprcursor", "both"]
+
+# Themes with fewer matched files than this are most likely a renaming scheme mismatch
+MIN_MATCHED_FILES = 15
+
+# Batch builds give up on a file after this many seconds and replace workers after this many tasks,
+# so a hung or leaking decode costs one cursor instead of the build
+DEFAULT_TASK_TIMEOUT = 120.0
+DEFAULT_MAX_TASKS_PER_CHILD = 200
+
+
+# A (cursor file path, role, preview pieces) triple, the role identifies the task within its theme
+# and the pieces are the names of ``preview_parts`` its cursor renders
+ConversionTask = Tuple[str, str, Tuple[str, ...]]
+
+
+class TaskResult(NamedTuple):
+    role: str
+    # The xcursor file and the hyprcursor shape, for the backends the pool writes
+    data: bytes
+    metrics: Metrics
+    # Preview piece name -> content, put together by ``theme_previews`` once the theme is converted
+    previews: Dict[str, bytes]
+    shape: Optional[bytes] = None
+
+
+class WorkerConfig(NamedTuple):
+    """Settings shared by every task of a pool, installed once per worker by ``init_worker``."""
+
+    sizes: List[int]
+    cache: Optional[ConversionCache] = None
+    # Every worker profiles its tasks into a file of its own in this directory, see ``metrics.profiling``
+    profile_dir: Optional[Path] = None
+    # Seconds after which a task raises TimeoutError, see ``deadline``
+    task_timeout: Optional[float] = None
+    backend: str = "xcursor"
+
+
+_worker_config = WorkerConfig(list(DEFAULT_SIZES))
+_worker_profiler: Optional[cProfile.Profile] = None
+_worker_store: Optional[FrameStore] = None
+
+Task = TypeVar("Task")
+Result = TypeVar("Result")
+
+
+def init_worker(config: WorkerConfig) -> None:
+    global _worker_config, _worker_profiler, _worker_store
+    # Ctrl+C reaches the whole process group, the parent terminates the pool
+    signal.signal(signal.SIGINT, signal.SIG_IGN)
+    _worker_config = config
+    _worker_profiler = cProfile.Profile() if config.profile_dir is not None else None
+    # Resized frames are shared by every worker through the frame store of the cache
+    if config.cache is not None and frame_store_available():
+        _worker_store = FrameStore(config.cache.frames_dir)
+
+
+def create_pool(
+    jobs: Optional[int] = None,
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    cache: Optional[ConversionCache] = None,
+    profile_dir: Optional[Path] = None,
+    tasks: Optional[int] = None,
+    task_timeout: Optional[float] = None,
+    max_tasks_per_child: Optional[int] = None,
+    backend: str = "xcursor",
+) -> Pool:
+    """Start a pool whose workers run ``process`` with ``sizes`` and ``cache`` and share its frame store.
+
+    ``process`` converts to the formats of ``backend``, one of ``BACKENDS``, and decodes a file once for both.
+
+    The pool has ``jobs`` workers, by default one per CPU of ``available_cpus``, but no more than ``tasks``
+    if the number of tasks is known, workers without a task would only be forked and torn down again.
+    Tasks fail with TimeoutError after ``task_timeout`` seconds, and with ``max_tasks_per_child`` every
+    worker is replaced by a fresh one after that many tasks, which returns whatever a task leaked.
+    """
+    return Pool(
+        worker_count(jobs, tasks),
+        initializer=init_worker,
+        initargs=(WorkerConfig(list(sizes), cache, profile_dir, task_timeout, backend),),
+        maxtasksperchild=max_tasks_per_child,
+    )
+
+
+class RecyclingPool:
+    """The pool of ``factory``, replaced by a fresh one on ``recycle``.
+
+    A task stuck in C code never sees the SIGALRM of ``deadline``, and a worker that is killed takes its
+    task with it, neither task ever delivers a result. Terminating the workers is the only way to get
+    them back, ``recycle`` does that and starts new ones with the same settings.
+    """
+
+    def __init__(self, factory: Callable[[], Pool]) -> None:
+        self.factory = factory
+        self.pool = factory()
+
+    def __enter__(self) -> "RecyclingPool":
+        return self
+
+    def __exit__(self, *exc_info: Any) -> None:
+        self.pool.terminate()
+
+    def recycle(self) -> None:
+        """Terminate every worker, tasks still queued or running on them never deliver their result."""
+        self.pool.terminate()
+        self.pool.join()
+        self.pool = self.factory()
+
+
+def profiled(task_function: Callable[[Task], Result]) -> Callable[[Task], Result]:
+    """Run a pool task under the worker profiler, if the pool profiles.
+
+    The profile is written after every task, pool workers are terminated without a chance to do it at exit.
+    """
+
+    @wraps(task_function)
+    def wrapper(task: Task) -> Result:
+        profiler = _worker_profiler
+        if profiler is None or _worker_config.profile_dir is None:
+            return task_function(task)
+        profiler.enable()
+        try:
+            return task_function(task)
+        finally:
+            profiler.disable()
+            profiler.dump_stats(str(_worker_config.profile_dir / f"worker-{os.getpid()}.prof"))
+
+    return wrapper
+
+
+def deadline(task_function: Callable[[Task], Result]) -> Callable[[Task], Result]:
+    """Raise TimeoutError in a pool task that runs longer than the task timeout of the pool.
+
+    The worker interrupts itself with SIGALRM, so it stays usable for the next task. Platforms
+    without ``signal.setitimer`` run tasks without a timeout.
+    """
+
+    @wraps(task_function)
+    def wrapper(task: Task) -> Result:
+        timeout = _worker_config.task_timeout
+        if not timeout or not hasattr(signal, "setitimer"):
+            return task_function(task)
+
+        def expired(signum: int, frame: Any) -> None:
+            raise TimeoutError(f"gave up after {timeout:g} s")
+
+        previous = signal.signal(signal.SIGALRM, expired)
+        signal.setitimer(signal.ITIMER_REAL, timeout)
+        try:
+            return task_function(task)
+        finally:
+            signal.setitimer(signal.ITIMER_REAL, 0)
+            signal.signal(signal.SIGALRM, previous)
+
+    return wrapper
+
+
+def parse_sizes(value: str) -> List[int]:
+    """Resolve a profile name from ``SIZE_PROFILES`` or a comma separated list like ``24,32,48``."""
+    if value in SIZE_PROFILES:
+        return list(SIZE_PROFILES[value])
+    try:
+        sizes = sorted({int(size) for size in value.split(",") if size.strip()})
+    except ValueError:
+        raise ValueError(f"'{value}' is neither a size profile ({', '.join(SIZE_PROFILES)}) nor a list of sizes")
+    if not sizes or sizes[0] <= 0:
+        raise ValueError(f"'{value}' does not contain positive sizes")
+    return sizes
+
+
+class ConversionError(Exception):
+    """Raised when a cursor directory cannot be converted into a theme."""
+
+    def __init__(self, message: str, unmatched_files: Optional[List[str]] = None) -> None:
+        super().__init__(message)
+        self.unmatched_files = unmatched_files or []
+
+
+def rename_files(
+    files_to_rename: List[Path],
+    destination: Path,
+    rename_map: Dict[str, List[str]],
+    matcher: Optional[NameMatcher] = None,
+) -> Tuple[List[Tuple[str, str]], List[Tuple[str, str]], List[str]]:
+    """Resolve every file to the role of the longest japanese name it contains.
+
+    Pass a compiled ``matcher`` to reuse it across themes, otherwise one is compiled from ``rename_map``.
+    """
+    old_path = []
+    new_path = []
+    unmatched_files = []
+
+    dist_dir = destination / "src"
+    if matcher is None:
+        matcher = NameMatcher.compile(rename_map)
+
+    for file_path in files_to_rename:
+        name, extension = os.path.splitext(file_path.name)
+        match = matcher.match(name)
+
+        if match is None:
+            unmatched_files.append(file_path.name)
+            continue
+
+        if match.ambiguous:
+            logger.warning(f"'{file_path.name}' also matches {', '.join(match.ambiguous)}, using {match.role}")
+
+        old_name = f"{match.pattern}{extension}"
+        old_file_path = str(file_path.parent / file_path.name)
+        old_path.append((old_name, old_file_path))
+
+        new_name = f"{match.role}{extension}"
+        new_file_path = str(dist_dir / new_name)
+        new_path.append((new_name, new_file_path))
+
+    return old_path, new_path, unmatched_files
+
+
+def generate_standard_xcursors(rename_map: dict[str, list[str]]) -> dict[str, list[str]]:
+    """Map every role to the standardized xcursor names, relative to the theme root."""
+    mapping = {}
+    for key, value in rename_map.items():
+        new_path = [os.path.join("cursors", os.path.basename(new_name)) for new_name in value]
+        mapping[key] = new_path
+    return mapping
+
+
+def list_files(directory: Path, file_format: str, recursive: bool = False) -> list:  # type: ignore
+    matched_files = []
+
+    if recursive:
+        for root, _, filenames in os.walk(directory):
+            for filename in filenames:
+                if is_cursor_file(filename, file_format):
+                    matched_files.append(Path(root) / filename)
+    else:
+        for file in directory.iterdir():
+            if file.is_file() and is_cursor_file(file.name, file_format):
+                matched_files.append(file)
+
+    return matched_files
+
+
+def load_rename_map(json_file: Path) -> Any:
+    try:
+        with open(json_file, "r", encoding="utf-8") as file:
+            rename_map = json.load(file)
+        return rename_map
+    except FileNotFoundError:
+        print(f"'{json_file}' not found.")
+        exit(1)
+    except json.JSONDecodeError:
+        print(f"'{json_file}' contains invalid JSON.")
+        exit(1)
+
+
+@lru_cache(maxsize=None)
+def load_definitions(
+    json_file: Path = DEFINITIONS_JP_JSON, xcursor_json: Path = DEFINITIONS_JSON
+) -> Tuple[Dict[str, List[str]], Dict[str, List[str]]]:
+    """Load the [ani, cur] -> role and role -> xcursor mappings once per process."""
+    return load_rename_map(json_file), load_rename_map(xcursor_json)
+
+
+@lru_cache(maxsize=None)
+def load_matcher(json_file: Path = DEFINITIONS_JP_JSON) -> NameMatcher:
+    """Compile the role names of ``json_file`` once per process, shared by every theme."""
+    rename_map, _ = load_definitions(Path(json_file))
+    return NameMatcher.compile(rename_map)
+
+
+@profiled
+@deadline
+def process(task: ConversionTask) -> TaskResult:
+    """Convert one cursor file, returns its role, the xcursor blob and the time spent in every stage.
+
+    Only the path crosses the pool pipe, the file is read by the worker itself. Pools with the
+    hyprcursor backend also get the hyprcursor shape, and the preview pieces the task asks for are
+    rendered from the same decoded frames.
+    """
+    path, name, parts = task
+    sizes, cache = _worker_config.sizes, _worker_config.cache
+    xcursor, hyprcursor = uses_xcursor(_worker_config.backend), uses_hyprcursor(_worker_config.backend)
+    metrics = Metrics()
+    with metrics.stage("read") as stage:
+        with open(path, "rb") as file:
+            blob = file.read()
+        stage.bytes_out = len(blob)
+
+    key = ""
+    encoded: Dict[int, bytes] = {}
+    shape: Optional[bytes] = None
+    previews: Dict[str, bytes] = {}
+    if cache is not None:
+        with metrics.stage("cache_read", len(blob)) as stage:
+            key = cache.key(blob)
+            for size in set(sizes) if xcursor else ():
+                data = cache.get(key, f"xcur{size}")
+                if data is not None:
+                    encoded[size] = data
+            if hyprcursor:
+                shape = cache.get(key, "hlc")
+            for part in parts:
+                data = cache.get(key, f"preview{PREVIEW_VERSION}-{part}")
+                if data is not None:
+                    previews[part] = data
+            stage.bytes_out = sum(len(data) for data in [*encoded.values(), *previews.values(), shape or b""])
+
+    # Only what is not cached yet is rendered, from frames decoded once for all of it
+    missing = [size for size in set(sizes) if size not in encoded] if xcursor else []
+    missing_parts = [part for part in parts if part not in previews]
+    frames = None
+    if missing or missing_parts or (hyprcursor and shape is None):
+        with metrics.stage("decode", len(blob)):
+            frames = open_blob(blob).frames
+
+    if missing_parts:
+        assert frames is not None
+        with metrics.stage("preview") as stage:
+            rendered_parts = {part: render_part(frames, part) for part in missing_parts}
+            stage.bytes_out = sum(len(data) for data in rendered_parts.values())
+        previews.update(rendered_parts)
+        if cache is not None:
+            with metrics.stage("cache_write", stage.bytes_out):
+                for part, data in rendered_parts.items():
+                    cache.put(key, data, f"preview{PREVIEW_VERSION}-{part}")
+
+    if hyprcursor and shape is None:
+        assert frames is not None
+        with metrics.stage("hyprcursor") as stage:
+            shape = to_hyprcursor(frames)
+            stage.bytes_out = len(shape)
+        if cache is not None:
+            with metrics.stage("cache_write", len(shape)):
+                cache.put(key, shape, "hlc")
+
+    if not xcursor:
+        return TaskResult(name, b"", metrics, previews, shape)
+    if missing:
+        assert frames is not None
+        with metrics.stage("encode") as stage:
+            rendered = encode(frames, missing, _worker_store)
+            stage.bytes_out = sum(len(data) for data in rendered.values())
+        if _worker_store is not None:
+            # Frames resized by any earlier task or build, calls are lookups and bytes out the pixels reused
+            lookups, _, reused = _worker_store.take_stats()
+            metrics.add("frame_store", StageStats(lookups, bytes_out=reused))
+        encoded.update(rendered)
+        if cache is not None:
+            with metrics.stage("cache_write", stage.bytes_out):
+                for size, data in rendered.items():
+                    cache.put(key, data, f"xcur{size}")
+
+    with metrics.stage("assemble") as stage:
+        result = assemble(encoded, sizes)
+        stage.bytes_out = len(result)
+    return TaskResult(name, result, metrics, previews, shape)
+
+
+@profiled
+@deadline
+def frame_usage(path: str) -> Tuple[str, Optional[List[FrameUsage]]]:
+    """The distinct frames of one cursor file for a ``DuplicateReport``, None if it cannot be decoded.
+
+    With a cache the result is kept by file content like converted cursors are.
+    """
+    cache = _worker_config.cache
+    with open(path, "rb") as file:
+        blob = file.read()
+
+    key = ""
+    if cache is not None:
+        key = cache.key(blob)
+        data = cache.get(key, "frames")
+        if data is not None:
+            return path, [FrameUsage(*usage) for usage in json.loads(data)]
+
+    try:
+        frames = open_blob(blob).frames
+    except Exception:
+        return path, None
+    images = []
+    for frame in frames:
+        # The same RGBA bytes ``encode`` keys the frame store by
+        rgba = [cursor.image if cursor.image.mode == "RGBA" else cursor.image.convert("RGBA") for cursor in frame]
+        images.append([(image.width, image.height, image.tobytes()) for image in rgba])
+    usages = frame_usages(images)
+    if cache is not None:
+        cache.put(key, json.dumps(usages).encode(), "frames")
+    return path, usages
+
+
+def write_result(
+    writer: ThemeWriter,
+    mapping: Dict[str, List[str]],
+    result: TaskResult,
+    link_mode: str = "symlink",
+) -> None:
+    if result.role not in mapping:
+        return
+    if result.data:
+        writer.add_xcursor(mapping[result.role], result.data, link_mode)
+    if result.shape is not None:
+        # The aliases of the role are names of the same shape instead of files of their own
+        shape, *overrides = [os.path.basename(name) for name in mapping[result.role]]
+        writer.add_file(shape_path(shape), with_overrides(result.shape, overrides))
+
+
+def write_previews(writer: ThemeWriter, files: Dict[str, bytes]) -> None:
+    for name, data in sorted(files.items()):
+        writer.add_file(name, data)
+
+
+def index_theme(name: str, comment: str) -> str:
+    template = Template('[Icon Theme]\nName="$theme_name"\nComment="$comment"\n')
+    return template.safe_substitute(theme_name=name, comment=comment)
+
+
+def uses_xcursor(backend: str) -> bool:
+    return backend in ("xcursor", "both")
+
+
+def uses_hyprcursor(backend: str) -> bool:
+    return backend in ("hyprcursor", "both")
+
+
+def theme_files(name: str, comment: str, backend: str = "xcursor") -> Dict[str, str]:
+    """The description files at the root of a theme, index.theme for xcursor and manifest.hl for hyprcursor."""
+    files = {}
+    if uses_xcursor(backend):
+        files["index.theme"] = index_theme(name, comment)
+    if uses_hyprcursor(backend):
+        files["manifest.hl"] = manifest_hl(name, comment)
+    return files
+
+
+class BuildPlan(NamedTuple):
+    """What a theme is built from and what it writes, computed once per theme without decoding any cursor.
+
+    ``sources`` holds the input file of every matched role and ``mapping`` the canonical output file
+    followed by the aliases of every role in definitions.json. When several files match one role the
+    first by name is used and the rest end up in ``duplicates``.
+    """
+
+    prefix: Path
+    file_format: str
+    matched_files: int
+    sources: Dict[str, Path]
+    mapping: Dict[str, List[str]]
+    unmatched_files: List[str]
+    duplicates: Dict[str, List[Path]]
+
+    @property
+    def missing_roles(self) -> List[str]:
+        return [role for role in self.mapping if role not in self.sources]
+
+    @property
+    def unused_roles(self) -> List[str]:
+        """Matched roles without an xcursor name, their files are not converted."""
+        return [role for role in self.sources if role not in self.mapping]
+
+    @property
+    def roles(self) -> List[str]:
+        """The converted roles, in the order of the xcursor names."""
+        return [role for role in self.mapping if role in self.sources]
+
+    @property
+    def tasks(self) -> List[ConversionTask]:
+        return self.conversion_tasks()
+
+    def conversion_tasks(self, sheet: bool = False, animation: Optional[str] = None) -> List[ConversionTask]:
+        """The ``process`` task of every converted role, with the preview pieces of these preview settings."""
+        parts = preview_parts(self.roles, sheet, animation)
+        return [(str(path), role, parts[role]) for role, path in self.sources.items() if role in self.mapping]
+
+    def describe(self) -> List[str]:
+        covered = len(self.mapping) - len(self.missing_roles)
+        lines = [f"{self.prefix} ({self.file_format}): {covered}/{len(self.mapping)} roles covered"]
+        for role, outputs in self.mapping.items():
+            source = self.sources[role].name if role in self.sources else "missing"
+            canonical, *aliases = outputs
+            lines.append(f"  {role:<12} {source} -> {canonical} (+{len(aliases)} aliases)")
+        for role, paths in self.duplicates.items():
+            lines.append(f"  duplicate {role}: {', '.join(path.name for path in paths)}")
+        for role in self.unused_roles:
+            lines.append(f"  unused {role}: {self.sources[role].name}")
+        for name in self.unmatched_files:
+            lines.append(f"  unmatched: {name}")
+        return lines
+
+
+def plan_theme(
+    prefix: Path,
+    file_format: str = "ani",
+    recursive: bool = False,
+    json_file: Path = DEFINITIONS_JP_JSON,
+) -> BuildPlan:
+    """Match the cursor files in ``prefix`` to their roles and output names, nothing is read or decoded."""
+    rename_map, _ = load_definitions(Path(json_file))
+    files_to_rename = sorted(list_files(Path(prefix), file_format, recursive))
+
+    japanese_name, english_name, unmatched_files = rename_files(
+        files_to_rename, Path(prefix), rename_map, load_matcher(Path(json_file))
+    )
+
+    sources: Dict[str, Path] = {}
+    duplicates: Dict[str, List[Path]] = {}
+    for old_name, new_name in zip(japanese_name, english_name):
+        role: str = os.path.splitext(os.path.basename(new_name[1]))[0]
+        if role in sources:
+            duplicates.setdefault(role, []).append(Path(old_name[1]))
+        else:
+            sources[role] = Path(old_name[1])
+
+    return BuildPlan(
+        Path(prefix),
+        file_format,
+        len(english_name),
+        sources,
+        theme_mapping(json_file),
+        unmatched_files,
+        duplicates,
+    )
+
+
+def prepare_theme(
+    prefix: Path,
+    file_format: str = "ani",
+    recursive: bool = False,
+    json_file: Path = DEFINITIONS_JP_JSON,
+) -> BuildPlan:
+    """Plan a theme and check that it can be built, the ``process`` tasks are in ``BuildPlan.tasks``."""
+    plan = plan_theme(prefix, file_format, recursive, json_file)
+
+    if not plan.matched_files and not plan.unmatched_files:
+        raise ConversionError("No files matched the criteria for processing.")
+
+    if plan.unmatched_files:
+        raise ConversionError("Unmatched files: " + ", ".join(plan.unmatched_files), plan.unmatched_files)
+
+    if plan.matched_files < MIN_MATCHED_FILES:
+        raise ConversionError("Error: check definitions_jp if files match renaming scheme")
+
+    for role, paths in plan.duplicates.items():
+        logger.warning(f"{', '.join(path.name for path in paths)} also match {role}, using {plan.sources[role].name}")
+    return plan
+
+
+def theme_mapping(json_file: Path = DEFINITIONS_JP_JSON) -> Dict[str, List[str]]:
+    _, rename_xmc = load_definitions(Path(json_file))
+    return generate_standard_xcursors(rename_xmc)
+
+
+def convert_theme(
+    prefix: Path,
+    output: Path,
+    name: str = "Custom",
+    comment: str = "Custom",
+    sizes: Sequence[int] = DEFAULT_SIZES,
+    file_format: str = "ani",
+    recursive: bool = False,
+    json_file: Path = DEFINITIONS_JP_JSON,
+    jobs: Optional[int] = None,
+    pool: Optional[Pool] = None,
+    cache: Optional[ConversionCache] = None,
+    link_mode: str = "symlink",
+    preview_sheet: bool = False,
+    preview_animation: Optional[str] = None,
+    metrics: Optional[Metrics] = None,
+    backend: str = "xcursor",
+) -> Path:
+    """Convert a directory of [ani, cur] files into an xcursor or hyprcursor theme at ``output / name``.
+
+    If ``pool`` is given the conversion is scheduled on it and ``sizes`` and ``cache`` are the ones the
+    pool was created with by ``create_pool``, otherwise a pool of ``jobs`` workers is created for this
+    theme only, by default as many as there are CPUs available and no more than the theme has tasks.
+    With a ``cache`` unchanged cursors are not decoded again.
+    Aliases of a role are written according to ``link_mode``, see ``LINK_MODES``. The thumbnail and the
+    optional contact sheet and ``ANIMATION_FORMATS`` preview are put together from pieces the conversion
+    tasks render from their decoded frames. ``backend`` is one of ``BACKENDS`` and, with a given ``pool``,
+    the one it was created with. The stage timings of the theme are merged into ``metrics``. Returns the
+    theme directory.
+    """
+    plan = prepare_theme(prefix, file_format, recursive, json_file)
+
+    theme_dir = Path(output) / name
+    writer = DirectoryThemeWriter(theme_dir)
+    if uses_xcursor(backend):
+        os.makedirs(theme_dir / "cursors", exist_ok=True)
+    for filename, content in theme_files(name, comment, backend).items():
+        writer.add_file(filename, content.encode())
+
+    tasks = plan.conversion_tasks(preview_sheet, preview_animation)
+    if metrics is None:
+        metrics = Metrics()
+
+    def run(pool: Pool) -> None:
+        previews = {}
+        for result in pool.imap_unordered(process, tasks):
+            metrics.merge(result.metrics)
+            previews[result.role] = result.previews
+            with metrics.stage("write", len(result.data) + len(result.shape or b"")):
+                write_result(writer, plan.mapping, result, link_mode)
+        with metrics.stage("preview") as stage:
+            files = theme_previews(previews, plan.roles)
+            stage.bytes_out = sum(len(data) for data in files.values())
+        with metrics.stage("write"):
+            write_previews(writer, files)
+
+    if pool is not None:
+        run(pool)
+    else:
+        with create_pool(jobs, sizes, cache, tasks=len(tasks), backend=backend) as own_pool:
+            run(own_pool)
+
+    writer.close()
+    return theme_dir
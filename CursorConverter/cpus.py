@@ -0,0 +1,102 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import math
+import os
+from pathlib import Path
+from typing import List, Optional, Tuple
+
+CGROUP_ROOT = Path("/sys/fs/cgroup")
+PROC_SELF_CGROUP = Path("/proc/self/cgroup")
+
+
+def _read_quota(quota_file: Path, period_file: Optional[Path] = None) -> Optional[float]:
+    """CPUs of a cgroup v2 ``cpu.max`` or a cgroup v1 ``cpu.cfs_quota_us`` and its period, None if unlimited."""
+    try:
+        if period_file is None:
+            quota, period = quota_file.read_text().split()[:2]
+        else:
+            quota, period = quota_file.read_text().strip(), period_file.read_text().strip()
+        # "max" in v2 and -1 in v1 mean no quota
+        if quota == "max" or int(quota) <= 0 or int(period) <= 0:
+            return None
+        return int(quota) / int(period)
+    except (OSError, ValueError):
+        return None
+
+
+def _ancestors(mount: Path, cgroup: str) -> List[Path]:
+    """``mount``/``cgroup`` and every parent up to ``mount``, the nearest first."""
+    directory = mount / cgroup.strip("/")
+    directories = [directory]
+    while directory != mount and mount in directory.parents:
+        directory = directory.parent
+        directories.append(directory)
+    return directories
+
+
+def cgroup_cpu_limit(root: Path = CGROUP_ROOT, cgroup_file: Path = PROC_SELF_CGROUP) -> Optional[float]:
+    """CPUs the cgroup CPU quota of this process allows, the tightest of its cgroup and their parents.
+
+    Both cgroup v2 and the v1 cpu controller are read. Inside a container the cgroup path of
+    ``cgroup_file`` may not exist below the mount, the mount itself is the container cgroup then.
+    None without a quota or on systems without cgroups.
+    """
+    try:
+        lines = cgroup_file.read_text().splitlines()
+    except OSError:
+        return None
+
+    limits: List[Optional[float]] = []
+    for line in lines:
+        try:
+            _, controllers, cgroup = line.split(":", 2)
+        except ValueError:
+            continue
+        if controllers == "":
+            for directory in _ancestors(root, cgroup) + [root / "unified"]:
+                limits.append(_read_quota(directory / "cpu.max"))
+        elif "cpu" in controllers.split(","):
+            for mount in (root / controllers, root / "cpu", root / "cpu,cpuacct"):
+                for directory in _ancestors(mount, cgroup):
+                    limits.append(_read_quota(directory / "cpu.cfs_quota_us", directory / "cpu.cfs_period_us"))
+    quotas: List[float] = [limit for limit in limits if limit is not None]
+    return min(quotas) if quotas else None
+
+
+def available_cpus() -> int:
+    """CPUs this process can keep busy: its CPU affinity, capped by a cgroup quota, at least 1.
+
+    os.cpu_count() is the core count of the host, a container limited to two CPUs on a 64 core
+    machine would start 64 workers that take turns on two CPUs.
+    """
+    try:
+        cpus = len(os.sched_getaffinity(0))
+    except AttributeError:  # macOS and Windows
+        cpus = os.cpu_count() or 1
+    limit = cgroup_cpu_limit()
+    if limit is not None:
+        cpus = min(cpus, math.ceil(limit))
+    return max(1, cpus)
+
+
+def worker_count(jobs: Optional[int] = None, tasks: Optional[int] = None) -> int:
+    """Workers of a pool for ``tasks`` tasks, ``jobs`` or else ``available_cpus``, never more than the tasks."""
+    workers = jobs if jobs is not None else available_cpus()
+    if tasks is not None:
+        workers = min(workers, tasks)
+    return max(1, workers)
+
+
+def split_budget(jobs: int, archive_jobs: Optional[int] = None) -> Tuple[int, int]:
+    """Split ``jobs`` CPUs into (pool workers, compression threads), at least one worker.
+
+    Archives are compressed by threads of the parent while the workers convert the next themes, both
+    are CPU bound, so they share one budget instead of each taking all of it. Without ``archive_jobs``
+    a quarter of the budget compresses, at least one thread if the budget has a CPU to spare. No
+    compression threads mean the archives are compressed inline by the scheduling thread.
+    """
+    if archive_jobs is None:
+        archive_jobs = max(1, jobs // 4)
+    archive_jobs = max(0, min(archive_jobs, jobs - 1))
+    return max(1, jobs - archive_jobs), archive_jobs
@@ -0,0 +1,179 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import mmap
+import os
+import struct
+from pathlib import Path
+from typing import Dict, List, NamedTuple, Optional, Sequence, Set, Tuple
+
+from CursorConverter.cache import toolchain_version
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None  # type: ignore[assignment]
+
+DATA_NAME = "frames.bin"
+INDEX_NAME = "frames.idx"
+
+# sha256 of (frame, size), offset and length of its pixels in the data file
+INDEX_RECORD = struct.Struct("<32sQI")
+
+
+def frame_digest(width: int, height: int, rgba: bytes) -> bytes:
+    """Identity of a decoded RGBA frame, whatever file, theme or set it comes from."""
+    digest = hashlib.sha256()
+    digest.update(f"{toolchain_version()};{width}x{height};".encode())
+    digest.update(rgba)
+    return digest.digest()
+
+
+def sized_digest(frame: bytes, size: int) -> bytes:
+    return hashlib.sha256(frame + size.to_bytes(4, "little")).digest()
+
+
+def frame_store_available() -> bool:
+    return fcntl is not None
+
+
+class FrameStore:
+    """Content-addressed store of resampled frames, one memory-mapped file shared by every worker.
+
+    Pixels are appended to ``frames.bin`` and indexed by ``frames.idx``, a list of fixed size records
+    of (``sized_digest``, offset, length). Writers append under an exclusive lock on the index, and an
+    index record is written only after its pixels, so readers never lock: they read the records added
+    since their last look and map the data file again when it grew. Both files live on across builds,
+    the conversion cache evicts the store as a whole.
+    """
+
+    def __init__(self, directory: Path) -> None:
+        self.directory = Path(directory)
+        self.directory.mkdir(parents=True, exist_ok=True)
+        self._data_fd = os.open(self.directory / DATA_NAME, os.O_RDWR | os.O_CREAT, 0o644)
+        self._index_fd = os.open(self.directory / INDEX_NAME, os.O_RDWR | os.O_CREAT | os.O_APPEND, 0o644)
+        # Builds that only read from the store still count as a use for the cache eviction
+        os.utime(self._data_fd)
+        self._index: Dict[bytes, Tuple[int, int]] = {}
+        self._indexed = 0
+        self._map: Optional[mmap.mmap] = None
+        # Lookups and hits of this process, in frames and pixel bytes
+        self.lookups = 0
+        self.hits = 0
+        self.bytes_reused = 0
+
+    def _refresh(self) -> None:
+        end = os.fstat(self._index_fd).st_size
+        # A record cut off by a killed writer is ignored until the next writer drops it
+        end -= (end - self._indexed) % INDEX_RECORD.size
+        if end <= self._indexed:
+            return
+        data = os.pread(self._index_fd, end - self._indexed, self._indexed)
+        for digest, offset, length in INDEX_RECORD.iter_unpack(data):
+            self._index[digest] = (offset, length)
+        self._indexed = end
+
+    def _view(self, offset: int, length: int) -> memoryview:
+        if self._map is None or offset + length > len(self._map):
+            # Views of the previous mapping keep it alive until they are gone
+            self._map = mmap.mmap(self._data_fd, 0, access=mmap.ACCESS_READ)
+        return memoryview(self._map)[offset : offset + length]
+
+    def get(self, digest: bytes) -> Optional[memoryview]:
+        self.lookups += 1
+        entry = self._index.get(digest)
+        if entry is None:
+            self._refresh()
+            entry = self._index.get(digest)
+            if entry is None:
+                return None
+        self.hits += 1
+        self.bytes_reused += entry[1]
+        return self._view(*entry)
+
+    def put(self, digest: bytes, data: "bytes | memoryview") -> None:
+        fcntl.flock(self._index_fd, fcntl.LOCK_EX)
+        try:
+            size = os.fstat(self._index_fd).st_size
+            if size % INDEX_RECORD.size:
+                os.ftruncate(self._index_fd, size - size % INDEX_RECORD.size)
+            self._refresh()
+            if digest in self._index:
+                return
+            offset = os.fstat(self._data_fd).st_size
+            os.pwrite(self._data_fd, data, offset)
+            os.write(self._index_fd, INDEX_RECORD.pack(digest, offset, len(data)))
+            self._index[digest] = (offset, len(data))
+            self._indexed += INDEX_RECORD.size
+        finally:
+            fcntl.flock(self._index_fd, fcntl.LOCK_UN)
+
+    def take_stats(self) -> Tuple[int, int, int]:
+        """(lookups, hits, bytes reused) since the last call."""
+        stats = (self.lookups, self.hits, self.bytes_reused)
+        self.lookups = self.hits = self.bytes_reused = 0
+        return stats
+
+    def close(self) -> None:
+        self._map = None
+        os.close(self._data_fd)
+        os.close(self._index_fd)
+
+
+class FrameUsage(NamedTuple):
+    """A distinct frame of a cursor file, how often the file shows it and its RGBA size in bytes."""
+
+    digest: str
+    repeats: int
+    nbytes: int
+
+
+class DuplicateReport(NamedTuple):
+    """How much of the art below a directory is the same frame in several files and themes."""
+
+    # Cursor file -> its distinct frames
+    files: Dict[Path, List[FrameUsage]]
+    unreadable: Tuple[Path, ...] = ()
+
+    def describe(self, top: int = 10) -> List[str]:
+        frames: Dict[str, Tuple[int, Set[Path], Set[Path]]] = {}
+        occurrences = total_bytes = 0
+        for path, usages in self.files.items():
+            for usage in usages:
+                nbytes, files, themes = frames.setdefault(usage.digest, (usage.nbytes, set(), set()))
+                files.add(path)
+                themes.add(path.parent)
+                occurrences += usage.repeats
+                total_bytes += usage.repeats * usage.nbytes
+
+        distinct_bytes = sum(nbytes for nbytes, _, _ in frames.values())
+        shared_files = [entry for entry in frames.values() if len(entry[1]) > 1]
+        shared_themes = [entry for entry in frames.values() if len(entry[2]) > 1]
+        lines = [
+            f"{len(self.files)} files show {occurrences} frames, {len(frames)} of them distinct"
+            + (f", {len(self.unreadable)} files could not be decoded" if self.unreadable else ""),
+            f"{len(shared_files)} frames appear in more than one file, {len(shared_themes)} in more than one theme",
+            f"{total_bytes / 1024**2:.1f} MiB of RGBA frames, {distinct_bytes / 1024**2:.1f} MiB distinct "
+            f"({1 - distinct_bytes / total_bytes if total_bytes else 0:.0%} duplicate art)",
+        ]
+
+        groups: Dict[Tuple[Path, ...], int] = {}
+        for _, _, themes in shared_themes:
+            key = tuple(sorted(themes))
+            groups[key] = groups.get(key, 0) + 1
+        if groups:
+            lines.append("Themes sharing the most frames:")
+        for sharing, count in sorted(groups.items(), key=lambda item: (-item[1], item[0]))[:top]:
+            lines.append(f"  {count} frames: {', '.join(str(theme) for theme in sharing)}")
+        return lines
+
+
+def frame_usages(frames: Sequence[Sequence[Tuple[int, int, bytes]]]) -> List[FrameUsage]:
+    """Distinct frames of a cursor, given as (width, height, RGBA bytes) per image of every frame."""
+    usages: Dict[str, List[int]] = {}
+    for frame in frames:
+        for width, height, rgba in frame:
+            usage = usages.setdefault(frame_digest(width, height, rgba).hex(), [0, len(rgba)])
+            usage[0] += 1
+    return [FrameUsage(digest, count, nbytes) for digest, (count, nbytes) in usages.items()]
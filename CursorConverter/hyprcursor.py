@@ -0,0 +1,107 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import time
+import zipfile
+from io import BytesIO
+from string import Template
+from typing import Dict, List, Sequence, Tuple
+
+from cursorgen.utils.cursor import CursorFrame
+from PIL import Image
+
+from CursorConverter.theme import source_date_epoch
+
+# Directory of the .hlc shape files in the theme, named by manifest.hl
+HYPRCURSORS_DIR = "hyprcursors"
+
+# Frames are kept at their own resolution and scaled by the compositor to the requested size,
+# nearest neighbour gives the same look as the resized xcursor images
+RESIZE_ALGORITHM = "nearest"
+
+META_NAME = "meta.hl"
+
+
+def manifest_hl(name: str, comment: str) -> str:
+    """The manifest.hl at the root of a hyprcursor theme."""
+    template = Template("name = $theme_name\ndescription = $comment\nversion = 1.0\ncursors_directory = $directory\n")
+    return template.safe_substitute(theme_name=name, comment=comment, directory=HYPRCURSORS_DIR)
+
+
+def shape_path(name: str) -> str:
+    """Where the shape of an xcursor name is written, relative to the theme root."""
+    return f"{HYPRCURSORS_DIR}/{name}.hlc"
+
+
+def _pack(files: Dict[str, bytes]) -> bytes:
+    """Zip the files of a shape in name order with fixed timestamps, PNG frames are stored as they are."""
+    date_time = time.gmtime(source_date_epoch())[:6]
+    buffer = BytesIO()
+    with zipfile.ZipFile(buffer, "w") as zipf:
+        for name, data in sorted(files.items()):
+            info = zipfile.ZipInfo(name, date_time=date_time)
+            info.compress_type = zipfile.ZIP_STORED if name.endswith(".png") else zipfile.ZIP_DEFLATED
+            info.external_attr = 0o644 << 16
+            zipf.writestr(info, data)
+    return buffer.getvalue()
+
+
+def _square(image: Image.Image) -> Image.Image:
+    """Hyprcursor sizes are square, a narrower image is placed at the top left of a transparent square."""
+    image = image if image.mode == "RGBA" else image.convert("RGBA")
+    size = max(image.width, image.height)
+    if image.width == image.height:
+        return image
+    canvas = Image.new("RGBA", (size, size))
+    canvas.paste(image, (0, 0))
+    return canvas
+
+
+def to_hyprcursor(frames: List[CursorFrame]) -> bytes:
+    """A hyprcursor shape (.hlc) of the frames of one cursor, without aliases, see ``with_overrides``.
+
+    Every distinct image becomes one PNG at its own resolution, animations refer to the PNGs of their
+    frames in order with the delay of each frame in milliseconds. The hotspot is the one of the first
+    image, relative to its size, since a shape has a single hotspot.
+    """
+    files: Dict[str, bytes] = {}
+    # PNG file of every distinct image by content
+    names: Dict[Tuple[int, bytes], str] = {}
+    sizes: List[Tuple[int, str, int]] = []
+    hotspot = (0.0, 0.0)
+    for frame in frames:
+        delay = int(frame.delay * 1000)
+        for cursor in frame:
+            image = _square(cursor.image)
+            if not sizes:
+                hotspot = (cursor.hotspot[0] / image.width, cursor.hotspot[1] / image.height)
+            key = (image.width, image.tobytes())
+            name = names.get(key)
+            if name is None:
+                name = names[key] = f"{len(names)}.png"
+                buffer = BytesIO()
+                image.save(buffer, "PNG", optimize=True)
+                files[name] = buffer.getvalue()
+            sizes.append((image.width, name, delay))
+
+    lines = [
+        f"resize_algorithm = {RESIZE_ALGORITHM}",
+        f"hotspot_x = {hotspot[0]:.6g}",
+        f"hotspot_y = {hotspot[1]:.6g}",
+    ]
+    # A delay only matters for animations
+    animated = len(frames) > 1
+    for size, name, delay in sizes:
+        lines.append(f"define_size = {size}, {name}, {delay}" if animated else f"define_size = {size}, {name}")
+    files[META_NAME] = ("\n".join(lines) + "\n").encode()
+    return _pack(files)
+
+
+def with_overrides(shape: bytes, overrides: Sequence[str]) -> bytes:
+    """Add the names a shape also answers to, the xcursor aliases of its role, to its meta.hl."""
+    if not overrides:
+        return shape
+    with zipfile.ZipFile(BytesIO(shape)) as zipf:
+        files = {name: zipf.read(name) for name in zipf.namelist()}
+    files[META_NAME] += "".join(f"define_override = {name}\n" for name in overrides).encode()
+    return _pack(files)
@@ -0,0 +1,213 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import hashlib
+import json
+import os
+import tempfile
+from pathlib import Path
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Set, Tuple
+
+from CursorConverter.cache import toolchain_version
+
+MANIFEST_NAME = "manifest.json"
+MANIFEST_VERSION = 1
+
+# sha256sum compatible digests of every archive in a dist directory, published with the archives
+CHECKSUMS_NAME = "SHA256SUMS"
+
+# Tasks and themes the current or last build of a dist directory finished, see ``BuildJournal``
+JOURNAL_NAME = "journal.jsonl"
+JOURNAL_VERSION = 1
+
+
+def file_digest(path: Path, chunk_size: int = 1024 * 1024) -> str:
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for chunk in iter(lambda: file.read(chunk_size), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def write_atomic(path: Path, data: bytes) -> None:
+    """Replace ``path`` with ``data`` at once, readers and killed builds never see half a file."""
+    fd, tmp_name = tempfile.mkstemp(dir=path.parent, prefix=f".{path.name}-")
+    try:
+        with os.fdopen(fd, "wb") as file:
+            file.write(data)
+        # mkstemp creates the file readable by its owner only, these are published next to the archives
+        os.chmod(tmp_name, 0o644)
+        os.replace(tmp_name, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_name)
+        except FileNotFoundError:
+            pass
+        raise
+
+
+def read_checksums(path: Path) -> Dict[str, str]:
+    """Read a ``sha256sum`` style file into file name -> digest, a missing file has no digests."""
+    checksums = {}
+    try:
+        with open(path, "r", encoding="utf-8") as file:
+            for line in file:
+                digest, _, name = line.rstrip("\n").partition(" ")
+                if digest and name:
+                    # Binary mode entries are marked with a star instead of a second space
+                    checksums[name[1:]] = digest
+    except FileNotFoundError:
+        pass
+    return checksums
+
+
+def write_checksums(path: Path, checksums: Dict[str, str]) -> None:
+    write_atomic(path, "".join(f"{digest}  {name}\n" for name, digest in sorted(checksums.items())).encode())
+
+
+def theme_fingerprint(
+    input_files: Iterable[Path], mapping_files: Iterable[Path], sizes: Sequence[int]
+) -> Dict[str, Any]:
+    """Describe everything a theme archive is built from, two equal fingerprints produce the same theme."""
+    return {
+        "inputs": {path.name: file_digest(path) for path in sorted(input_files)},
+        "mappings": {path.name: file_digest(path) for path in sorted(mapping_files)},
+        "sizes": sorted(set(sizes)),
+        "toolchain": toolchain_version(),
+    }
+
+
+class BuildManifest:
+    """Per theme record of the inputs and the archive of the last successful build in a dist directory."""
+
+    def __init__(self, path: Path, themes: Optional[Dict[str, Dict[str, Any]]] = None) -> None:
+        self.path = path
+        self.themes: Dict[str, Dict[str, Any]] = themes or {}
+
+    @classmethod
+    def load(cls, path: Path) -> "BuildManifest":
+        try:
+            with open(path, "r", encoding="utf-8") as file:
+                data = json.load(file)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return cls(path)
+        if data.get("version") != MANIFEST_VERSION:
+            return cls(path)
+        return cls(path, data.get("themes", {}))
+
+    def save(self) -> None:
+        data = {"version": MANIFEST_VERSION, "themes": dict(sorted(self.themes.items()))}
+        write_atomic(self.path, json.dumps(data, ensure_ascii=False, indent=1).encode())
+
+    def is_up_to_date(self, theme: str, fingerprint: Dict[str, Any]) -> bool:
+        """True if ``theme`` was built from ``fingerprint`` and its archive is still the one we produced."""
+        entry = self.themes.get(theme)
+        if entry is None or entry.get("fingerprint") != fingerprint:
+            return False
+        archive = self.path.parent / entry["archive"]
+        return archive.is_file() and file_digest(archive) == str(entry["archive_sha256"])
+
+    def record(self, theme: str, fingerprint: Dict[str, Any], archive: Path, **extra: Any) -> None:
+        previous = self.themes.get(theme, {}).get("archive")
+        if previous is not None and previous != archive.name:
+            # The archive format changed, drop the archive of the old format
+            (self.path.parent / previous).unlink(missing_ok=True)
+        self.themes[theme] = {
+            **extra,
+            "fingerprint": fingerprint,
+            "archive": archive.name,
+            "archive_sha256": file_digest(archive),
+        }
+
+    def forget(self, theme: str) -> None:
+        self.themes.pop(theme, None)
+
+    def prune(self, known_themes: Iterable[str]) -> List[str]:
+        """Delete archives of themes that are no longer defined, returns their names."""
+        known = set(known_themes)
+        deleted = []
+        for theme in sorted(set(self.themes) - known):
+            archive = self.path.parent / self.themes.pop(theme)["archive"]
+            if archive.is_file():
+                archive.unlink()
+            deleted.append(theme)
+        return deleted
+
+
+class BuildJournal:
+    """Append only record of the conversion tasks and theme archives a build finished, for ``--resume``.
+
+    Every line is a JSON object, flushed as soon as its work is done, so a killed build loses at most
+    the line it was writing. The first line holds the settings of the build, a journal written with
+    other settings is started over instead of resumed. Finished tasks are (theme, role) pairs, their
+    xcursor files are kept by the conversion cache, finished themes carry the digest of their archive.
+    """
+
+    def __init__(self, path: Path, settings: Dict[str, Any]) -> None:
+        self.path = path
+        self.settings = settings
+        self.tasks: Set[Tuple[str, str]] = set()
+        self.themes: Dict[str, str] = {}
+        self._file: Optional[IO[str]] = None
+
+    @classmethod
+    def open(cls, path: Path, settings: Dict[str, Any], resume: bool = False) -> "BuildJournal":
+        """Start a journal at ``path``, or with ``resume`` continue the one a build with the same settings left."""
+        journal = cls(path, settings)
+        header = {"version": JOURNAL_VERSION, "settings": settings}
+        entries = journal._load(header) if resume else []
+        # Rewrite what was read, so an entry cut off by the last build is not followed by new ones
+        write_atomic(
+            path, "".join(json.dumps(entry, ensure_ascii=False) + "\n" for entry in [header] + entries).encode()
+        )
+        journal._file = open(path, "a", encoding="utf-8")
+        return journal
+
+    def _load(self, header: Dict[str, Any]) -> List[Dict[str, Any]]:
+        try:
+            with open(self.path, "r", encoding="utf-8") as file:
+                lines = file.read().splitlines()
+        except FileNotFoundError:
+            return []
+        entries = []
+        for index, line in enumerate(lines):
+            try:
+                entry = json.loads(line)
+            except json.JSONDecodeError:
+                break
+            if index == 0:
+                if entry != json.loads(json.dumps(header)):
+                    return []
+                continue
+            if "task" in entry:
+                self.tasks.add((entry["task"][0], entry["task"][1]))
+            elif "theme" in entry:
+                self.themes[entry["theme"]] = entry["archive_sha256"]
+            entries.append(entry)
+        return entries
+
+    def _append(self, entry: Dict[str, Any]) -> None:
+        assert self._file is not None
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def record_task(self, theme: str, role: str) -> None:
+        self.tasks.add((theme, role))
+        self._append({"task": [theme, role]})
+
+    def record_theme(self, theme: str, archive: Path) -> None:
+        self.themes[theme] = file_digest(archive)
+        self._append({"theme": theme, "archive": archive.name, "archive_sha256": self.themes[theme]})
+
+    def is_finished(self, theme: str, archive: Path) -> bool:
+        """True if this build or the resumed one wrote ``archive`` of ``theme`` and it is unchanged since."""
+        digest = self.themes.get(theme)
+        return digest is not None and archive.is_file() and file_digest(archive) == digest
+
+    def finished_tasks(self, theme: str) -> int:
+        return sum(1 for task_theme, _ in self.tasks if task_theme == theme)
+
+    def close(self) -> None:
+        if self._file is not None:
+            self._file.close()
+            self._file = None
@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import re
+from typing import Any, Dict, List, NamedTuple, Optional, Tuple
+
+
+class NameMatch(NamedTuple):
+    role: str
+    pattern: str
+    # Other roles with an equally long match, the role listed first in the definitions wins
+    ambiguous: Tuple[str, ...] = ()
+
+
+def _alternation(names: List[str]) -> str:
+    """A regex matching any of ``names``, factored by common prefix so each character is tested once.
+
+    Every branch tries to go on before it stops, so the longest name starting at a position wins.
+    """
+    trie: Dict[str, Any] = {}
+    for name in names:
+        node = trie
+        for char in name:
+            node = node.setdefault(char, {})
+        node[""] = {}
+
+    def branch(node: Dict[str, Any]) -> str:
+        alternatives = [re.escape(char) + branch(child) for char, child in sorted(node.items()) if char]
+        if not alternatives:
+            return ""
+        body = alternatives[0] if len(alternatives) == 1 else f"(?:{'|'.join(alternatives)})"
+        return f"(?:{body})?" if "" in node else body
+
+    return branch(trie)
+
+
+class NameMatcher:
+    """Longest-match index over the japanese names of every role in definitions_jp.json.
+
+    Every name is listed once, longest first, together with the roles it belongs to in definitions
+    order. A file name resolves to the role of the longest name it contains, so the result no longer
+    depends on the order of the roles, and ties are reported through ``NameMatch.ambiguous``.
+    A name that is exactly one of the role names is a dict lookup, any other scans all of them at once
+    with a single compiled alternation.
+    """
+
+    def __init__(self, roles: List[str], patterns: List[str], pattern_roles: List[List[int]]) -> None:
+        self.roles = roles
+        self.patterns = patterns
+        self.pattern_roles = pattern_roles
+        # What a file name containing one name and no other of the same length resolves to
+        self._exact = {pattern: self._resolve([index]) for index, pattern in enumerate(patterns)}
+        self._index = {pattern: index for index, pattern in enumerate(patterns)}
+        # The lookahead yields the longest name starting at every position of the file name, overlapping
+        # ones included
+        self._regex = re.compile(f"(?=({_alternation(patterns)}))") if patterns else None
+
+    @classmethod
+    def compile(cls, rename_map: Dict[str, List[str]]) -> "NameMatcher":
+        roles = list(rename_map)
+        owners: Dict[str, List[int]] = {}
+        for role_index, names in enumerate(rename_map.values()):
+            for name in names:
+                owner = owners.setdefault(name, [])
+                if role_index not in owner:
+                    owner.append(role_index)
+
+        # Longest first, then in the order the roles and their names are defined
+        patterns = sorted(owners, key=lambda name: (-len(name), owners[name][0]))
+        return cls(roles, patterns, [owners[name] for name in patterns])
+
+    def ambiguous_patterns(self) -> Dict[str, List[str]]:
+        """Names listed under more than one role, these always resolve to the first of their roles."""
+        return {
+            pattern: [self.roles[role] for role in roles]
+            for pattern, roles in zip(self.patterns, self.pattern_roles)
+            if len(roles) > 1
+        }
+
+    def _resolve(self, matches: List[int]) -> NameMatch:
+        """The match of equally long names, the first of them in pattern order is reported."""
+        roles: List[int] = []
+        for index in matches:
+            roles.extend(role for role in self.pattern_roles[index] if role not in roles)
+        role, *others = sorted(roles)
+        return NameMatch(self.roles[role], self.patterns[matches[0]], tuple(self.roles[other] for other in others))
+
+    def match(self, name: str) -> Optional[NameMatch]:
+        exact = self._exact.get(name)
+        # Nothing longer fits in the name, only the roles sharing it can tie
+        if exact is not None or self._regex is None:
+            return exact
+
+        longest: List[str] = []
+        for pattern in self._regex.findall(name):
+            if not longest or len(pattern) > len(longest[0]):
+                longest = [pattern]
+            elif len(pattern) == len(longest[0]) and pattern not in longest:
+                longest.append(pattern)
+        if not longest:
+            return None
+        if len(longest) == 1:
+            return self._exact[longest[0]]
+        return self._resolve(sorted(self._index[pattern] for pattern in longest))
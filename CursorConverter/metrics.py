@@ -0,0 +1,210 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import cProfile
+import csv
+import json
+import os
+import pstats
+import sys
+import tempfile
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, Optional
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None  # type: ignore[assignment]
+
+REPORT_VERSION = 1
+
+CSV_FIELDS = ["scope", "set", "character", "stage", "calls", "wall_s", "cpu_s", "bytes_in", "bytes_out", "peak_rss_kib"]
+
+
+def peak_rss(who: str = "self") -> int:
+    """Peak resident set size in KiB of this process, or of its waited for children, 0 where unknown."""
+    if resource is None:
+        return 0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN if who == "children" else resource.RUSAGE_SELF)
+    # Linux reports KiB, macOS bytes
+    return usage.ru_maxrss // 1024 if sys.platform == "darwin" else usage.ru_maxrss
+
+
+class StageStats:
+    """Totals of one stage, summed over its calls, ``peak_rss`` is the highest seen at the end of a call."""
+
+    __slots__ = ("calls", "wall", "cpu", "bytes_in", "bytes_out", "peak_rss")
+
+    def __init__(
+        self,
+        calls: int = 0,
+        wall: float = 0.0,
+        cpu: float = 0.0,
+        bytes_in: int = 0,
+        bytes_out: int = 0,
+        peak_rss: int = 0,
+    ) -> None:
+        self.calls = calls
+        self.wall = wall
+        self.cpu = cpu
+        self.bytes_in = bytes_in
+        self.bytes_out = bytes_out
+        self.peak_rss = peak_rss
+
+    def merge(self, other: "StageStats") -> None:
+        self.calls += other.calls
+        self.wall += other.wall
+        self.cpu += other.cpu
+        self.bytes_in += other.bytes_in
+        self.bytes_out += other.bytes_out
+        self.peak_rss = max(self.peak_rss, other.peak_rss)
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "calls": self.calls,
+            "wall_s": round(self.wall, 6),
+            "cpu_s": round(self.cpu, 6),
+            "bytes_in": self.bytes_in,
+            "bytes_out": self.bytes_out,
+            "peak_rss_kib": self.peak_rss,
+        }
+
+    def describe(self) -> str:
+        return (
+            f"{self.calls} calls, {self.wall:.2f} s wall, {self.cpu:.2f} s cpu, "
+            f"{self.bytes_in / 1024**2:.1f} MiB in, {self.bytes_out / 1024**2:.1f} MiB out"
+        )
+
+
+class Metrics:
+    """Per stage timings of one piece of work, a task, a character or a whole build.
+
+    Workers return the metrics of their task with its result, the parent merges them into the
+    character and the set they belong to. CPU time is the time of the measuring thread, so stages
+    running on archive threads or in pool workers are not counted twice.
+    """
+
+    def __init__(self) -> None:
+        self.stages: Dict[str, StageStats] = {}
+
+    @contextmanager
+    def stage(self, name: str, bytes_in: int = 0) -> Iterator[StageStats]:
+        """Time the body as one call of stage ``name``, set ``bytes_out`` on the yielded stats."""
+        current = StageStats(1, bytes_in=bytes_in)
+        wall, cpu = time.perf_counter(), time.thread_time()
+        try:
+            yield current
+        finally:
+            current.wall = time.perf_counter() - wall
+            current.cpu = time.thread_time() - cpu
+            current.peak_rss = peak_rss()
+            self.add(name, current)
+
+    def add(self, name: str, stats: StageStats) -> None:
+        self.stages.setdefault(name, StageStats()).merge(stats)
+
+    def merge(self, other: "Metrics") -> None:
+        for name, stats in other.stages.items():
+            self.add(name, stats)
+
+    def to_dict(self) -> Dict[str, Dict[str, Any]]:
+        return {name: stats.to_dict() for name, stats in self.stages.items()}
+
+
+class BuildReport:
+    """Metrics of every character of a build by set, written with ``save`` as JSON or CSV."""
+
+    def __init__(self) -> None:
+        self.started = time.perf_counter()
+        self.finished: Optional[float] = None
+        self.sets: Dict[str, Dict[str, Metrics]] = {}
+
+    def character(self, set_name: str, character: str) -> Metrics:
+        return self.sets.setdefault(set_name, {}).setdefault(character, Metrics())
+
+    def finish(self) -> None:
+        self.finished = time.perf_counter()
+
+    @property
+    def wall(self) -> float:
+        return (self.finished or time.perf_counter()) - self.started
+
+    def set_totals(self, set_name: str) -> Metrics:
+        totals = Metrics()
+        for metrics in self.sets[set_name].values():
+            totals.merge(metrics)
+        return totals
+
+    def totals(self) -> Metrics:
+        totals = Metrics()
+        for set_name in self.sets:
+            totals.merge(self.set_totals(set_name))
+        return totals
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "version": REPORT_VERSION,
+            "wall_s": round(self.wall, 6),
+            "peak_rss_kib": {"parent": peak_rss(), "workers": peak_rss("children")},
+            "stages": self.totals().to_dict(),
+            "sets": {
+                set_name: {
+                    "stages": self.set_totals(set_name).to_dict(),
+                    "characters": {character: metrics.to_dict() for character, metrics in characters.items()},
+                }
+                for set_name, characters in self.sets.items()
+            },
+        }
+
+    def rows(self) -> Iterator[Dict[str, Any]]:
+        for stage, stats in self.totals().stages.items():
+            yield {"scope": "build", "set": "", "character": "", "stage": stage, **stats.to_dict()}
+        for set_name, characters in self.sets.items():
+            for stage, stats in self.set_totals(set_name).stages.items():
+                yield {"scope": "set", "set": set_name, "character": "", "stage": stage, **stats.to_dict()}
+            for character, metrics in characters.items():
+                for stage, stats in metrics.stages.items():
+                    yield {
+                        "scope": "character",
+                        "set": set_name,
+                        "character": character,
+                        "stage": stage,
+                        **stats.to_dict(),
+                    }
+
+    def save(self, path: Path) -> None:
+        """Write the report as CSV if ``path`` ends in .csv, as JSON otherwise."""
+        path = Path(path)
+        if path.suffix.lower() == ".csv":
+            with open(path, "w", encoding="utf-8", newline="") as file:
+                writer = csv.DictWriter(file, fieldnames=CSV_FIELDS)
+                writer.writeheader()
+                writer.writerows(self.rows())
+        else:
+            with open(path, "w", encoding="utf-8") as file:
+                json.dump(self.to_dict(), file, ensure_ascii=False, indent=1)
+
+
+@contextmanager
+def profiling(path: Optional[Path]) -> Iterator[Optional[Path]]:
+    """Profile the calling thread and yield a directory for worker profiles, all merged into ``path``.
+
+    Yields None and profiles nothing without a ``path``.
+    """
+    if path is None:
+        yield None
+        return
+
+    with tempfile.TemporaryDirectory(prefix="profile-") as workers:
+        profiler = cProfile.Profile()
+        profiler.enable()
+        try:
+            yield Path(workers)
+        finally:
+            profiler.disable()
+            stats = pstats.Stats(profiler)
+            for worker in sorted(os.listdir(workers)):
+                stats.add(os.path.join(workers, worker))
+            stats.dump_stats(str(path))
@@ -0,0 +1,178 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import base64
+import html
+from io import BytesIO
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from cursorgen.utils.cursor import CursorFrame
+from PIL import Image, features
+
+# Bump whenever the preview images produced for the same cursors change
+PREVIEW_VERSION = 1
+
+THUMB_SIZE = 320
+SHEET_CELL = 64
+SHEET_COLUMNS = 5
+SHEET_PADDING = 8
+ANIMATION_SIZE = 128
+
+# Animated preview format -> file name inside the theme
+ANIMATION_FORMATS = {"apng": "preview.apng", "webp": "preview.webp"}
+
+# Piece of the contact sheet every cursor renders, not a file of the theme
+SHEET_CELL_NAME = "cell.png"
+
+
+def webp_available() -> bool:
+    return bool(features.check("webp"))
+
+
+def thumbnail_role(roles: Iterable[str]) -> Optional[str]:
+    """The role a theme is pictured by, idle if the theme has one and else its first role."""
+    roles = list(roles)
+    if "idle" in roles:
+        return "idle"
+    return roles[0] if roles else None
+
+
+def _png(image: Image.Image) -> bytes:
+    with BytesIO() as buffer:
+        image.save(buffer, "PNG")
+        return buffer.getvalue()
+
+
+def thumbnail(frames: List[CursorFrame]) -> bytes:
+    """The first image of a cursor blown up to ``THUMB_SIZE`` square, the thumb.png of a theme."""
+    return _png(frames[0][0].image.resize((THUMB_SIZE, THUMB_SIZE), Image.Resampling.NEAREST))
+
+
+def sheet_cell(frames: List[CursorFrame]) -> bytes:
+    """The first image of a cursor fitted into a ``SHEET_CELL`` square, its picture on the contact sheet."""
+    image = frames[0][0].image.convert("RGBA")
+    # Keep the aspect ratio and integer scale where possible, cursors are pixel art
+    scale = SHEET_CELL / max(image.width, image.height)
+    width, height = max(1, int(image.width * scale)), max(1, int(image.height * scale))
+    return _png(image.resize((width, height), Image.Resampling.NEAREST))
+
+
+def contact_sheet(cells: Sequence[bytes]) -> bytes:
+    """The ``sheet_cell`` of every cursor side by side, ``SHEET_COLUMNS`` per row in the given order."""
+    rows = (len(cells) + SHEET_COLUMNS - 1) // SHEET_COLUMNS
+    columns = min(len(cells), SHEET_COLUMNS)
+    step = SHEET_CELL + SHEET_PADDING
+    sheet = Image.new("RGBA", (columns * step + SHEET_PADDING, rows * step + SHEET_PADDING))
+    for index, cell in enumerate(cells):
+        with Image.open(BytesIO(cell)) as image:
+            x = SHEET_PADDING + (index % SHEET_COLUMNS) * step + (SHEET_CELL - image.width) // 2
+            y = SHEET_PADDING + (index // SHEET_COLUMNS) * step + (SHEET_CELL - image.height) // 2
+            sheet.alpha_composite(image.convert("RGBA"), (x, y))
+    return _png(sheet)
+
+
+def animation(frames: List[CursorFrame], animation_format: str) -> bytes:
+    """Animated preview of a cursor at ``ANIMATION_SIZE`` square, in ``ANIMATION_FORMATS`` format."""
+    images = [
+        frame[0].image.convert("RGBA").resize((ANIMATION_SIZE, ANIMATION_SIZE), Image.Resampling.NEAREST)
+        for frame in frames
+    ]
+    # Viewers ignore delays below 20 ms and fall back to 100 ms, a zero jiffy rate means as fast as possible
+    durations = [max(20, int(frame.delay * 1000)) for frame in frames]
+
+    with BytesIO() as buffer:
+        if animation_format == "webp":
+            images[0].save(
+                buffer,
+                "WEBP",
+                save_all=True,
+                append_images=images[1:],
+                duration=durations,
+                loop=0,
+                lossless=True,
+            )
+        else:
+            images[0].save(
+                buffer,
+                "PNG",
+                save_all=True,
+                append_images=images[1:],
+                duration=durations,
+                loop=0,
+                blend=0,
+            )
+        return buffer.getvalue()
+
+
+def gallery_html(title: str, themes: Sequence[Tuple[str, str, bytes]]) -> str:
+    """One self-contained page showing the thumbnail of every (theme, description, thumb.png)."""
+    cards = []
+    for theme, description, thumb in themes:
+        data = base64.b64encode(thumb).decode("ascii")
+        cards.append(
+            f'<figure><img src="data:image/png;base64,{data}" alt="{html.escape(theme)}" width="96" height="96">'
+            f"<figcaption>{html.escape(description)}<br><code>{html.escape(theme)}</code></figcaption></figure>"
+        )
+    return (
+        "<!DOCTYPE html>\n"
+        f'<html><head><meta charset="utf-8"><title>{html.escape(title)}</title>\n'
+        "<style>body{font-family:sans-serif;display:flex;flex-wrap:wrap;gap:12px}"
+        "figure{width:160px;margin:0;text-align:center}img{image-rendering:pixelated}</style></head>\n"
+        "<body>\n" + "\n".join(cards) + "\n</body></html>\n"
+    )
+
+
+def preview_names(sheet: bool = False, animation_format: Optional[str] = None) -> List[str]:
+    """File names ``theme_previews`` writes with these settings."""
+    names = ["thumb.png"]
+    if sheet:
+        names.append("sheet.png")
+    if animation_format is not None:
+        names.append(ANIMATION_FORMATS[animation_format])
+    return names
+
+
+def preview_parts(
+    roles: Sequence[str], sheet: bool = False, animation_format: Optional[str] = None
+) -> Dict[str, Tuple[str, ...]]:
+    """Which pieces of the previews the cursor of every role renders, by the names of ``render_part``.
+
+    The pictured role renders the thumbnail and the animation, and every role its cell of the contact
+    sheet, so each cursor is only decoded by its conversion.
+    """
+    pictured = thumbnail_role(roles)
+    parts: Dict[str, Tuple[str, ...]] = {}
+    for role in roles:
+        names: List[str] = []
+        if role == pictured:
+            names = preview_names(False, animation_format)
+        if sheet:
+            names.append(SHEET_CELL_NAME)
+        parts[role] = tuple(names)
+    return parts
+
+
+def render_part(frames: List[CursorFrame], name: str) -> bytes:
+    """Render one piece of ``preview_parts`` from the decoded frames of a cursor."""
+    if name == "thumb.png":
+        return thumbnail(frames)
+    if name == SHEET_CELL_NAME:
+        return sheet_cell(frames)
+    for animation_format, file_name in ANIMATION_FORMATS.items():
+        if name == file_name:
+            return animation(frames, animation_format)
+    raise ValueError(f"Unknown preview part {name}")
+
+
+def theme_previews(parts: Dict[str, Dict[str, bytes]], roles: Sequence[str]) -> Dict[str, bytes]:
+    """The preview files of a theme from the pieces rendered for each role, ``roles`` in sheet order.
+
+    Roles whose cursor could not be converted are left out of the sheet.
+    """
+    files: Dict[str, bytes] = {}
+    for role_parts in parts.values():
+        files.update((name, data) for name, data in role_parts.items() if name != SHEET_CELL_NAME)
+    cells = [parts[role][SHEET_CELL_NAME] for role in roles if SHEET_CELL_NAME in parts.get(role, {})]
+    if cells:
+        files["sheet.png"] = contact_sheet(cells)
+    return files
@@ -0,0 +1,360 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import gzip
+import lzma
+import os
+import stat
+import tarfile
+import threading
+import time
+import zipfile
+from abc import ABC, abstractmethod
+from collections import deque
+from concurrent.futures import Executor, Future
+from contextlib import ExitStack
+from io import BytesIO
+from pathlib import Path
+from typing import IO, Any, Callable, Deque, Dict, List, Optional, Tuple, TypeVar, cast
+
+from CursorConverter.metrics import Metrics
+
+T = TypeVar("T")
+
+# How aliases of a role are written next to its canonical xcursor file
+LINK_MODES = ["symlink", "hardlink", "copy"]
+
+# Archive format -> file extension
+ARCHIVE_FORMATS: Dict[str, str] = {
+    "zip": ".zip",
+    "tar.gz": ".tar.gz",
+    "tar.xz": ".tar.xz",
+    "tar.zst": ".tar.zst",
+}
+
+# Used when no level is given, pinned so archives do not change with library defaults
+DEFAULT_COMPRESS_LEVELS: Dict[str, int] = {
+    "zip": 6,
+    "tar.gz": 9,
+    "tar.xz": 6,
+    "tar.zst": 3,
+}
+
+# Member timestamp when SOURCE_DATE_EPOCH is not set, 1980-01-01 UTC is the earliest a zip can hold
+DEFAULT_SOURCE_DATE_EPOCH = 315532800
+
+
+def source_date_epoch() -> int:
+    """Timestamp of every archive member, see https://reproducible-builds.org/specs/source-date-epoch/."""
+    try:
+        return max(DEFAULT_SOURCE_DATE_EPOCH, int(os.environ["SOURCE_DATE_EPOCH"]))
+    except (KeyError, ValueError):
+        return DEFAULT_SOURCE_DATE_EPOCH
+
+
+def zstd_available() -> bool:
+    try:
+        from compression import zstd  # noqa: F401
+    except ImportError:
+        try:
+            import zstandard  # noqa: F401
+        except ImportError:
+            return False
+    return True
+
+
+def _zstd_writer(fileobj: IO[bytes], level: Optional[int], threads: int) -> IO[bytes]:
+    try:
+        from compression import zstd
+
+        return cast(IO[bytes], zstd.ZstdFile(fileobj, "w", level=level))
+    except ImportError:
+        import zstandard
+
+        compressor = zstandard.ZstdCompressor(level=3 if level is None else level, threads=threads)
+        return cast(IO[bytes], compressor.stream_writer(fileobj, closefd=False))
+
+
+class ThemeWriter(ABC):
+    """Receives the files of a cursor theme as ``(arcname, bytes)`` pairs relative to the theme root."""
+
+    # Time spent writing the theme out on ``close``, for writers that do any work there
+    metrics: Optional[Metrics] = None
+
+    @abstractmethod
+    def add_file(self, arcname: str, data: bytes) -> None: ...
+
+    @abstractmethod
+    def add_symlink(self, arcname: str, target: str) -> None: ...
+
+    def add_hardlink(self, arcname: str, target: str, data: bytes) -> None:
+        self.add_file(arcname, data)
+
+    def add_xcursor(self, arcnames: List[str], data: bytes, link_mode: str = "symlink") -> None:
+        """Write ``data`` to the first arcname and link or copy it to the remaining alias arcnames."""
+        canonical, *aliases = arcnames
+        self.add_file(canonical, data)
+
+        for alias in aliases:
+            if link_mode == "symlink":
+                self.add_symlink(alias, os.path.relpath(canonical, os.path.dirname(alias)))
+            elif link_mode == "hardlink":
+                self.add_hardlink(alias, canonical, data)
+            else:
+                self.add_file(alias, data)
+
+    def close(self) -> None:
+        pass
+
+    def abort(self) -> None:
+        pass
+
+
+class DirectoryThemeWriter(ThemeWriter):
+    def __init__(self, root: Path) -> None:
+        self.root = Path(root)
+
+    def _prepare(self, arcname: str) -> Path:
+        path = self.root / arcname
+        path.parent.mkdir(parents=True, exist_ok=True)
+        if path.is_symlink() or (path.exists() and path.stat().st_nlink > 1):
+            path.unlink()
+        return path
+
+    def add_file(self, arcname: str, data: bytes) -> None:
+        self._prepare(arcname).write_bytes(data)
+
+    def add_symlink(self, arcname: str, target: str) -> None:
+        path = self._prepare(arcname)
+        if path.exists():
+            path.unlink()
+        os.symlink(target, path)
+
+    def add_hardlink(self, arcname: str, target: str, data: bytes) -> None:
+        path = self._prepare(arcname)
+        if path.exists():
+            path.unlink()
+        os.link(self.root / target, path)
+
+
+class ArchiveThemeWriter(ThemeWriter):
+    """Collects the members of an archive and writes them all at once on ``close``.
+
+    Members are written sorted by name, links after the files they may point to, with the
+    ``source_date_epoch`` timestamp and fixed permissions, so the same theme always yields the same
+    bytes whatever order its cursors were converted in. The archive is built next to its destination
+    and only moved into place by ``close``, so a failed build never leaves a truncated archive behind.
+    """
+
+    def __init__(self, archive: Path) -> None:
+        self.archive = Path(archive)
+        self.partial = self.archive.with_name(f"{self.archive.name}.part")
+        # arcname -> (kind, file content or link target), kind is one of the tarfile member types
+        self._members: Dict[str, Tuple[bytes, bytes]] = {}
+        self.metrics = Metrics()
+
+    def add_file(self, arcname: str, data: bytes) -> None:
+        self._members[arcname] = (tarfile.REGTYPE, data)
+
+    def add_symlink(self, arcname: str, target: str) -> None:
+        self._members[arcname] = (tarfile.SYMTYPE, target.encode())
+
+    def add_hardlink(self, arcname: str, target: str, data: bytes) -> None:
+        self._members[arcname] = (tarfile.LNKTYPE, target.encode())
+
+    def members(self) -> List[Tuple[str, bytes, bytes]]:
+        return sorted(
+            ((arcname, kind, data) for arcname, (kind, data) in self._members.items()),
+            key=lambda member: (member[1] != tarfile.REGTYPE, member[0]),
+        )
+
+    def _write(self, path: Path) -> None:
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        assert self.metrics is not None
+        with self.metrics.stage("archive", sum(len(data) for _, data in self._members.values())) as stage:
+            try:
+                self._write(self.partial)
+            except BaseException:
+                self.partial.unlink(missing_ok=True)
+                raise
+            stage.bytes_out = self.partial.stat().st_size
+        self._members.clear()
+        os.replace(self.partial, self.archive)
+
+    def abort(self) -> None:
+        self._members.clear()
+        self.partial.unlink(missing_ok=True)
+
+
+class ZipThemeWriter(ArchiveThemeWriter):
+    """Writes a theme into a zip archive, aliases become symlinks or copies since zip has no hardlinks."""
+
+    def __init__(self, archive: Path, compression: int = zipfile.ZIP_DEFLATED, level: Optional[int] = None) -> None:
+        super().__init__(archive)
+        self.compression = compression
+        self.level = level
+
+    def add_hardlink(self, arcname: str, target: str, data: bytes) -> None:
+        self.add_file(arcname, data)
+
+    def _write(self, path: Path) -> None:
+        date_time = time.gmtime(source_date_epoch())[:6]
+        with zipfile.ZipFile(path, "w", self.compression, compresslevel=self.level) as zipf:
+            for arcname, kind, data in self.members():
+                info = zipfile.ZipInfo(arcname, date_time=date_time)
+                info.create_system = 3
+                info.compress_type = self.compression
+                # Info-ZIP restores entries with a unix S_IFLNK mode as symlinks pointing at the entry content
+                mode = stat.S_IFLNK | 0o777 if kind == tarfile.SYMTYPE else stat.S_IFREG | 0o644
+                info.external_attr = mode << 16
+                zipf.writestr(info, data, compresslevel=self.level)
+
+
+class TarThemeWriter(ArchiveThemeWriter):
+    """Writes a theme into a compressed tarball, ``compression`` is one of gz, xz or zst.
+
+    Unlike zip, tar keeps hardlinks, and zstd can spread the compression of one archive over ``threads``.
+    """
+
+    def __init__(self, archive: Path, compression: str = "gz", level: Optional[int] = None, threads: int = 0) -> None:
+        super().__init__(archive)
+        self.compression = compression
+        self.level = level
+        self.threads = threads
+
+    def _write(self, path: Path) -> None:
+        mtime = source_date_epoch()
+        with ExitStack() as stack:
+            raw = stack.enter_context(open(path, "wb"))
+            stream: IO[bytes]
+            if self.compression == "zst":
+                stream = stack.enter_context(_zstd_writer(raw, self.level, self.threads))
+            elif self.compression == "xz":
+                stream = stack.enter_context(lzma.LZMAFile(raw, "w", preset=self.level))
+            else:
+                # Without a file name and with a fixed mtime the gzip header is the same on every build
+                gzip_file = gzip.GzipFile("", "wb", 9 if self.level is None else self.level, raw, mtime)
+                stream = cast(IO[bytes], stack.enter_context(gzip_file))
+            tar = stack.enter_context(tarfile.open(fileobj=stream, mode="w|", format=tarfile.PAX_FORMAT))
+
+            for arcname, kind, data in self.members():
+                info = tarfile.TarInfo(arcname)
+                info.type = kind
+                info.mtime = mtime
+                info.uid = info.gid = 0
+                info.uname = info.gname = ""
+                if kind == tarfile.REGTYPE:
+                    info.mode = 0o644
+                    info.size = len(data)
+                    tar.addfile(info, BytesIO(data))
+                else:
+                    info.mode = 0o777 if kind == tarfile.SYMTYPE else 0o644
+                    info.linkname = data.decode()
+                    tar.addfile(info)
+
+
+def open_archive_writer(
+    archive: Path, archive_format: str = "zip", level: Optional[int] = None, threads: int = 0
+) -> ThemeWriter:
+    """Open a writer for ``archive`` plus the extension of ``archive_format``, see ``ARCHIVE_FORMATS``.
+
+    Without a ``level`` the one of ``DEFAULT_COMPRESS_LEVELS`` is used.
+    """
+    path = archive.with_name(archive.name + ARCHIVE_FORMATS[archive_format])
+    if level is None:
+        level = DEFAULT_COMPRESS_LEVELS[archive_format]
+    if archive_format == "zip":
+        # Level 0 stores the members without compressing them
+        if level == 0:
+            return ZipThemeWriter(path, zipfile.ZIP_STORED)
+        return ZipThemeWriter(path, zipfile.ZIP_DEFLATED, level)
+    return TarThemeWriter(path, archive_format.split(".", 1)[1], level, threads)
+
+
+class BackgroundThemeWriter(ThemeWriter):
+    """Runs the calls of another writer in order on a shared thread pool.
+
+    Compression happens off the scheduling thread and several archives are compressed at once. Calls
+    of one writer are drained by at most one thread at a time, so no thread ever waits on another.
+    ``finished`` resolves once ``close`` or ``abort`` went through, with the first error if any call failed.
+    """
+
+    def __init__(self, inner: ThemeWriter, executor: Executor) -> None:
+        self.inner = inner
+        self.executor = executor
+        self.metrics = inner.metrics
+        self.finished: "Future[None]" = Future()
+        self._calls: Deque[Tuple[Callable[..., Any], Tuple[Any, ...]]] = deque()
+        self._lock = threading.Lock()
+        self._draining = False
+        self._error: Optional[BaseException] = None
+
+    def _submit(self, fn: Callable[..., Any], *args: Any) -> None:
+        with self._lock:
+            self._calls.append((fn, args))
+            if self._draining:
+                return
+            self._draining = True
+        self.executor.submit(self._drain)
+
+    def _drain(self) -> None:
+        while True:
+            with self._lock:
+                if not self._calls:
+                    self._draining = False
+                    return
+                fn, args = self._calls.popleft()
+            if self._error is not None and fn is not self._finish:
+                continue
+            try:
+                fn(*args)
+            except BaseException as e:
+                if self._error is None:
+                    self._error = e
+
+    def _finish(self, abort: bool) -> None:
+        try:
+            if abort or self._error is not None:
+                self.inner.abort()
+            else:
+                self.inner.close()
+        except BaseException as e:
+            if self._error is None:
+                self._error = e
+        if self._error is not None:
+            self.finished.set_exception(self._error)
+        else:
+            self.finished.set_result(None)
+
+    def add_file(self, arcname: str, data: bytes) -> None:
+        self._submit(self.inner.add_file, arcname, data)
+
+    def add_symlink(self, arcname: str, target: str) -> None:
+        self._submit(self.inner.add_symlink, arcname, target)
+
+    def add_hardlink(self, arcname: str, target: str, data: bytes) -> None:
+        self._submit(self.inner.add_hardlink, arcname, target, data)
+
+    def close(self) -> None:
+        self._submit(self._finish, False)
+
+    def abort(self) -> None:
+        self._submit(self._finish, True)
+
+
+class InlineExecutor(Executor):
+    """Runs every call right away in the thread that submits it.
+
+    A BackgroundThemeWriter on it compresses on the scheduling thread, for a budget without a CPU to
+    spare for compression threads.
+    """
+
+    def submit(self, __fn: Callable[..., T], *args: Any, **kwargs: Any) -> "Future[T]":
+        future: "Future[T]" = Future()
+        try:
+            future.set_result(__fn(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+        return future
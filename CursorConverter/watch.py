@@ -0,0 +1,229 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import ctypes
+import ctypes.util
+import errno
+import os
+import select
+import struct
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional, Sequence, Set, Tuple
+
+DEFAULT_DEBOUNCE = 0.2
+DEFAULT_POLL_INTERVAL = 1.0
+
+# struct inotify_event without its name, see inotify(7)
+INOTIFY_EVENT = struct.Struct("iIII")
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = os.O_CLOEXEC if hasattr(os, "O_CLOEXEC") else 0
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+    | IN_DELETE_SELF
+    | IN_MOVE_SELF
+    | IN_ONLYDIR
+)
+
+
+class Watcher:
+    """Reports the paths that changed below a set of root directories."""
+
+    def __init__(self, roots: Sequence[Path]) -> None:
+        self.roots = [Path(root) for root in roots]
+
+    def changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        """Wait up to ``timeout`` seconds, forever for None, and return the paths changed since the last call.
+
+        A changed root means anything below it may have changed, like after a lost event.
+        """
+        raise NotImplementedError()
+
+    def close(self) -> None:
+        pass
+
+    def __enter__(self) -> "Watcher":
+        return self
+
+    def __exit__(self, *exc_info: object) -> None:
+        self.close()
+
+
+class InotifyWatcher(Watcher):
+    """Linux inotify through ctypes, one watch per directory, new directories are watched as they appear."""
+
+    def __init__(self, roots: Sequence[Path]) -> None:
+        super().__init__(roots)
+        self._libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        self._fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self._fd < 0:
+            code = ctypes.get_errno()
+            raise OSError(code, f"inotify_init1: {os.strerror(code)}")
+        self._directories: Dict[int, Path] = {}
+        try:
+            for root in self.roots:
+                self._watch_tree(root)
+        except OSError:
+            self.close()
+            raise
+
+    def _watch(self, directory: Path) -> None:
+        wd = self._libc.inotify_add_watch(self._fd, os.fsencode(directory), WATCH_MASK)
+        if wd < 0:
+            code = ctypes.get_errno()
+            # Directories may vanish between listing and watching them
+            if code in (errno.ENOENT, errno.ENOTDIR):
+                return
+            raise OSError(code, f"inotify_add_watch {directory}: {os.strerror(code)}")
+        self._directories[wd] = directory
+
+    def _watch_tree(self, root: Path) -> None:
+        self._watch(root)
+        for directory, dirs, _ in os.walk(root):
+            for name in dirs:
+                self._watch(Path(directory) / name)
+
+    def _read(self) -> Set[Path]:
+        changed: Set[Path] = set()
+        while True:
+            try:
+                data = os.read(self._fd, 64 * 1024)
+            except BlockingIOError:
+                return changed
+            offset = 0
+            while offset < len(data):
+                wd, mask, _, length = INOTIFY_EVENT.unpack_from(data, offset)
+                offset += INOTIFY_EVENT.size
+                name = data[offset : offset + length].rstrip(b"\0")
+                offset += length
+
+                if mask & IN_Q_OVERFLOW:
+                    changed.update(self.roots)
+                    continue
+                directory = self._directories.get(wd)
+                if directory is None:
+                    continue
+                if mask & IN_IGNORED:
+                    del self._directories[wd]
+                    continue
+                path = directory / os.fsdecode(name) if name else directory
+                changed.add(path)
+                if mask & IN_ISDIR and mask & (IN_CREATE | IN_MOVED_TO):
+                    # Files that landed in it before the watch are covered by the directory itself being changed
+                    self._watch_tree(path)
+
+    def changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = None if deadline is None else max(0.0, deadline - time.monotonic())
+            readable, _, _ = select.select([self._fd], [], [], remaining)
+            if not readable:
+                return set()
+            changed = self._read()
+            if changed:
+                return changed
+
+    def close(self) -> None:
+        if self._fd >= 0:
+            os.close(self._fd)
+            self._fd = -1
+
+
+class PollingWatcher(Watcher):
+    """Compares the size and modification time of every file below the roots each ``interval`` seconds."""
+
+    def __init__(self, roots: Sequence[Path], interval: float = DEFAULT_POLL_INTERVAL) -> None:
+        super().__init__(roots)
+        self.interval = interval
+        self._snapshot = self._scan()
+
+    def _scan(self) -> Dict[Path, Tuple[int, int]]:
+        snapshot: Dict[Path, Tuple[int, int]] = {}
+        pending: List[Path] = list(self.roots)
+        while pending:
+            directory = pending.pop()
+            try:
+                entries = list(os.scandir(directory))
+            except OSError:
+                continue
+            for entry in entries:
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                path = Path(entry.path)
+                if entry.is_dir(follow_symlinks=False):
+                    pending.append(path)
+                    # Only the existence of directories matters, their mtime changes with every file
+                    snapshot[path] = (0, -1)
+                else:
+                    snapshot[path] = (stat.st_mtime_ns, stat.st_size)
+        return snapshot
+
+    def changes(self, timeout: Optional[float] = None) -> Set[Path]:
+        deadline = None if timeout is None else time.monotonic() + timeout
+        while True:
+            remaining = self.interval if deadline is None else min(self.interval, deadline - time.monotonic())
+            if remaining > 0:
+                time.sleep(remaining)
+            snapshot = self._scan()
+            changed = {
+                path
+                for path in snapshot.keys() | self._snapshot.keys()
+                if snapshot.get(path) != self._snapshot.get(path)
+            }
+            self._snapshot = snapshot
+            if changed or (deadline is not None and time.monotonic() >= deadline):
+                return changed
+
+
+def inotify_available() -> bool:
+    return sys.platform.startswith("linux") and hasattr(ctypes.CDLL(None), "inotify_init1")
+
+
+def open_watcher(roots: Sequence[Path], polling: bool = False, interval: float = DEFAULT_POLL_INTERVAL) -> Watcher:
+    """An inotify watcher on Linux, else or with ``polling`` one that rescans the roots every ``interval``."""
+    if not polling and inotify_available():
+        try:
+            return InotifyWatcher(roots)
+        except OSError:
+            # Out of watches (fs.inotify.max_user_watches) or inotify disabled
+            pass
+    return PollingWatcher(roots, interval)
+
+
+def debounced(watcher: Watcher, delay: float = DEFAULT_DEBOUNCE) -> Iterator[Set[Path]]:
+    """Yield the changed paths in batches, a batch ends once nothing changed for ``delay`` seconds.
+
+    Editors save through temporary files and renames, and copying a folder in is many events,
+    each of them should not start a build of its own.
+    """
+    while True:
+        paths = watcher.changes()
+        while True:
+            more = watcher.changes(delay)
+            if not more:
+                break
+            paths |= more
+        yield paths
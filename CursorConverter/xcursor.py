@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from functools import lru_cache
+from itertools import chain
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+import numpy as np
+import numpy.typing as npt
+from cursorgen.parser import XCursorParser
+from cursorgen.utils.cursor import CursorFrame
+from PIL import Image
+
+from CursorConverter.framestore import FrameStore, frame_digest, sized_digest
+
+# (chunk type, chunk subtype, chunk bytes)
+Chunk = Tuple[int, int, Union[bytes, memoryview]]
+
+
+@lru_cache(maxsize=None)
+def nearest_index(source: int, target: int) -> npt.NDArray[np.intp]:
+    """Source pixel that Pillow's NEAREST resize picks for each of ``target`` pixels along one axis.
+
+    Taken from Pillow itself by resizing a ramp, so the result is bit-exact with ``Image.resize``.
+    """
+    ramp = Image.fromarray(np.arange(source, dtype=np.int32).reshape(1, source))
+    return np.asarray(ramp.resize((target, 1), Image.Resampling.NEAREST), dtype=np.intp).reshape(target)
+
+
+@lru_cache(maxsize=None)
+def gather_index(width: int, height: int, sizes: Tuple[int, ...]) -> npt.NDArray[np.intp]:
+    """Flat pixel indices of a ``width`` x ``height`` image resized to every square size, one after another."""
+    return np.concatenate(
+        [(nearest_index(height, size)[:, None] * width + nearest_index(width, size)[None, :]).ravel() for size in sizes]
+    )
+
+
+def resample(images: List[bytes], width: int, height: int, sizes: Tuple[int, ...]) -> List[List[memoryview]]:
+    """Resize RGBA images of the same dimensions to every size at once, returns BGRA pixels per image and size."""
+    pixels = np.frombuffer(b"".join(images), dtype=np.uint8).reshape(len(images), width * height, 4)
+    # Swap to BGRA at the source resolution, then resize the whole batch with one gather of 32-bit pixels
+    bgra = np.ascontiguousarray(pixels[..., [2, 1, 0, 3]]).view(np.uint32)[..., 0]
+    resized = np.take(bgra, gather_index(width, height, sizes), axis=1).data.cast("B")
+
+    stride = 4 * sum(size * size for size in sizes)
+    views = []
+    for index in range(len(images)):
+        offset = index * stride
+        image_views = []
+        for size in sizes:
+            image_views.append(resized[offset : offset + 4 * size * size])
+            offset += 4 * size * size
+        views.append(image_views)
+    return views
+
+
+def pack(chunks: List[Chunk]) -> bytes:
+    """Write an xcursor file with a TOC entry for every chunk, in order, and every distinct chunk once.
+
+    Animations loop back to earlier frames, the TOC entries of a repeated chunk all point at its
+    first copy. Readers like libXcursor seek to each entry by its offset, so nothing else changes.
+    """
+    header = XCursorParser.FILE_HEADER.pack(
+        XCursorParser.MAGIC,
+        XCursorParser.FILE_HEADER.size,
+        XCursorParser.VERSION,
+        len(chunks),
+    )
+
+    offset = XCursorParser.FILE_HEADER.size + len(chunks) * XCursorParser.TOC_CHUNK.size
+    toc = []
+    data: List[Union[bytes, memoryview]] = []
+    # Chunk content -> its offset, the image header holds size, hotspot and delay, so equal bytes are equal images
+    offsets: Dict[Union[bytes, memoryview], int] = {}
+    for chunk_type, chunk_subtype, chunk in chunks:
+        position = offsets.get(chunk)
+        if position is None:
+            position = offsets[chunk] = offset
+            data.append(chunk)
+            offset += len(chunk)
+        toc.append(XCursorParser.TOC_CHUNK.pack(chunk_type, chunk_subtype, position))
+
+    return b"".join(chain([header], toc, data))
+
+
+def chunk_size(size: int) -> int:
+    header: int = XCursorParser.IMAGE_HEADER.size
+    return header + 4 * size * size
+
+
+def encode(frames: List[CursorFrame], sizes: Iterable[int], store: Optional[FrameStore] = None) -> Dict[int, bytes]:
+    """Encode the image chunks of every frame, returns the chunks of each size concatenated in frame order.
+
+    Every distinct image is decoded once and resized to all sizes in one NumPy gather, images repeated
+    by the animation sequence are resized only the first time. With a ``store`` images that any file
+    of any theme resized before are taken from it, and the others are added to it.
+    """
+    size_order = tuple(set(sizes))
+
+    # Distinct images by content, the resized pixels of each in ``size_order``
+    resized: Dict[Tuple[int, int, bytes], List[memoryview]] = {}
+    digests: Dict[Tuple[int, int, bytes], List[bytes]] = {}
+    entries = []
+    for frame in frames:
+        delay = int(frame.delay * 1000)
+        for cursor in frame:
+            image = cursor.image if cursor.image.mode == "RGBA" else cursor.image.convert("RGBA")
+            key = (image.width, image.height, image.tobytes())
+            if key not in digests:
+                digests[key] = []
+                if store is not None:
+                    image_digest = frame_digest(*key)
+                    digests[key] = [sized_digest(image_digest, size) for size in size_order]
+                    stored = [store.get(digest) for digest in digests[key]]
+                    if all(pixels is not None for pixels in stored):
+                        resized[key] = stored  # type: ignore[assignment]
+            entries.append((key, cursor.hotspot, delay))
+
+    # The remaining images grouped by dimensions, so each group is resampled as one batch
+    groups: Dict[Tuple[int, int], List[Tuple[int, int, bytes]]] = {}
+    for key in digests:
+        if key not in resized:
+            groups.setdefault(key[:2], []).append(key)
+    for dims, keys in groups.items():
+        for key, pixels in zip(keys, resample([key[2] for key in keys], *dims, size_order)):
+            resized[key] = pixels
+            if store is not None:
+                for digest, data in zip(digests[key], pixels):
+                    store.put(digest, data)
+
+    pieces: Dict[int, List[Union[bytes, memoryview]]] = {size: [] for size in size_order}
+    for key, (hx, hy), delay in entries:
+        width, height, _ = key
+        for size, data in zip(size_order, resized[key]):
+            scale_factor = size / max(width, height)
+            header = XCursorParser.IMAGE_HEADER.pack(
+                XCursorParser.IMAGE_HEADER.size,
+                XCursorParser.CHUNK_IMAGE,
+                size,
+                1,
+                size,
+                size,
+                int(hx * scale_factor),
+                int(hy * scale_factor),
+                delay,
+            )
+            pieces[size] += (header, data)
+
+    return {size: b"".join(size_pieces) for size, size_pieces in pieces.items()}
+
+
+def assemble(encoded: Dict[int, bytes], sizes: Sequence[int]) -> bytes:
+    """Interleave per size chunks from ``encode`` into an xcursor file, ``encoded`` may hold more sizes."""
+    # Frame major and the sizes of a frame in set order, like to_x11
+    size_order = tuple(set(sizes))
+    views = {size: memoryview(encoded[size]) for size in size_order}
+    counts = {len(views[size]) // chunk_size(size) for size in size_order}
+    if len(counts) != 1:
+        raise ValueError("Encoded sizes disagree on the number of frames")
+
+    chunks: List[Chunk] = []
+    for index in range(counts.pop()):
+        for size in size_order:
+            length = chunk_size(size)
+            chunks.append((XCursorParser.CHUNK_IMAGE, size, views[size][index * length : (index + 1) * length]))
+    return pack(chunks)
+
+
+def to_xcursor(frames: List[CursorFrame], sizes: Sequence[int]) -> bytes:
+    """The same images as ``cursorgen.writer.to_x11``, with far less pixel work and repeated chunks stored once."""
+    return assemble(encode(frames, sizes), sizes)
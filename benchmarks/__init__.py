@@ -0,0 +1,4 @@
+"""Benchmarks of the cursor conversion over fixed slices of CursorConverter/Assets/win.
+
+See ``python -m benchmarks -h``.
+"""
@@ -0,0 +1,333 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import argparse
+import fnmatch
+import json
+import logging
+import os
+import platform
+import statistics
+import sys
+import tempfile
+import time
+from functools import partial
+from importlib.metadata import PackageNotFoundError, version
+from pathlib import Path
+from typing import Any, Callable, Dict, List, NamedTuple, Optional
+
+from cursorgen.parser import open_blob
+from cursorgen.utils.cursor import CursorFrame
+
+from CursorConverter.converter import (
+    SIZE_PROFILES,
+    list_files,
+    load_definitions,
+    load_matcher,
+    rename_files,
+    theme_mapping,
+)
+from CursorConverter.cpus import available_cpus
+from CursorConverter.theme import DirectoryThemeWriter, ZipThemeWriter
+from CursorConverter.xcursor import to_xcursor
+
+repo_root = Path(__file__).resolve().parents[1]
+assets_dir = repo_root / "CursorConverter" / "Assets" / "win"
+baselines_dir = Path(__file__).resolve().parent / "baselines"
+
+BASELINE_VERSION = 1
+DEFAULT_THRESHOLD = 0.25
+# Shortest sample of a benchmark in seconds
+MIN_SAMPLE_TIME = 0.2
+# A slowdown per run below this many seconds is timer and scheduler noise, whatever its ratio
+MIN_REGRESSION_TIME = 0.01
+
+
+class Slice(NamedTuple):
+    """The first ``characters`` theme directories below ``path``, by name."""
+
+    path: str
+    file_format: str
+    characters: int
+
+    def directories(self) -> List[Path]:
+        root = assets_dir / self.path
+        return sorted(path for path in root.iterdir() if path.is_dir())[: self.characters]
+
+
+# Small static themes, heavy animated themes and their role names from two different renaming schemes
+SLICES: Dict[str, Slice] = {
+    "static-cur": Slice("艦これ　3弾　マウスカーソル/静止画", "cur", 4),
+    "eva-ani": Slice("エヴァンゲリヲン/アニメーション", "ani", 3),
+    "kancolle-ani": Slice("艦これ　マウスカーソル", "ani", 3),
+}
+
+# process_cursors.py from cursor_data.json to archives, without the conversion cache
+END_TO_END_SET = "東方マウスカーソル　1～10"
+
+
+class Result(NamedTuple):
+    seconds: float
+    files: int
+    # Median time per run of the samples, ``seconds`` is the best one
+    median_seconds: Optional[float] = None
+
+    @property
+    def throughput(self) -> float:
+        return self.files / self.seconds if self.seconds else 0.0
+
+
+def best_of(repeat: int, files: int, run: Callable[[], Any], min_time: float = MIN_SAMPLE_TIME) -> Result:
+    """Best and median time per run of ``repeat`` samples, the best is the least disturbed by the machine.
+
+    A sample calls ``run`` until it took ``min_time`` in total, so short benchmarks are not just timer noise.
+    """
+    times = []
+    for _ in range(repeat):
+        runs = 0
+        started = time.perf_counter()
+        while True:
+            run()
+            runs += 1
+            elapsed = time.perf_counter() - started
+            if elapsed >= min_time:
+                break
+        times.append(elapsed / runs)
+    return Result(min(times), files, statistics.median(times))
+
+
+def encode_all(frames: Dict[Path, List[CursorFrame]], sizes: List[int]) -> List[bytes]:
+    return [to_xcursor(cursor, sizes) for cursor in frames.values()]
+
+
+def slice_benchmarks(name: str, corpus: Slice, repeat: int) -> Dict[str, Result]:
+    rename_map, _ = load_definitions()
+    matcher = load_matcher()
+    mapping = theme_mapping()
+
+    themes = []
+    for directory in corpus.directories():
+        files = sorted(list_files(directory, corpus.file_format))
+        themes.append((directory, files, {path: path.read_bytes() for path in files}))
+    count = sum(len(files) for _, files, _ in themes)
+
+    results = {}
+    results[f"{name}/rename_files"] = best_of(
+        repeat,
+        count,
+        lambda: [rename_files(files, directory, rename_map, matcher) for directory, files, _ in themes],
+    )
+    results[f"{name}/open_blob"] = best_of(
+        repeat, count, lambda: [open_blob(blob) for _, _, blobs in themes for blob in blobs.values()]
+    )
+
+    frames = {path: open_blob(blob).frames for _, _, blobs in themes for path, blob in blobs.items()}
+    for profile, sizes in SIZE_PROFILES.items():
+        results[f"{name}/xcursor[{profile}]"] = best_of(repeat, count, partial(encode_all, frames, sizes))
+
+    # Theme contents as the scheduler hands them to a writer, every role with its aliases
+    outputs = []
+    for directory, files, _ in themes:
+        old_path, new_path, _ = rename_files(files, directory, rename_map, matcher)
+        theme = []
+        for (_, source), (new_name, _) in zip(old_path, new_path):
+            role = os.path.splitext(new_name)[0]
+            if role in mapping:
+                theme.append((mapping[role], to_xcursor(frames[Path(source)], SIZE_PROFILES["standard"])))
+        outputs.append(theme)
+
+    def write_directories(link_mode: str) -> None:
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            for index, theme in enumerate(outputs):
+                writer = DirectoryThemeWriter(Path(tmp) / str(index))
+                for arcnames, blob in theme:
+                    writer.add_xcursor(arcnames, blob, link_mode)
+                writer.close()
+
+    def write_archives() -> None:
+        with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+            for index, theme in enumerate(outputs):
+                writer = ZipThemeWriter(Path(tmp) / f"{index}.zip")
+                for arcnames, blob in theme:
+                    writer.add_xcursor(arcnames, blob)
+                writer.close()
+
+    results[f"{name}/write[symlink]"] = best_of(repeat, count, lambda: write_directories("symlink"))
+    results[f"{name}/write[copy]"] = best_of(repeat, count, lambda: write_directories("copy"))
+    results[f"{name}/archive[zip]"] = best_of(repeat, count, write_archives)
+    return results
+
+
+def end_to_end_benchmark(jobs: int) -> Dict[str, Result]:
+    """One cold build of ``END_TO_END_SET`` with process_cursors.py, measured once since it takes a while."""
+    import process_cursors
+
+    cursor_data = process_cursors.load_cursor_data(repo_root / "CursorConverter" / "config" / "cursor_data.json")
+    cursor_sets = process_cursors.extract_cursor_sets(cursor_data, [END_TO_END_SET])
+    count = 0
+    config = process_cursors.AppConfig(repo_root, repo_root / "CursorConverter", Path(), jobs)
+    for cursor_set in cursor_sets:
+        for character_jp, character_data in cursor_set.characters.items():
+            input_dir = process_cursors.resolve_input_dir(config, character_jp, character_data)
+            count += len(list_files(input_dir, process_cursors.detect_file_format(input_dir)))
+
+    with tempfile.TemporaryDirectory(prefix="bench-") as tmp:
+        config.dist_dir = Path(tmp)
+        result = best_of(1, count, lambda: process_cursors.process_cursor_data(config, [END_TO_END_SET]), 0)
+    return {f"process_cursors[{END_TO_END_SET}]": result}
+
+
+def machine() -> Dict[str, Any]:
+    packages: Dict[str, Optional[str]] = {}
+    for package in ("cursorgen", "pillow", "numpy"):
+        try:
+            packages[package] = version(package)
+        except PackageNotFoundError:
+            packages[package] = None
+    return {
+        "platform": platform.platform(),
+        "python": platform.python_version(),
+        "cpus": os.cpu_count(),
+        "packages": packages,
+    }
+
+
+def save_baseline(path: Path, results: Dict[str, Result]) -> None:
+    data = {
+        "version": BASELINE_VERSION,
+        "machine": machine(),
+        "results": {
+            name: {
+                "seconds": round(result.seconds, 6),
+                "median_seconds": None if result.median_seconds is None else round(result.median_seconds, 6),
+                "files": result.files,
+                "throughput": round(result.throughput, 3),
+            }
+            for name, result in results.items()
+        },
+    }
+    path.parent.mkdir(parents=True, exist_ok=True)
+    with open(path, "w", encoding="utf-8") as file:
+        json.dump(data, file, ensure_ascii=False, indent=1)
+        file.write("\n")
+
+
+def compare(baseline_path: Path, results: Dict[str, Result], threshold: float) -> List[str]:
+    """Print every result against the baseline, returns the benchmarks whose throughput dropped past ``threshold``.
+
+    Both the best and the median run have to be slower by ``threshold`` and the best run by at least
+    ``MIN_REGRESSION_TIME``, a single disturbed sample or a few milliseconds on a short benchmark are noise.
+    Baselines without medians, from before they were recorded, compare the best runs only.
+    """
+    with open(baseline_path, "r", encoding="utf-8") as file:
+        baseline = json.load(file)
+    if baseline.get("version") != BASELINE_VERSION:
+        raise ValueError(f"Unsupported baseline version {baseline.get('version')} in {baseline_path}")
+    if baseline["machine"] != machine():
+        # Timings of another machine, Python or library version say nothing about this build
+        raise ValueError(
+            f"{baseline_path} was recorded on {baseline['machine']}, not on {machine()}, record a baseline here first"
+        )
+
+    regressions = []
+    for name, result in results.items():
+        reference = baseline["results"].get(name)
+        if reference is None:
+            print(f"{name:<40} {result.throughput:>10.1f} files/s  (not in baseline)")
+            continue
+        ratio = result.throughput / reference["throughput"] if reference["throughput"] else 1.0
+        median_ratio = ratio
+        if result.median_seconds and reference.get("median_seconds"):
+            median_ratio = reference["median_seconds"] / result.median_seconds
+        status = ""
+        if ratio < 1 - threshold:
+            if median_ratio < 1 - threshold and result.seconds - reference["seconds"] >= MIN_REGRESSION_TIME:
+                status = "  REGRESSION"
+                regressions.append(name)
+            else:
+                status = "  (noise)"
+        print(f"{name:<40} {result.throughput:>10.1f} files/s  {ratio:>6.2f}x of {reference['throughput']:.1f}{status}")
+    return regressions
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Benchmark the cursor conversion over fixed slices of the assets")
+    parser.add_argument(
+        "--only",
+        action="append",
+        metavar="pattern",
+        help="Only run benchmarks whose name matches this glob, like 'eva-ani/*' (can be repeated)",
+    )
+    parser.add_argument(
+        "--repeat",
+        type=int,
+        default=3,
+        help="Samples per benchmark, the best one counts and the median confirms a regression",
+    )
+    parser.add_argument(
+        "-j",
+        "--jobs",
+        type=int,
+        default=available_cpus(),
+        help="Workers of the end to end build, defaults to the CPUs available to this process",
+    )
+    parser.add_argument(
+        "--no-end-to-end",
+        action="store_true",
+        help=f"Skip the cold process_cursors.py build of {END_TO_END_SET}",
+    )
+    parser.add_argument(
+        "--save",
+        type=Path,
+        metavar="baseline",
+        help=f"Store the results as a baseline, like {baselines_dir.relative_to(repo_root)}/<machine>.json, "
+        "baselines are not committed since they only hold for the machine they were recorded on",
+    )
+    parser.add_argument(
+        "--compare",
+        type=Path,
+        metavar="baseline",
+        help="Compare against a baseline of this machine, exits with 1 if any throughput regressed past the threshold",
+    )
+    parser.add_argument(
+        "--threshold",
+        type=float,
+        default=DEFAULT_THRESHOLD,
+        help=f"Allowed throughput drop against the baseline, default is {DEFAULT_THRESHOLD:.0%}, "
+        f"slowdowns under {MIN_REGRESSION_TIME * 1000:g} ms per run never count",
+    )
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.WARNING)
+    os.environ.setdefault("TQDM_DISABLE", "1")
+
+    def selected(name: str) -> bool:
+        return not args.only or any(fnmatch.fnmatchcase(name, pattern) for pattern in args.only)
+
+    results: Dict[str, Result] = {}
+    for name, corpus in SLICES.items():
+        # A slice runs if any pattern can match one of its benchmarks
+        if not args.only or any(fnmatch.fnmatchcase(name, pattern.split("/")[0]) for pattern in args.only):
+            results.update(slice_benchmarks(name, corpus, args.repeat))
+    if not args.no_end_to_end and selected(f"process_cursors[{END_TO_END_SET}]"):
+        results.update(end_to_end_benchmark(args.jobs))
+    results = {name: result for name, result in results.items() if selected(name)}
+
+    regressions: Optional[List[str]] = None
+    if args.compare is not None:
+        regressions = compare(args.compare, results, args.threshold)
+    else:
+        for name, result in results.items():
+            print(f"{name:<40} {result.throughput:>10.1f} files/s  {result.seconds:.3f} s for {result.files} files")
+
+    if args.save is not None:
+        save_baseline(args.save, results)
+        print(f"Baseline written to {args.save}")
+
+    if regressions:
+        print(f"{len(regressions)} benchmarks regressed by more than {args.threshold:.0%}: {', '.join(regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
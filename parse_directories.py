@@ -1,32 +1,149 @@
+import argparse
 import json
-import os
-import shutil
 import sys
-from glob import glob
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
 
+from CursorConverter.cache import default_cache_dir
+from CursorConverter.catalog import CATALOG_NAME, AssetCatalog
+
+repo_root = Path(__file__).resolve().parent
 root_dir = "CursorConverter/Assets/win"
-all_dirs = glob(root_dir + "/**/*", recursive=True)
-
-print(all_dirs)
-final_dict = {}
-for directory in all_dirs:
-    if os.path.isdir(directory) and len(glob(directory + "/*.ani")) and not directory.endswith("アニメーション"):
-        print(directory)
-        print("root_name", directory.split("CursorConverter/Assets/win/")[-1].split("/")[0])
-        print("directory in root:", directory.split("/")[-1])
-
-        root_name = directory.split("CursorConverter/Assets/win/")[-1].split("/")[0]
-        directory_name = directory.split("/")[-1]
-        if root_name not in final_dict:
-            final_dict[root_name] = {}
-        final_dict[root_name][directory_name] = {
-            "path": directory.rsplit("/", 1)[0],
+cursor_data_json = repo_root / "CursorConverter" / "config" / "cursor_data.json"
+
+ANIMATED_DIR_NAME = "アニメーション"
+STILL_DIR_NAME = "静止画"
+# Words that name a directory after one variant of the cursors in it, like アルベド　静止画 or 艦これ　静止画
+STILL_NAMES = (STILL_DIR_NAME, "静画")
+VARIANT_NAMES = (ANIMATED_DIR_NAME, *STILL_NAMES)
+
+
+def variant_character(name: str) -> Optional[str]:
+    """The rest of a directory name with a variant word in it, ``None`` for other directories."""
+    for variant in VARIANT_NAMES:
+        if variant in name:
+            return name.replace(variant, "").strip(" \u3000")
+    return None
+
+
+def character_directory(relative: str) -> Tuple[str, str, str]:
+    """Return the set name, character name and character path of a cursor directory below root_dir.
+
+    The character path is the directory of the character itself, holding its cursors or the
+    アニメーション and 静止画 directories with them, which ``resolve_input_dir`` looks into.
+    Variant words are left out of the character name, アルベド　静止画 is a variant of アルベド.
+    """
+    parts = relative.split("/")
+    # A character may keep its cursors in アニメーション and 静止画 directories of its own
+    if parts[-1] in (ANIMATED_DIR_NAME, STILL_DIR_NAME) and len(parts) > 1:
+        parts = parts[:-1]
+    names = [parts[0]]
+    for part in parts[1:]:
+        character = variant_character(part)
+        names.append(part if character is None else character)
+    names = [name for name in names if name]
+    return names[0], names[-1], "/".join([root_dir, *parts])
+
+
+def is_still(relative: str) -> bool:
+    return any(still in part for part in relative.split("/")[1:] for still in STILL_NAMES)
+
+
+def known_characters(cursor_data: Dict[str, Any]) -> Set[Tuple[str, str]]:
+    known = set()
+    for set_name, entries in cursor_data.items():
+        # A set may also be a single character written without the character level
+        if "path" in entries:
+            known.add((set_name, set_name))
+        else:
+            known.update((set_name, character) for character in entries)
+    return known
+
+
+def merge_catalog(cursor_data: Dict[str, Any], catalog: AssetCatalog) -> List[str]:
+    """Add a placeholder entry for every character cursor_data.json does not know yet.
+
+    Existing entries are never touched. A character with both animated and still cursors is added
+    once, with its animated ones, and still cursors of a character some set already has are not
+    added at all. Returns the added directories.
+    """
+    known = known_characters(cursor_data)
+    known_names = {character for _, character in known}
+    found: Dict[Tuple[str, str], Tuple[str, str]] = {}
+    for relative in catalog.cursor_directories():
+        if relative == ".":
+            continue
+        set_name, directory_name, path = character_directory(relative)
+        if (set_name, directory_name) in known or (is_still(relative) and directory_name in known_names):
+            continue
+        key = (set_name, directory_name)
+        if key not in found or (catalog.files(relative, ".ani") and not catalog.files(found[key][0], ".ani")):
+            found[key] = (relative, path)
+
+    added = []
+    for (set_name, directory_name), (relative, path) in found.items():
+        entries = cursor_data.setdefault(set_name, {})
+        if "path" in entries:
+            print(f"Skipping {relative}: {set_name} is a single character set")
+            continue
+
+        entries[directory_name] = {
+            "path": path,
             "name": directory_name,
             "en_name": "example",
-            "character_name": "example",  # usually will be directory name
+            "character_name": directory_name,
             "en_character_name": "example",
             "short_character_name": "example",
         }
+        added.append(relative)
+    return added
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description="Index the cursor assets and add new directories to cursor_data.json")
+    parser.add_argument(
+        "--index",
+        type=Path,
+        default=default_cache_dir() / CATALOG_NAME,
+        help="Asset index, only files whose size or mtime changed are hashed again",
+    )
+    parser.add_argument(
+        "--cursor-data",
+        type=Path,
+        default=cursor_data_json,
+        help="cursor_data.json to merge new directories into",
+    )
+    parser.add_argument(
+        "--dry-run",
+        action="store_true",
+        help="Only print the directories that would be added",
+    )
+    args = parser.parse_args()
+
+    root = repo_root / root_dir
+    catalog, stats = AssetCatalog.scan(root, AssetCatalog.load(args.index, root))
+    catalog.save(args.index)
+    print(
+        f"Indexed {stats.files} files in {len(catalog.directories)} directories: "
+        f"{stats.hashed} hashed, {stats.reused} unchanged, {stats.removed} removed"
+    )
+
+    with open(args.cursor_data, "r", encoding="utf-8") as file:
+        cursor_data = json.load(file)
+
+    added = merge_catalog(cursor_data, catalog)
+    for relative in added:
+        print(f"New cursor directory: {relative}")
+    if not added:
+        print("cursor_data.json already covers every cursor directory")
+        return
+    if args.dry_run:
+        sys.exit(1)
+
+    with open(args.cursor_data, "wb") as f:
+        f.write((json.dumps(cursor_data, ensure_ascii=False, indent=2) + "\n").encode("utf8"))
+    print(f"Added {len(added)} placeholder entries to {args.cursor_data}, fill in their english names")
+
 
-with open("output.json", "wb") as f:
-    f.write(json.dumps(final_dict, ensure_ascii=False, indent=1).encode("utf8"))
+if __name__ == "__main__":
+    main()
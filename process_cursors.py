@@ -1,17 +1,68 @@
 #!/usr/bin/env python3
 # -*- coding: utf-8 -*-
 import json
-import subprocess
-import sys
-import tempfile
-import multiprocessing
-import zipfile
+import time
+import hashlib
+import itertools
+import queue
 import logging
 import argparse
 from pathlib import Path
-from typing import Dict, Any, List, NamedTuple, Optional, Set
-from dataclasses import dataclass
+from typing import Dict, Any, Iterator, List, NamedTuple, Optional, Set, Tuple
+from dataclasses import dataclass, field
+from functools import partial
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
 from tqdm import tqdm
+from CursorConverter.cache import DEFAULT_CACHE_SIZE, ConversionCache, default_cache_dir, toolchain_version
+from CursorConverter.cpus import available_cpus, split_budget, worker_count
+from CursorConverter.converter import (
+    BACKENDS,
+    BuildPlan,
+    ConversionTask,
+    DEFAULT_MAX_TASKS_PER_CHILD,
+    DEFAULT_SIZES,
+    DEFAULT_TASK_TIMEOUT,
+    SIZE_PROFILES,
+    DEFINITIONS_JP_JSON,
+    DEFINITIONS_JSON,
+    RecyclingPool,
+    TaskResult,
+    create_pool,
+    list_files,
+    load_definitions,
+    load_matcher,
+    parse_sizes,
+    plan_theme,
+    prepare_theme,
+    process,
+    theme_files,
+    write_previews,
+    write_result,
+)
+from CursorConverter.metrics import BuildReport, Metrics, profiling
+from CursorConverter.preview import ANIMATION_FORMATS, gallery_html, theme_previews, webp_available
+from CursorConverter.manifest import (
+    CHECKSUMS_NAME,
+    JOURNAL_NAME,
+    MANIFEST_NAME,
+    BuildJournal,
+    BuildManifest,
+    file_digest,
+    read_checksums,
+    theme_fingerprint,
+    write_atomic,
+    write_checksums,
+)
+from CursorConverter.watch import DEFAULT_DEBOUNCE, debounced, open_watcher
+from CursorConverter.theme import (
+    ARCHIVE_FORMATS,
+    LINK_MODES,
+    BackgroundThemeWriter,
+    InlineExecutor,
+    ThemeWriter,
+    open_archive_writer,
+    zstd_available,
+)
 
 class CharacterData(NamedTuple):
     en_name: str
@@ -28,17 +79,25 @@ class ProcessResult(NamedTuple):
     success: bool
     error_msg: Optional[str] = None
 
+class FileError(NamedTuple):
+    """A cursor file, or the previews, that could not be converted, its theme is built without it."""
+    theme: str
+    file: str
+    error: str
+
 class ProcessStats(NamedTuple):
     successful: int
     failed: int
+    skipped: int = 0
+    errors: Tuple[FileError, ...] = ()
 
     @property
     def total(self) -> int:
-        return self.successful + self.failed
+        return self.successful + self.failed + self.skipped
 
     @property
     def success_rate(self) -> float:
-        return self.successful / self.total * 100 if self.total > 0 else 0.0
+        return (self.successful + self.skipped) / self.total * 100 if self.total > 0 else 0.0
 
 @dataclass
 class AppConfig:
@@ -47,6 +106,29 @@ class AppConfig:
     dist_dir: Path
     num_jobs: int
     verbose: bool = False
+    cache: Optional[ConversionCache] = None
+    incremental: bool = False
+    link_mode: str = "symlink"
+    backend: str = "xcursor"
+    sizes: List[int] = field(default_factory=lambda: list(DEFAULT_SIZES))
+    archive_format: str = "zip"
+    compress_level: Optional[int] = None
+    archive_jobs: int = 1
+    preview_sheet: bool = False
+    preview_animation: Optional[str] = None
+    gallery: bool = False
+    previous_checksums: Optional[Path] = None
+    report: Optional[Path] = None
+    profile: Optional[Path] = None
+    resume: bool = False
+    task_timeout: Optional[float] = DEFAULT_TASK_TIMEOUT
+    max_tasks_per_child: Optional[int] = DEFAULT_MAX_TASKS_PER_CHILD
+
+@dataclass
+class BuildChanges:
+    skipped: List[str] = field(default_factory=list)
+    rebuilt: List[str] = field(default_factory=list)
+    deleted: List[str] = field(default_factory=list)
 
 # Initialize logger
 logger = logging.getLogger(__name__)
@@ -59,22 +141,6 @@ def setup_logger(verbose: bool = False) -> None:
         handlers=[logging.StreamHandler()]
     )
 
-def create_cursor_archive(source_dir: Path, archive_name: Path) -> bool:
-    try:
-        all_files: List[Path] = [
-            file_path for file_path in source_dir.rglob("*")
-            if file_path.is_file()
-        ]
-
-        with zipfile.ZipFile(archive_name.with_suffix(".zip"), "w", zipfile.ZIP_DEFLATED) as zipf:
-            for file_path in tqdm(all_files, desc="Zipping files"):
-                arcname = file_path.relative_to(source_dir)
-                zipf.write(file_path, arcname)
-        return True
-    except Exception as e:
-        logger.error(f"Error creating archive: {e}")
-        return False
-
 def load_cursor_data(json_path: Path) -> Dict[str, Dict[str, Dict[str, Any]]]:
     try:
         with json_path.open("r", encoding="utf-8") as f:
@@ -86,177 +152,825 @@ def load_cursor_data(json_path: Path) -> Dict[str, Dict[str, Dict[str, Any]]]:
         logger.error(f"Invalid JSON in cursor data file: {e}")
         raise
 
-def extract_touhou_sets(cursor_data: Dict[str, Any]) -> List[CursorSet]:
-    touhou_set_names = [
-        "東方マウスカーソル　1～10",
-        "東方マウスカーソル　11～20",
-        "東方マウスカーソル　20～31"
-    ]
+TOUHOU_SET_NAMES: List[str] = [
+    "東方マウスカーソル　1～10",
+    "東方マウスカーソル　11～20",
+    "東方マウスカーソル　20～31"
+]
+
+# Most sets ship both an animated and a static variant of every character
+ANIMATED_DIR_NAME = "アニメーション"
+STILL_DIR_NAME = "静止画"
 
+# With --gallery every theme thumbnail is kept below dist for the gallery page
+PREVIEW_DIR_NAME = "previews"
+GALLERY_NAME = "gallery.html"
+
+# Archives whose digest differs from --previous-checksums, one name per line
+CHANGED_NAME = "changed.txt"
+
+# Seconds on top of the task timeouts before the workers of a task without a result are restarted
+WATCHDOG_GRACE = 30.0
+
+def _character_data(char_dict: Dict[str, Any]) -> CharacterData:
+    return CharacterData(
+        en_name=char_dict["en_name"],
+        short_character_name=char_dict["short_character_name"],
+        path=char_dict["path"]
+    )
+
+def extract_cursor_sets(
+        cursor_data: Dict[str, Any],
+        set_names: Optional[List[str]] = None,
+        character_names: Optional[List[str]] = None
+) -> List[CursorSet]:
+    """Convert cursor_data.json into CursorSets, optionally filtered by set and character.
+
+    Characters can be selected by their japanese key, en_name or short_character_name.
+    """
+    wanted_characters: Optional[Set[str]] = set(character_names) if character_names else None
     result: List[CursorSet] = []
 
-    for set_name in touhou_set_names:
-        if set_name in cursor_data:
-            # Convert dictionary to CharacterData named tuples
-            characters: Dict[str, CharacterData] = {}
-            for char_jp, char_dict in cursor_data[set_name].items():
-                characters[char_jp] = CharacterData(
-                    en_name=char_dict["en_name"],
-                    short_character_name=char_dict["short_character_name"],
-                    path=char_dict["path"]
-                )
+    for set_name in set_names if set_names is not None else list(cursor_data):
+        if set_name not in cursor_data:
+            logger.warning(f"Cursor set not found in cursor data: {set_name}")
+            continue
+
+        entries: Dict[str, Any] = cursor_data[set_name]
+        # A set may also be a single character written without the character level
+        if "path" in entries:
+            entries = {set_name: entries}
+
+        # Convert dictionary to CharacterData named tuples
+        characters: Dict[str, CharacterData] = {}
+        for char_jp, char_dict in entries.items():
+            character = _character_data(char_dict)
+            if wanted_characters is not None and not wanted_characters & {
+                char_jp, character.en_name, character.short_character_name
+            }:
+                continue
+            characters[char_jp] = character
+
+        if characters:
             result.append(CursorSet(name=set_name, characters=characters))
 
     return result
 
-def process_character(
+def resolve_input_dir(config: AppConfig, character_jp: str, character_data: CharacterData) -> Path:
+    set_dir = config.repo_root / character_data.path
+    candidates: List[Path] = [set_dir / character_jp, set_dir / ANIMATED_DIR_NAME / character_jp]
+    if set_dir.name == character_jp:
+        candidates.append(set_dir / ANIMATED_DIR_NAME)
+    # Characters that only come with still cursors
+    candidates.append(set_dir / STILL_DIR_NAME / character_jp)
+    if set_dir.name == character_jp:
+        candidates.append(set_dir / STILL_DIR_NAME)
+    # An entry may also point at the directory of its cursors
+    candidates.append(set_dir)
+
+    for candidate in candidates:
+        # A character directory that only holds アニメーション and 静止画 is not the one with the cursors
+        if candidate.is_dir() and has_cursors(candidate):
+            return candidate
+    raise FileNotFoundError(f"Input directory for {character_jp} not found in {set_dir}")
+
+def has_cursors(directory: Path) -> bool:
+    return any(list_files(directory, file_format) for file_format in ("ani", "cur"))
+
+def detect_file_format(input_dir: Path) -> str:
+    return "ani" if list_files(input_dir, "ani") else "cur"
+
+def count_tasks(config: AppConfig, cursor_sets: List[CursorSet]) -> int:
+    """Upper bound of the pool tasks of ``cursor_sets``, one per cursor file.
+
+    Up to date characters of an incremental build are counted too, finding them means hashing every input.
+    """
+    tasks = 0
+    for cursor_set in cursor_sets:
+        for character_jp, character_data in cursor_set.characters.items():
+            try:
+                input_dir = resolve_input_dir(config, character_jp, character_data)
+            except FileNotFoundError:
+                continue
+            tasks += len(list_files(input_dir, detect_file_format(input_dir)))
+    return tasks
+
+def assign_theme_names(cursor_sets: List[CursorSet]) -> Dict[Tuple[str, str], str]:
+    """Give every character a unique theme name so archives never overwrite each other."""
+    names: Dict[Tuple[str, str], str] = {}
+    seen: Dict[str, int] = {}
+
+    for cursor_set in cursor_sets:
+        for character_jp, character_data in cursor_set.characters.items():
+            name = character_data.short_character_name
+            seen[name] = seen.get(name, 0) + 1
+            if seen[name] > 1:
+                logger.warning(f"Duplicate theme name '{name}' for {character_jp}, using '{name} {seen[name]}'")
+                name = f"{name} {seen[name]}"
+            names[(cursor_set.name, character_jp)] = name
+
+    return names
+
+def catalog_theme_names(cursor_data: Dict[str, Any]) -> Dict[Tuple[str, str], str]:
+    """Theme names of every character of cursor_data.json, a build of some sets names them like a full one."""
+    return assign_theme_names(extract_cursor_sets(cursor_data))
+
+@dataclass
+class CharacterJob:
+    set_name: str
+    character_jp: str
+    character_data: CharacterData
+    theme_name: str
+    writer: ThemeWriter
+    pending: int = 0
+    error_msg: Optional[str] = None
+    fingerprint: Optional[Dict[str, Any]] = None
+    plan: Optional[BuildPlan] = None
+    metrics: Metrics = field(default_factory=Metrics)
+    converted: int = 0
+    errors: List[FileError] = field(default_factory=list)
+    # Role -> the preview pieces its task rendered
+    previews: Dict[str, Dict[str, bytes]] = field(default_factory=dict)
+
+def character_fingerprint(
         config: AppConfig,
         character_jp: str,
-        character_data: CharacterData
-) -> ProcessResult:
-    try:
-        character_en = character_data.en_name
-        character_name = character_data.short_character_name
+        character_data: CharacterData,
+        theme_name: str,
+        input_dir: Path,
+        file_format: str
+) -> Dict[str, Any]:
+    """The inputs, the cursor_data.json entry and the settings a character archive is built from."""
+    fingerprint = theme_fingerprint(
+        list_files(input_dir, file_format),
+        [DEFINITIONS_JSON, DEFINITIONS_JP_JSON],
+        config.sizes,
+    )
+    fingerprint["character"] = {"jp_name": character_jp, **character_data._asdict()}
+    # index.theme and manifest.hl as written, their names and comments come from the entry
+    fingerprint["metadata"] = {
+        filename: hashlib.sha256(content.encode()).hexdigest()
+        for filename, content in theme_files(theme_name, character_data.en_name, config.backend).items()
+    }
+    fingerprint["archive"] = [config.archive_format, config.compress_level, config.link_mode]
+    fingerprint["backend"] = config.backend
+    fingerprint["preview"] = [config.preview_sheet, config.preview_animation]
+    return fingerprint
+
+def build_settings(config: AppConfig) -> Dict[str, Any]:
+    """Everything besides the inputs that decides what a build writes, a resumed build must have the same."""
+    return {
+        "sizes": sorted(set(config.sizes)),
+        "archive": [config.archive_format, config.compress_level, config.link_mode],
+        "backend": config.backend,
+        "preview": [config.preview_sheet, config.preview_animation, config.gallery],
+        "toolchain": toolchain_version(),
+    }
+
+def archive_path(config: AppConfig, theme_name: str) -> Path:
+    return config.dist_dir / f"{theme_name}{ARCHIVE_FORMATS[config.archive_format]}"
+
+def thumbnail_path(config: AppConfig, theme_name: str) -> Path:
+    return config.dist_dir / PREVIEW_DIR_NAME / f"{theme_name}.png"
+
+def prepare_character(
+        config: AppConfig,
+        set_name: str,
+        character_jp: str,
+        character_data: CharacterData,
+        theme_name: str,
+        manifest: Optional[BuildManifest] = None,
+        executor: Optional[Executor] = None
+) -> Tuple[Optional[CharacterJob], List[Any]]:
+    """Create the conversion tasks of a character, or return no job if its archive is up to date.
+
+    With an ``executor`` the archive is compressed in the background on it.
+    """
+    metrics = Metrics()
+    with metrics.stage("plan"):
+        input_dir = resolve_input_dir(config, character_jp, character_data)
+        file_format = detect_file_format(input_dir)
+
+        fingerprint: Optional[Dict[str, Any]] = None
+        if manifest is not None:
+            fingerprint = character_fingerprint(
+                config, character_jp, character_data, theme_name, input_dir, file_format
+            )
+            if manifest.is_up_to_date(theme_name, fingerprint):
+                logger.info(f"Skipping unchanged cursor: {character_jp} ({character_data.en_name})")
+                return None, []
 
         logger.info(f"\n{'=' * 40}")
-        logger.info(f"Processing cursor: {character_jp} ({character_en})")
+        logger.info(f"Processing cursor: {character_jp} ({character_data.en_name})")
         logger.info(f"{'=' * 40}")
 
-        with tempfile.TemporaryDirectory() as process_temp_dir:
-            process_temp_path = Path(process_temp_dir)
-            input_dir = config.repo_root / character_data.path / character_jp
-
-            # Prepare command for cursor converter
-            cmd: List[str] = [
-                sys.executable,
-                "-m",
-                "CursorConverter",
-                "--prefix",
-                str(input_dir),
-                "--output",
-                str(process_temp_path),
-                "--name",
-                character_name,
-                "--comment",
-                f"{character_en}",
-                "-j",
-                str(config.num_jobs),
-            ]
-
-            if config.verbose:
-                cmd.append("-v")
+        plan = prepare_theme(
+            prefix=input_dir,
+            file_format=file_format,
+        )
+        tasks = plan.conversion_tasks(config.preview_sheet, config.preview_animation)
 
-            logger.info("Running cursor converter...")
-            subprocess.run(cmd, check=True)
+    # Converted cursors are handed to the archive as their tasks finish, it sorts them when it is closed
+    writer: ThemeWriter = open_archive_writer(
+        config.dist_dir / theme_name, config.archive_format, config.compress_level
+    )
+    if executor is not None:
+        writer = BackgroundThemeWriter(writer, executor)
+    for filename, content in theme_files(theme_name, f"{character_data.en_name}", config.backend).items():
+        writer.add_file(filename, content.encode())
 
-            with tempfile.TemporaryDirectory() as theme_temp_dir:
-                theme_temp_path = Path(theme_temp_dir)
-                cursors_dir = theme_temp_path / "cursors"
-                cursors_dir.mkdir(exist_ok=True)
+    job = CharacterJob(set_name, character_jp, character_data, theme_name, writer, len(tasks))
+    job.fingerprint = fingerprint
+    job.plan = plan
+    job.metrics = metrics
+    return job, tasks
 
-                processed_dir = process_temp_path / character_name
-                if not processed_dir.exists():
-                    raise FileNotFoundError(f"Expected processed directory {processed_dir} not found")
+def finish_character(
+        config: AppConfig,
+        job: CharacterJob,
+        manifest: Optional[BuildManifest] = None,
+        error: Optional[BaseException] = None
+) -> ProcessResult:
+    """Record the outcome of a character whose archive was closed or aborted, ``error`` is what the writer raised."""
+    character_jp = job.character_jp
+    character_en = job.character_data.en_name
+    character_name = job.theme_name
 
-                _copy_theme_files(processed_dir, theme_temp_path, cursors_dir)
+    zip_path = archive_path(config, character_name)
 
-                zip_path = config.dist_dir / f"{character_name}"
-                logger.info(f"Creating zip file: {zip_path}.zip")
-                success = create_cursor_archive(source_dir=theme_temp_path, archive_name=zip_path)
+    try:
+        if job.error_msg is not None:
+            raise RuntimeError(job.error_msg)
+        if error is not None:
+            raise error
 
-                if success:
-                    logger.info(f"Created zip file: {zip_path}.zip")
-                    return ProcessResult(character_jp, character_en, True)
-                else:
-                    error_msg = f"Failed to create zip file for {character_name}"
-                    logger.error(error_msg)
-                    return ProcessResult(character_jp, character_en, False, error_msg)
+        logger.info(f"Created archive: {zip_path}")
+        if job.errors:
+            # Left out of the manifest, so the next incremental build tries the failed files again
+            logger.warning(f"{zip_path.name} lacks {len(job.errors)} files that could not be converted")
+            if manifest is not None:
+                manifest.forget(character_name)
+        elif manifest is not None and job.fingerprint is not None:
+            manifest.record(
+                character_name,
+                job.fingerprint,
+                zip_path,
+                set=job.set_name,
+                character=character_jp,
+            )
+        return ProcessResult(character_jp, character_en, True)
 
     except Exception as e:
+        if manifest is not None:
+            manifest.forget(character_name)
         logger.error(f"Error processing {character_jp}: {e}")
         import traceback
         logger.debug(traceback.format_exc())
         return ProcessResult(character_jp, character_en, False, str(e))
 
-def _copy_theme_files(processed_dir: Path, theme_temp_path: Path, cursors_dir: Path) -> None:
-    theme_files: Set[str] = {"thumb.png", "index.theme"}
-
-    for file_path in processed_dir.iterdir():
-        if file_path.is_file():
-            file_content = file_path.read_bytes()
-            if file_path.name in theme_files:
-                dest_path = theme_temp_path / file_path.name
-                dest_path.write_bytes(file_content)
-            else:
-                dest_path = cursors_dir / file_path.name
-                dest_path.write_bytes(file_content)
-        elif file_path.is_dir() and file_path.name.lower() == "cursors":
-            for cursor_file in file_path.iterdir():
-                if cursor_file.is_file():
-                    file_content = cursor_file.read_bytes()
-                    dest_path = cursors_dir / cursor_file.name
-                    dest_path.write_bytes(file_content)
-
-def process_cursor_set(config: AppConfig, cursor_set: CursorSet) -> ProcessStats:
-    logger.info(f"\n{'=' * 40}")
-    logger.info(f"Processing {cursor_set.name}...")
-    logger.info(f"{'=' * 40}")
-
-    successful: int = 0
-    failed: int = 0
-
-    for character_jp, character_data in cursor_set.characters.items():
-        result = process_character(config, character_jp, character_data)
-
-        if result.success:
-            successful += 1
+def write_character_previews(config: AppConfig, job: CharacterJob) -> None:
+    """Put the preview pieces of a converted character together into its archive, and its gallery thumbnail."""
+    assert job.plan is not None
+    try:
+        with job.metrics.stage("preview") as stage:
+            files = theme_previews(job.previews, job.plan.roles)
+            stage.bytes_out = sum(len(data) for data in files.values())
+        with job.metrics.stage("write"):
+            write_previews(job.writer, files)
+            if config.gallery and "thumb.png" in files:
+                thumbnail = thumbnail_path(config, job.theme_name)
+                thumbnail.parent.mkdir(exist_ok=True)
+                write_atomic(thumbnail, files["thumb.png"])
+    except Exception as e:
+        job.errors.append(FileError(job.theme_name, "previews", f"{type(e).__name__}: {e}"))
+        logger.error(f"Could not write the previews of {job.character_jp}, they are left out: {e}")
+
+def schedule_characters(
+        config: AppConfig,
+        cursor_sets: List[CursorSet],
+        pool: RecyclingPool,
+        manifest: Optional[BuildManifest] = None,
+        changes: Optional[BuildChanges] = None,
+        report: Optional[BuildReport] = None,
+        theme_names: Optional[Dict[Tuple[str, str], str]] = None,
+        journal: Optional[BuildJournal] = None
+) -> Dict[str, ProcessStats]:
+    """Run every (character, cursor file) task of ``cursor_sets`` through one queue on ``pool``.
+
+    Characters are prepared lazily while the queue holds fewer than two tasks per worker, so workers
+    stay busy across character boundaries. Results are handed to the character archive as they arrive,
+    and its previews are put together from the pieces its tasks rendered once the last one is in.
+    Archives are compressed on ``config.archive_jobs`` threads, several characters at once, instead of
+    blocking this loop, or inline by this loop without any. A character is done once its archive is moved into place.
+    With a ``manifest`` characters whose archive is up to date are skipped. The stage timings of every
+    finished character, from the workers and the archive threads, are merged into ``report``.
+    Pass the ``theme_names`` of the whole build when ``cursor_sets`` is only a part of it.
+
+    A file that fails to convert or times out is left out of its theme and reported in the
+    ``errors`` of its set, only a theme without any converted file or one that cannot be
+    written fails as a whole. A task whose result is overdue, because its worker hangs where the
+    timeout cannot interrupt it or was killed, fails its theme, and the workers of ``pool`` are
+    recycled to get the other tasks going again. Finished tasks and themes are recorded in the ``journal``, and
+    themes it already holds from the build it resumes are skipped.
+    """
+    if theme_names is None:
+        theme_names = assign_theme_names(cursor_sets)
+    counts: Dict[str, List[int]] = {cursor_set.name: [0, 0, 0] for cursor_set in cursor_sets}
+    errors: Dict[str, List[FileError]] = {cursor_set.name: [] for cursor_set in cursor_sets}
+    # ("task", task id, result, error) from the pool, ("archived", job, None, error) from the archive threads
+    done: "queue.Queue[Tuple[str, Any, Optional[TaskResult], Optional[BaseException]]]" = queue.Queue()
+    window = max(1, config.num_jobs) * 2
+    # Task id -> the character, the task and when it was handed to the pool
+    outstanding: Dict[int, Tuple[CharacterJob, ConversionTask, float]] = {}
+    task_ids = itertools.count()
+    # A task may wait behind the ones queued ahead of it on its worker, each of them and itself is
+    # given up on after the task timeout. Later than that its worker hangs where SIGALRM cannot
+    # reach it or died, and the result never comes
+    overdue = None
+    if config.task_timeout:
+        overdue = config.task_timeout * (window // max(1, config.num_jobs) + 1) + WATCHDOG_GRACE
+    archiving = 0
+    executor: Executor = InlineExecutor()
+    if config.archive_jobs > 0:
+        executor = ThreadPoolExecutor(config.archive_jobs, thread_name_prefix="archive")
+
+    def record(job: CharacterJob, result: ProcessResult) -> None:
+        if report is not None:
+            report.character(job.set_name, job.theme_name).merge(job.metrics)
+        counts[job.set_name][0 if result.success else 1] += 1
+        errors[job.set_name].extend(job.errors)
+        if result.success and journal is not None and not job.errors:
+            journal.record_theme(job.theme_name, archive_path(config, job.theme_name))
+        if changes is not None and result.success:
+            changes.rebuilt.append(job.theme_name)
+
+    def character_tasks() -> Iterator[Tuple[CharacterJob, ConversionTask]]:
+        for cursor_set in cursor_sets:
+            for character_jp, character_data in cursor_set.characters.items():
+                theme_name = theme_names[(cursor_set.name, character_jp)]
+                if journal is not None and journal.is_finished(theme_name, archive_path(config, theme_name)):
+                    logger.info(f"Skipping {character_jp} ({character_data.en_name}), finished by the resumed build")
+                    counts[cursor_set.name][2] += 1
+                    if changes is not None:
+                        changes.skipped.append(theme_name)
+                    continue
+                try:
+                    job, tasks = prepare_character(
+                        config, cursor_set.name, character_jp, character_data, theme_name, manifest, executor
+                    )
+                except Exception as e:
+                    logger.error(f"Error processing {character_jp}: {e}")
+                    counts[cursor_set.name][1] += 1
+                    if manifest is not None:
+                        manifest.forget(theme_name)
+                    continue
+                if job is None:
+                    counts[cursor_set.name][2] += 1
+                    if changes is not None:
+                        changes.skipped.append(theme_name)
+                    continue
+                if journal is not None and journal.finished_tasks(theme_name):
+                    logger.info(f"{journal.finished_tasks(theme_name)} of {len(tasks)} files were converted "
+                                "by the resumed build")
+                for task in tasks:
+                    yield job, task
+
+    def submit(job: CharacterJob, task: ConversionTask) -> None:
+        key = next(task_ids)
+        outstanding[key] = (job, task, time.monotonic())
+
+        def converted(result: TaskResult) -> None:
+            done.put(("task", key, result, None))
+
+        def failed(error: BaseException) -> None:
+            done.put(("task", key, None, error))
+
+        pool.pool.apply_async(process, (task,), callback=converted, error_callback=failed)
+
+    def archived(job: CharacterJob, finished: "Future[None]") -> None:
+        done.put(("archived", job, None, finished.exception()))
+
+    def task_done(job: CharacterJob) -> None:
+        """Count a task of ``job`` as done, after the last one its archive is closed, or aborted."""
+        nonlocal archiving
+        job.pending -= 1
+        if job.pending > 0:
+            return
+        assert job.plan is not None
+        if job.error_msg is None and job.plan.tasks and job.converted == 0:
+            job.error_msg = f"None of the {len(job.plan.tasks)} files of {job.theme_name} could be converted"
+        if job.error_msg is None:
+            write_character_previews(config, job)
+            job.writer.close()
+        else:
+            job.writer.abort()
+        assert isinstance(job.writer, BackgroundThemeWriter)
+        job.writer.finished.add_done_callback(partial(archived, job))
+        archiving += 1
+
+    def watchdog_timeout() -> Optional[float]:
+        """How long to wait for a result before the oldest outstanding task is overdue."""
+        if overdue is None or not outstanding:
+            return None
+        oldest = min(submitted for _, _, submitted in outstanding.values())
+        return max(0.0, oldest + overdue - time.monotonic())
+
+    pending_tasks = character_tasks()
+    exhausted = False
+
+    with executor, tqdm(desc="Converting cursors", unit="file") as progress:
+        while True:
+            while not exhausted and len(outstanding) < window:
+                try:
+                    job, task = next(pending_tasks)
+                except StopIteration:
+                    exhausted = True
+                    break
+                if job.error_msg is None:
+                    submit(job, task)
+                else:
+                    # Its character failed already
+                    progress.update()
+                    task_done(job)
+
+            if not outstanding and archiving == 0:
+                break
+
+            try:
+                kind, item, result, error = done.get(timeout=watchdog_timeout())
+            except queue.Empty:
+                assert overdue is not None
+                now = time.monotonic()
+                for key in [key for key, (_, _, submitted) in outstanding.items() if now - submitted >= overdue]:
+                    job, task, _ = outstanding.pop(key)
+                    source = Path(task[0]).name
+                    logger.error(f"No result for {source} of {job.character_jp} after {overdue:g} s, "
+                                 f"its worker hung or died")
+                    if job.error_msg is None:
+                        job.error_msg = f"{source} of {job.theme_name} gave no result after {overdue:g} s"
+                    progress.update()
+                    task_done(job)
+
+                # Every other task on the old workers is lost with them, the ones of characters that
+                # have not failed are queued again
+                logger.warning(f"Restarting the workers, {len(outstanding)} tasks are queued again")
+                pool.recycle()
+                for key, (job, task, _) in list(outstanding.items()):
+                    del outstanding[key]
+                    if job.error_msg is None:
+                        submit(job, task)
+                    else:
+                        progress.update()
+                        task_done(job)
+                continue
+
+            if kind == "archived":
+                job = item
+                archiving -= 1
+                if job.writer.metrics is not None:
+                    job.metrics.merge(job.writer.metrics)
+                record(job, finish_character(config, job, manifest, error))
+                continue
+
+            entry = outstanding.pop(item, None)
+            if entry is None:
+                # Delivered by a worker of a recycled pool just before it was terminated, the task was
+                # queued again or its character failed
+                continue
+            job, task, _ = entry
+            progress.update()
+            if error is not None:
+                source = Path(task[0]).name
+                job.errors.append(FileError(job.theme_name, source, f"{type(error).__name__}: {error}"))
+                logger.error(f"Could not convert {source} of {job.character_jp}, it is left out: {error}")
+            elif job.error_msg is None:
+                assert result is not None
+                job.metrics.merge(result.metrics)
+                try:
+                    assert job.plan is not None
+                    with job.metrics.stage("write"):
+                        write_result(job.writer, job.plan.mapping, result, config.link_mode)
+                    job.previews[result.role] = result.previews
+                    job.converted += 1
+                    if journal is not None:
+                        journal.record_task(job.theme_name, result.role)
+                except Exception as e:
+                    job.error_msg = f"Failed to write archive for {job.theme_name}: {e}"
+            task_done(job)
+
+    return {
+        name: ProcessStats(successful=ok, failed=ko, skipped=skip, errors=tuple(errors[name]))
+        for name, (ok, ko, skip) in counts.items()
+    }
+
+def write_gallery(
+        config: AppConfig,
+        cursor_sets: List[CursorSet],
+        theme_names: Dict[Tuple[str, str], str]
+) -> Path:
+    """Write one page with the thumbnail of every character of ``cursor_sets`` that has been built with --gallery."""
+    themes = []
+    for cursor_set in cursor_sets:
+        for character_jp, character_data in cursor_set.characters.items():
+            theme_name = theme_names[(cursor_set.name, character_jp)]
+            try:
+                thumbnail = thumbnail_path(config, theme_name).read_bytes()
+            except FileNotFoundError:
+                logger.warning(f"No thumbnail of {theme_name}, "
+                               f"rebuild it without --incremental to add it to the gallery")
+                continue
+            themes.append((theme_name, f"{character_jp} ({character_data.en_name})", thumbnail))
+
+    gallery_path = config.dist_dir / GALLERY_NAME
+    write_atomic(gallery_path, gallery_html("Anime Cursors", themes).encode("utf-8"))
+    logger.info(f"Wrote a gallery of {len(themes)} themes to {gallery_path}")
+    return gallery_path
+
+def update_checksums(
+        config: AppConfig,
+        cursor_sets: List[CursorSet],
+        theme_names: Dict[Tuple[str, str], str],
+        manifest: Optional[BuildManifest] = None
+) -> Dict[str, str]:
+    """Bring CHECKSUMS_NAME in the dist directory up to date with the archives of ``cursor_sets``.
+
+    Digests of other archives are kept as long as the archive exists, and digests the manifest
+    already holds for an archive are not computed again.
+    """
+    checksums_path = config.dist_dir / CHECKSUMS_NAME
+    checksums = {
+        name: digest
+        for name, digest in read_checksums(checksums_path).items()
+        if (config.dist_dir / name).is_file()
+    }
+    selected = [theme_names[(cursor_set.name, character_jp)] for cursor_set in cursor_sets
+                for character_jp in cursor_set.characters]
+    for theme_name in selected:
+        path = archive_path(config, theme_name)
+        if not path.is_file():
+            checksums.pop(path.name, None)
+            continue
+        entry = manifest.themes.get(theme_name) if manifest is not None else None
+        if entry is not None and entry["archive"] == path.name:
+            checksums[path.name] = entry["archive_sha256"]
         else:
-            failed += 1
+            checksums[path.name] = file_digest(path)
+
+    write_checksums(checksums_path, checksums)
+    return checksums
 
-    return ProcessStats(successful=successful, failed=failed)
+def compare_checksums(config: AppConfig, checksums: Dict[str, str], previous_path: Path) -> List[str]:
+    """Write the archives whose digest is not in ``previous_path`` to CHANGED_NAME and return them."""
+    previous = read_checksums(previous_path)
+    changed = sorted(name for name, digest in checksums.items() if previous.get(name) != digest)
+    write_atomic(config.dist_dir / CHANGED_NAME, "".join(f"{name}\n" for name in changed).encode("utf-8"))
+    logger.info(f"{len(checksums) - len(changed)} archives are identical to {previous_path}, "
+                f"{len(changed)} changed: {', '.join(changed) or '-'}")
+    return changed
 
-def process_touhou_cursors(config: AppConfig) -> None:
+def process_cursor_data(
+        config: AppConfig,
+        set_names: Optional[List[str]] = None,
+        character_names: Optional[List[str]] = None
+) -> Dict[str, ProcessStats]:
     json_file_path: Path = config.cursor_converter_dir / "config" / "cursor_data.json"
+    set_stats: Dict[str, ProcessStats] = {}
 
     try:
         cursor_data = load_cursor_data(json_file_path)
-        touhou_sets = extract_touhou_sets(cursor_data)
+        cursor_sets = extract_cursor_sets(cursor_data, set_names, character_names)
+        theme_names = catalog_theme_names(cursor_data)
 
-        total_stats = ProcessStats(successful=0, failed=0)
+        logger.info(f"Scheduling {sum(len(s.characters) for s in cursor_sets)} characters "
+                    f"from {len(cursor_sets)} sets")
+
+        manifest: Optional[BuildManifest] = None
+        changes = BuildChanges()
+        if config.incremental:
+            manifest = BuildManifest.load(config.dist_dir / MANIFEST_NAME)
+        journal = BuildJournal.open(config.dist_dir / JOURNAL_NAME, build_settings(config), config.resume)
+        if config.resume:
+            logger.info(f"Resuming the last build, it finished {len(journal.themes)} themes "
+                        f"and {len(journal.tasks)} files")
+
+        # Load the mappings once in the parent, then keep one pool alive for every character
+        load_definitions()
+        for pattern, roles in load_matcher().ambiguous_patterns().items():
+            logger.warning(f"'{pattern}' is listed under {', '.join(roles)}, files with it become {roles[0]}")
+        report = BuildReport()
+        # One pool for every character of every set, so the CPU budget is split across themes
+        # by the queue instead of starting a pool per theme, and never more workers than tasks
+        tasks = count_tasks(config, cursor_sets)
+        logger.info(f"Starting {worker_count(config.num_jobs, tasks)} workers for up to {tasks} tasks")
+        try:
+            with profiling(config.profile) as profile_dir, \
+                    RecyclingPool(partial(create_pool, config.num_jobs, config.sizes, config.cache, profile_dir, tasks,
+                                          config.task_timeout, config.max_tasks_per_child, config.backend)) as pool:
+                set_stats = schedule_characters(
+                    config, cursor_sets, pool, manifest, changes, report, theme_names, journal
+                )
+            report.finish()
 
-        for cursor_set in touhou_sets:
-            set_stats = process_cursor_set(config, cursor_set)
+            if manifest is not None:
+                # Only themes that vanished from cursor_data.json are deleted, not the ones filtered out
+                changes.deleted.extend(manifest.prune(theme_names.values()))
+        finally:
+            journal.close()
+            if manifest is not None:
+                manifest.save()
 
+        if config.gallery:
+            write_gallery(config, cursor_sets, theme_names)
+
+        checksums = update_checksums(config, cursor_sets, theme_names, manifest)
+        if config.previous_checksums is not None:
+            compare_checksums(config, checksums, config.previous_checksums)
+
+        if config.cache is not None:
+            freed = config.cache.prune()
+            if freed:
+                logger.info(f"Evicted {freed / 1024**2:.1f} MiB from the conversion cache")
+
+        total_stats = ProcessStats(successful=0, failed=0)
+        for set_name, stats in set_stats.items():
             # Print set summary
             logger.info(f"\n{'=' * 40}")
-            logger.info(f"Set '{cursor_set.name}' summary:")
-            logger.info(f"  Successful: {set_stats.successful}")
-            logger.info(f"  Failed: {set_stats.failed}")
+            logger.info(f"Set '{set_name}' summary:")
+            logger.info(f"  Successful: {stats.successful}")
+            logger.info(f"  Failed: {stats.failed}")
+            if config.incremental or config.resume:
+                logger.info(f"  Skipped: {stats.skipped}")
+            if stats.errors:
+                logger.info(f"  Files left out: {len(stats.errors)}")
             logger.info(f"{'=' * 40}")
 
             # Update total stats
             total_stats = ProcessStats(
-                successful=total_stats.successful + set_stats.successful,
-                failed=total_stats.failed + set_stats.failed
+                successful=total_stats.successful + stats.successful,
+                failed=total_stats.failed + stats.failed,
+                skipped=total_stats.skipped + stats.skipped,
+                errors=total_stats.errors + stats.errors
             )
 
+        if config.incremental:
+            logger.info(f"\n{'=' * 40}")
+            logger.info(f"Skipped (unchanged): {', '.join(changes.skipped) or '-'}")
+            logger.info(f"Rebuilt: {', '.join(changes.rebuilt) or '-'}")
+            logger.info(f"Deleted: {', '.join(changes.deleted) or '-'}")
+
         # Print final summary
         logger.info(f"\n{'=' * 40}")
         logger.info("Processing complete!")
         logger.info(f"Total successful: {total_stats.successful}")
         logger.info(f"Total failed: {total_stats.failed}")
+        if config.incremental or config.resume:
+            logger.info(f"Total skipped: {total_stats.skipped}")
+        if total_stats.errors:
+            logger.info(f"Files left out of their theme: {len(total_stats.errors)}")
+            for file_error in total_stats.errors:
+                logger.info(f"  {file_error.theme}: {file_error.file}: {file_error.error}")
         logger.info(f"Total processed: {total_stats.total}")
         logger.info(f"Success rate: {total_stats.success_rate:.2f}%")
-        logger.info(f"Zipped cursor packages are available in: {config.dist_dir.resolve()}")
+        logger.info(f"Cursor packages are available in: {config.dist_dir.resolve()}")
         logger.info(f"{'=' * 40}")
 
+        logger.info(f"Stages, summed over every worker, in {report.wall:.2f} s:")
+        for stage, stage_stats in report.totals().stages.items():
+            logger.info(f"  {stage}: {stage_stats.describe()}")
+        if config.report is not None:
+            report.save(config.report)
+            logger.info(f"Build report written to {config.report}")
+        if config.profile is not None:
+            logger.info(f"Profile written to {config.profile}, open it with python -m pstats")
+
     except Exception as e:
-        logger.error(f"Error processing Touhou cursors: {e}")
+        logger.error(f"Error processing cursors: {e}")
         import traceback
         logger.debug(traceback.format_exc())
 
+    return set_stats
+
+def plan_cursor_data(
+        config: AppConfig,
+        set_names: Optional[List[str]] = None,
+        character_names: Optional[List[str]] = None
+) -> Dict[str, BuildPlan]:
+    """Log what every character would be built from and written to, without decoding or writing anything."""
+    json_file_path: Path = config.cursor_converter_dir / "config" / "cursor_data.json"
+    cursor_data = load_cursor_data(json_file_path)
+    cursor_sets = extract_cursor_sets(cursor_data, set_names, character_names)
+    theme_names = catalog_theme_names(cursor_data)
+    plans: Dict[str, BuildPlan] = {}
+
+    for cursor_set in cursor_sets:
+        logger.info(f"\n{'=' * 40}")
+        logger.info(f"{cursor_set.name}")
+        logger.info(f"{'=' * 40}")
+        for character_jp, character_data in cursor_set.characters.items():
+            theme_name = theme_names[(cursor_set.name, character_jp)]
+            try:
+                input_dir = resolve_input_dir(config, character_jp, character_data)
+                plan = plan_theme(input_dir, detect_file_format(input_dir))
+            except Exception as e:
+                logger.error(f"{theme_name}: {e}")
+                continue
+            plans[theme_name] = plan
+            logger.info(f"{theme_name} -> {archive_path(config, theme_name)}")
+            for line in plan.describe():
+                logger.info(f"  {line}")
+
+    incomplete = sorted(name for name, plan in plans.items() if plan.missing_roles or plan.unmatched_files)
+    logger.info(f"\nPlanned {len(plans)} themes, {len(incomplete)} incomplete: {', '.join(incomplete) or '-'}")
+    return plans
+
+def affected_characters(config: AppConfig, cursor_sets: List[CursorSet], paths: Set[Path]) -> List[CursorSet]:
+    """The characters of ``cursor_sets`` whose input directory is, contains or lies below one of ``paths``."""
+    result: List[CursorSet] = []
+    for cursor_set in cursor_sets:
+        characters: Dict[str, CharacterData] = {}
+        for character_jp, character_data in cursor_set.characters.items():
+            try:
+                input_dir = resolve_input_dir(config, character_jp, character_data)
+            except FileNotFoundError:
+                continue
+            if any(path == input_dir or input_dir in path.parents or path in input_dir.parents for path in paths):
+                characters[character_jp] = character_data
+        if characters:
+            result.append(CursorSet(name=cursor_set.name, characters=characters))
+    return result
+
+def watch_cursor_data(
+        config: AppConfig,
+        set_names: Optional[List[str]] = None,
+        character_names: Optional[List[str]] = None,
+        debounce: float = DEFAULT_DEBOUNCE,
+        polling: bool = False
+) -> None:
+    """Build incrementally, then rebuild the characters whose files change until interrupted.
+
+    The worker pool, the conversion cache and the compiled mappings stay warm between builds, so an
+    edited file costs its own conversion and the archive of its character. A change to a JSON file in
+    the config directory reloads cursor_data.json and the definitions and checks every selected
+    character against the manifest, which rebuilds all of them if the definitions changed.
+    """
+    config_dir = config.cursor_converter_dir / "config"
+    assets_dir = config.cursor_converter_dir / "Assets" / "win"
+    json_file_path: Path = config_dir / "cursor_data.json"
+    manifest = BuildManifest.load(config.dist_dir / MANIFEST_NAME)
+
+    cursor_data = load_cursor_data(json_file_path)
+    cursor_sets = extract_cursor_sets(cursor_data, set_names, character_names)
+    theme_names = catalog_theme_names(cursor_data)
+    load_definitions()
+    load_matcher()
+
+    def build(pool: RecyclingPool, selected: List[CursorSet]) -> None:
+        started = time.perf_counter()
+        changes = BuildChanges()
+        stats = schedule_characters(config, selected, pool, manifest, changes, theme_names=theme_names)
+        manifest.save()
+        if config.gallery:
+            write_gallery(config, cursor_sets, theme_names)
+        update_checksums(config, cursor_sets, theme_names, manifest)
+        failed = sum(set_stats.failed for set_stats in stats.values())
+        logger.info(f"Rebuilt {', '.join(changes.rebuilt) or 'nothing'} in {time.perf_counter() - started:.2f} s"
+                    f"{f', {failed} failed' if failed else ''}, watching for changes")
+
+    with open_watcher([assets_dir, config_dir], polling) as watcher, \
+            RecyclingPool(partial(create_pool, config.num_jobs, config.sizes, config.cache,
+                                  tasks=count_tasks(config, cursor_sets), task_timeout=config.task_timeout,
+                                  max_tasks_per_child=config.max_tasks_per_child, backend=config.backend)) as pool:
+        logger.info(f"Watching {assets_dir} and {config_dir} with {type(watcher).__name__}, Ctrl+C to stop")
+        build(pool, cursor_sets)
+        try:
+            for paths in debounced(watcher, debounce):
+                try:
+                    if any(path.parent == config_dir and path.suffix == ".json" for path in paths):
+                        logger.info("Configuration changed, reloading it")
+                        load_definitions.cache_clear()
+                        load_matcher.cache_clear()
+                        cursor_data = load_cursor_data(json_file_path)
+                        cursor_sets = extract_cursor_sets(cursor_data, set_names, character_names)
+                        theme_names = catalog_theme_names(cursor_data)
+                        load_definitions()
+                        selected = cursor_sets
+                    else:
+                        selected = affected_characters(config, cursor_sets, paths)
+                    if selected:
+                        build(pool, selected)
+                except Exception as e:
+                    # A half written JSON file or a broken cursor must not end the session
+                    logger.error(f"Error rebuilding after changes to {', '.join(sorted(map(str, paths)))}: {e}")
+                    import traceback
+                    logger.debug(traceback.format_exc())
+        except KeyboardInterrupt:
+            logger.info("Stopped watching")
+
+    if config.cache is not None:
+        config.cache.prune()
+
 def parse_arguments() -> argparse.Namespace:
-    parser = argparse.ArgumentParser(description="Touhou Cursor Processor")
+    parser = argparse.ArgumentParser(description="Anime Cursor Processor")
     parser.add_argument(
         "-v", "--verbose",
         action="store_true",
@@ -266,8 +980,16 @@ def parse_arguments() -> argparse.Namespace:
     parser.add_argument(
         "-j", "--jobs",
         type=int,
-        default=multiprocessing.cpu_count(),
-        help="Number of CPU cores to use for processing"
+        default=None,
+        help="Number of CPU cores to use for processing, defaults to the CPUs available to this process "
+             "as limited by its affinity and cgroup CPU quota"
+    )
+
+    parser.add_argument(
+        "--sizes",
+        type=parse_sizes,
+        default="standard",
+        help=f"Cursor sizes to generate, a profile ({', '.join(SIZE_PROFILES)}) or a list like 24,32,48"
     )
 
     parser.add_argument(
@@ -277,7 +999,193 @@ def parse_arguments() -> argparse.Namespace:
         help="Custom output directory for cursor packages"
     )
 
-    return parser.parse_args()
+    parser.add_argument(
+        "--set",
+        dest="sets",
+        action="append",
+        metavar="NAME",
+        help="Only process this cursor set from cursor_data.json (can be repeated)"
+    )
+
+    parser.add_argument(
+        "--character",
+        dest="characters",
+        action="append",
+        metavar="NAME",
+        help="Only process this character, by japanese, english or short name (can be repeated)"
+    )
+
+    parser.add_argument(
+        "--cache-dir",
+        type=Path,
+        default=default_cache_dir(),
+        help="Directory of the conversion cache"
+    )
+
+    parser.add_argument(
+        "--cache-size",
+        type=int,
+        default=DEFAULT_CACHE_SIZE // 1024**2,
+        metavar="MiB",
+        help="Maximum size of the conversion cache in MiB"
+    )
+
+    parser.add_argument(
+        "--no-cache",
+        action="store_true",
+        help="Convert every cursor again without using the conversion cache"
+    )
+
+    parser.add_argument(
+        "--link-mode",
+        choices=LINK_MODES,
+        default="symlink",
+        help="Store cursor aliases as symlinks (default) or as plain copies of the canonical file"
+    )
+
+    parser.add_argument(
+        "--backend",
+        choices=BACKENDS,
+        default="xcursor",
+        help="Package xcursor themes (default), hyprcursor themes or both formats in each archive"
+    )
+
+    parser.add_argument(
+        "--archive-format",
+        choices=list(ARCHIVE_FORMATS),
+        default="zip",
+        help="Archive format of the cursor packages, default is zip (tar.zst needs zstandard or Python 3.14)"
+    )
+
+    parser.add_argument(
+        "--compress-level",
+        type=int,
+        default=None,
+        help="Compression level of the archives, format default if omitted (0 stores zip members uncompressed)"
+    )
+
+    parser.add_argument(
+        "--archive-jobs",
+        type=int,
+        default=None,
+        help="Number of archives compressed in parallel, taken from the --jobs budget, defaults to a quarter of it, "
+             "0 compresses them between conversions"
+    )
+
+    parser.add_argument(
+        "--preview-sheet",
+        action="store_true",
+        help="Also put sheet.png, the first image of every cursor side by side, into each package"
+    )
+
+    parser.add_argument(
+        "--preview-animation",
+        choices=list(ANIMATION_FORMATS),
+        default=None,
+        help="Also put an animated preview of the thumbnail cursor in this format into each package"
+    )
+
+    parser.add_argument(
+        "--gallery",
+        action="store_true",
+        help=f"Write {GALLERY_NAME} with the thumbnail of every theme, thumbnails are kept in {PREVIEW_DIR_NAME}/"
+    )
+
+    parser.add_argument(
+        "--previous-checksums",
+        type=Path,
+        default=None,
+        metavar="SHA256SUMS",
+        help=f"{CHECKSUMS_NAME} of the previous release, archives that differ from it are listed in {CHANGED_NAME}"
+    )
+
+    parser.add_argument(
+        "--report",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Write the time, bytes and peak memory of every stage per character and set, as CSV for .csv else JSON"
+    )
+
+    parser.add_argument(
+        "--profile",
+        type=Path,
+        default=None,
+        metavar="FILE",
+        help="Profile the build and every worker with cProfile into one pstats file"
+    )
+
+    parser.add_argument(
+        "--plan",
+        action="store_true",
+        help="Only print what every theme would be built from and written to, nothing is converted"
+    )
+
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help=f"Only rebuild themes whose inputs changed since the last build, tracked in {MANIFEST_NAME}"
+    )
+
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help=f"Continue the last build of the output directory as recorded in {JOURNAL_NAME}, themes it finished "
+             "are skipped and the files it converted come from the conversion cache, so it needs the cache"
+    )
+
+    parser.add_argument(
+        "--task-timeout",
+        type=float,
+        default=DEFAULT_TASK_TIMEOUT,
+        metavar="SECONDS",
+        help=f"Leave out a file whose conversion takes longer, 0 waits forever, default is {DEFAULT_TASK_TIMEOUT:g}"
+    )
+
+    parser.add_argument(
+        "--max-tasks-per-child",
+        type=int,
+        default=DEFAULT_MAX_TASKS_PER_CHILD,
+        metavar="N",
+        help=f"Replace every worker after this many files, 0 keeps them, default is {DEFAULT_MAX_TASKS_PER_CHILD}"
+    )
+
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Keep running and rebuild the characters whose cursor files change, "
+             f"implies --incremental, themes are tracked in {MANIFEST_NAME}"
+    )
+
+    parser.add_argument(
+        "--debounce",
+        type=float,
+        default=DEFAULT_DEBOUNCE,
+        metavar="SECONDS",
+        help=f"With --watch, wait until nothing changed for this long before rebuilding, default is {DEFAULT_DEBOUNCE}"
+    )
+
+    parser.add_argument(
+        "--poll",
+        action="store_true",
+        help="With --watch, poll for changes instead of using inotify, for network and container mounts"
+    )
+
+    parser.add_argument(
+        "--touhou",
+        action="store_true",
+        help="Only process the Touhou cursor sets"
+    )
+
+    args = parser.parse_args()
+    if args.archive_format == "tar.zst" and not zstd_available():
+        parser.error("tar.zst archives need the zstandard package or Python 3.14")
+    if args.preview_animation == "webp" and not webp_available():
+        parser.error("webp previews need Pillow built with WebP support")
+    if args.resume and args.no_cache:
+        # The journal only names the files a build converted, their xcursor files are kept by the cache
+        parser.error("--resume takes the converted files from the conversion cache, it cannot be used with --no-cache")
+    return args
 
 def main() -> None:
     args = parse_arguments()
@@ -290,23 +1198,61 @@ def main() -> None:
     dist_dir: Path = args.output if args.output else repo_root / "dist"
     dist_dir.mkdir(exist_ok=True)
 
+    cpus = available_cpus()
+    budget: int = args.jobs or cpus
+    if budget > cpus:
+        logger.warning(f"{budget} jobs for {cpus} available CPUs, workers will take turns on them")
+    # Compression threads take their share of the same budget as the conversion workers
+    num_jobs, archive_jobs = split_budget(budget, args.archive_jobs)
+
     config = AppConfig(
         repo_root=repo_root,
         cursor_converter_dir=cursor_converter_dir,
         dist_dir=dist_dir,
-        num_jobs=args.jobs,
+        num_jobs=num_jobs,
+        verbose=args.verbose,
+        incremental=args.incremental or args.watch,
+        link_mode=args.link_mode,
+        backend=args.backend,
+        sizes=args.sizes,
+        archive_format=args.archive_format,
+        compress_level=args.compress_level,
+        archive_jobs=archive_jobs,
+        preview_sheet=args.preview_sheet,
+        preview_animation=args.preview_animation,
+        gallery=args.gallery,
+        previous_checksums=args.previous_checksums,
+        report=args.report,
+        profile=args.profile,
+        resume=args.resume,
+        task_timeout=args.task_timeout or None,
+        max_tasks_per_child=args.max_tasks_per_child or None,
+        cache=None if args.no_cache else ConversionCache(args.cache_dir, args.cache_size * 1024**2),
     )
 
     logger.info("=" * 80)
-    logger.info("⭐ Touhou Cursor Processor ⭐")
+    logger.info("⭐ Anime Cursor Processor ⭐")
     logger.info("=" * 80)
-    logger.info("This script creates cursor theme packages using zipfile library.")
-    logger.info(f"Output directory for zipped files: {dist_dir}")
-    logger.info(f"Using {config.num_jobs} CPU cores for processing.")
+    logger.info(f"This script creates cursor theme packages as {config.archive_format} archives.")
+    logger.info(f"Output directory for archives: {dist_dir}")
+    logger.info(f"Using {budget} of {cpus} available CPU cores for processing: {config.num_jobs} conversion "
+                f"workers and {config.archive_jobs} compression threads.")
+    logger.info(f"Cursor sizes: {', '.join(str(size) for size in config.sizes)}")
+    logger.info(f"Cursor formats: {config.backend}")
+    if config.cache is not None:
+        logger.info(f"Conversion cache: {config.cache.directory}")
     logger.info("=" * 80)
 
     # Process cursor sets
-    process_touhou_cursors(config)
+    set_names: Optional[List[str]] = args.sets
+    if args.touhou:
+        set_names = (set_names or []) + TOUHOU_SET_NAMES
+    if args.plan:
+        plan_cursor_data(config, set_names, args.characters)
+    elif args.watch:
+        watch_cursor_data(config, set_names, args.characters, args.debounce, args.poll)
+    else:
+        process_cursor_data(config, set_names, args.characters)
 
 if __name__ == "__main__":
     main()
\ No newline at end of file
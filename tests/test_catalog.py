@@ -0,0 +1,101 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from CursorConverter.catalog import AssetCatalog
+from parse_directories import merge_catalog, root_dir
+from process_cursors import AppConfig, CharacterData, resolve_input_dir
+
+CURSOR_DIRECTORIES = [
+    # A character of its own that keeps its cursors in アニメーション and 静止画
+    "蓬莱山輝夜　マウスカーソル/アニメーション",
+    "蓬莱山輝夜　マウスカーソル/静止画",
+    # Characters of a set with variant directories named after them
+    "琴葉茜・葵　マウスカーソル/アニメーション/琴葉茜　アニメーション",
+    "琴葉茜・葵　マウスカーソル/静止画/琴葉茜　静止画",
+    # Still cursors of a character another set already has
+    "艦これ　修正/艦これ　静止画/ビスマルク",
+    "艦これ　マウスカーソル/ビスマルク",
+    # A character of a known set
+    "艦これ　マウスカーソル/暁",
+]
+
+CURSOR_DATA: Dict[str, Any] = {
+    "艦これ　マウスカーソル": {
+        "ビスマルク": {
+            "path": f"{root_dir}/艦これ　マウスカーソル",
+            "en_name": "Bismarck",
+            "short_character_name": "Bismarck",
+        }
+    },
+    "艦これ　修正": {},
+}
+
+
+@pytest.fixture
+def repo_root(tmp_path: Path) -> Path:
+    for relative in CURSOR_DIRECTORIES:
+        directory = tmp_path / root_dir / relative
+        directory.mkdir(parents=True)
+        extension = ".cur" if "静止画" in relative else ".ani"
+        (directory / f"通常の選択{extension}").write_bytes(relative.encode())
+    return tmp_path
+
+
+def test_new_characters_point_at_their_own_directory(repo_root: Path) -> None:
+    catalog, _ = AssetCatalog.scan(repo_root / root_dir)
+    cursor_data = {name: dict(entries) for name, entries in CURSOR_DATA.items()}
+    added = merge_catalog(cursor_data, catalog)
+
+    assert added == [
+        "琴葉茜・葵　マウスカーソル/アニメーション/琴葉茜　アニメーション",
+        "艦これ　マウスカーソル/暁",
+        "蓬莱山輝夜　マウスカーソル/アニメーション",
+    ]
+    assert cursor_data["蓬莱山輝夜　マウスカーソル"]["蓬莱山輝夜　マウスカーソル"]["path"] == (
+        f"{root_dir}/蓬莱山輝夜　マウスカーソル"
+    )
+    assert not cursor_data["艦これ　修正"]
+
+    config = AppConfig(repo_root=repo_root, cursor_converter_dir=repo_root, dist_dir=repo_root, num_jobs=1)
+    for relative in added:
+        set_name = relative.split("/")[0]
+        for character_jp, entry in cursor_data[set_name].items():
+            character = CharacterData(entry["en_name"], entry["short_character_name"], entry["path"])
+            assert repo_root / root_dir / set_name in resolve_input_dir(config, character_jp, character).parents
+    character = CharacterData(
+        "example", "example", f"{root_dir}/琴葉茜・葵　マウスカーソル/アニメーション/琴葉茜　アニメーション"
+    )
+    assert resolve_input_dir(config, "琴葉茜", character).name == "琴葉茜　アニメーション"
+    # Merging again adds nothing
+    assert merge_catalog(cursor_data, catalog) == []
+
+
+def test_directories_without_cursors_are_not_input_directories(repo_root: Path) -> None:
+    config = AppConfig(repo_root=repo_root, cursor_converter_dir=repo_root, dist_dir=repo_root, num_jobs=1)
+    character = CharacterData("Kaguya", "Kaguya", f"{root_dir}/蓬莱山輝夜　マウスカーソル")
+    # The character directory itself only holds アニメーション and 静止画
+    assert resolve_input_dir(config, "蓬莱山輝夜　マウスカーソル", character) == (
+        repo_root / root_dir / "蓬莱山輝夜　マウスカーソル" / "アニメーション"
+    )
+
+    (repo_root / root_dir / "艦これ　マウスカーソル" / "響").mkdir()
+    character = CharacterData("Hibiki", "Hibiki", f"{root_dir}/艦これ　マウスカーソル")
+    with pytest.raises(FileNotFoundError):
+        resolve_input_dir(config, "響", character)
+
+
+def test_a_saved_catalog_is_readable_by_everyone_and_loads_the_same(repo_root: Path) -> None:
+    catalog, _ = AssetCatalog.scan(repo_root / root_dir)
+    path = repo_root / "index" / "asset_index.json"
+    catalog.save(path)
+
+    assert os.listdir(path.parent) == ["asset_index.json"]
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert AssetCatalog.load(path, repo_root / root_dir).directories == catalog.directories
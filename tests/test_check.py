@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+from typing import Tuple
+
+import pytest
+
+from CursorConverter.check import (
+    ANIH_HEADER,
+    CHUNK_HEADER,
+    ICON_DIR,
+    ICON_DIR_ENTRY,
+    ICON_FLAG,
+    RIFF_HEADER,
+    CursorHeader,
+    cursor_directories,
+    inspect_cursor,
+)
+from CursorConverter.converter import list_files
+
+
+def cur(hotspot: Tuple[int, int] = (3, 5), payload: bytes = b"\0" * 40) -> bytes:
+    """A cursor of one 32x32 image, the image data itself is never read."""
+    offset = ICON_DIR.size + ICON_DIR_ENTRY.size
+    return ICON_DIR.pack(0, 2, 1) + ICON_DIR_ENTRY.pack(32, 32, 0, 0, *hotspot, len(payload), offset) + payload
+
+
+def chunk(name: bytes, data: bytes) -> bytes:
+    return CHUNK_HEADER.pack(name, len(data)) + data + b"\0" * (len(data) & 1)
+
+
+def ani(frames: int = 2, rate: int = 6) -> bytes:
+    anih = ANIH_HEADER.pack(ANIH_HEADER.size, frames, frames, 0, 0, 0, 0, rate, ICON_FLAG)
+    icons = b"".join(chunk(b"icon", cur()) for _ in range(frames))
+    body = b"ACON" + chunk(b"anih", anih) + chunk(b"LIST", b"fram" + icons)
+    return CHUNK_HEADER.pack(b"RIFF", len(body)) + body
+
+
+def inspect(tmp_path: Path, name: str, data: bytes) -> CursorHeader:
+    path = tmp_path / name
+    path.write_bytes(data)
+    return inspect_cursor(path)
+
+
+def test_a_well_formed_animation_is_described(tmp_path: Path) -> None:
+    header = inspect(tmp_path, "busy.ani", ani())
+    assert header.errors == ()
+    assert (header.frames, header.steps, header.sizes, header.hotspots, header.rates) == (
+        2,
+        2,
+        ((32, 32),),
+        (3, 5, 3, 5),
+        (6,),
+    )
+
+
+@pytest.mark.parametrize(
+    "length, error",
+    [
+        (RIFF_HEADER.size - 2, "unpack_from requires a buffer of at least 12 bytes"),
+        (RIFF_HEADER.size + 4, "expected chunk anih before the end of the file"),
+        (RIFF_HEADER.size + CHUNK_HEADER.size + 8, "unexpected anih size 36"),
+        (RIFF_HEADER.size + CHUNK_HEADER.size + ANIH_HEADER.size + 4, "expected chunk LIST/seq /rate"),
+        (-10, "chunk LIST points past the end of the file"),
+    ],
+)
+def test_a_truncated_animation_is_reported(tmp_path: Path, length: int, error: str) -> None:
+    header = inspect(tmp_path, "busy.ani", ani()[:length])
+    assert len(header.errors) == 1
+    assert header.errors[0].startswith(error)
+    assert header.frames == 0
+
+
+def test_an_animation_with_a_truncated_frame_is_reported(tmp_path: Path) -> None:
+    data = bytearray(ani(frames=1))
+    # The icon chunk claims more bytes than its cursor directory has
+    icon = data.index(b"icon")
+    data[icon + 4 : icon + 8] = (ICON_DIR.size + 2).to_bytes(4, "little")
+    header = inspect(tmp_path, "busy.ani", bytes(data))
+    assert header.errors == ("truncated cursor directory of 1 images",)
+
+
+@pytest.mark.parametrize(
+    "length, error",
+    [
+        (ICON_DIR.size - 1, "truncated cursor directory"),
+        (ICON_DIR.size + ICON_DIR_ENTRY.size - 1, "truncated cursor directory of 1 images"),
+        (ICON_DIR.size + ICON_DIR_ENTRY.size + 10, "image 0 points past the end of the cursor"),
+    ],
+)
+def test_a_truncated_cursor_is_reported(tmp_path: Path, length: int, error: str) -> None:
+    assert inspect(tmp_path, "arrow.cur", cur()[:length]).errors == (error,)
+
+
+def test_a_cursor_with_a_hotspot_outside_of_its_image_is_reported(tmp_path: Path) -> None:
+    header = inspect(tmp_path, "arrow.cur", cur(hotspot=(32, 5)))
+    assert header.errors == ("hotspot 32,5 outside of a 32x32 image",)
+    assert inspect(tmp_path, "arrow.cur", cur()).errors == ()
+
+
+def test_an_empty_file_is_reported(tmp_path: Path) -> None:
+    assert inspect(tmp_path, "arrow.cur", b"").errors == ("empty file",)
+
+
+def test_upper_case_extensions_are_checked_and_converted_alike(tmp_path: Path) -> None:
+    (tmp_path / "BUSY.ANI").write_bytes(ani())
+    (tmp_path / "Arrow.Cur").write_bytes(cur())
+    (tmp_path / "readme.txt").write_bytes(b"")
+
+    assert list(cursor_directories(tmp_path)) == [(tmp_path, "ani", ["BUSY.ANI"])]
+    assert list_files(tmp_path, "ani") == [tmp_path / "BUSY.ANI"]
+    assert list_files(tmp_path, "cur") == [tmp_path / "Arrow.Cur"]
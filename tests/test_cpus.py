@@ -0,0 +1,104 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+import pytest
+
+from CursorConverter import cpus
+from CursorConverter.cpus import available_cpus, cgroup_cpu_limit, split_budget
+
+
+def cgroup_tree(tmp_path: Path, cgroup: str, files: Dict[str, str]) -> Tuple[Path, Path]:
+    """A cgroup mount with ``files`` below it and the /proc/self/cgroup of a process in ``cgroup``."""
+    root = tmp_path / "cgroup"
+    root.mkdir()
+    for relative, content in files.items():
+        path = root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_text(content)
+    cgroup_file = tmp_path / "self-cgroup"
+    cgroup_file.write_text(cgroup)
+    return root, cgroup_file
+
+
+@pytest.mark.parametrize(
+    "files, limit",
+    [
+        ({"build/cpu.max": "150000 100000\n"}, 1.5),
+        ({"build/cpu.max": "max 100000\n"}, None),
+        # A quota below one CPU
+        ({"build/cpu.max": "50000 100000\n"}, 0.5),
+        # The tightest of the cgroup and its parents
+        ({"build/cpu.max": "400000 100000\n", "cpu.max": "200000 100000\n"}, 2.0),
+        ({"build/cpu.max": "max 100000\n", "cpu.max": "200000 100000\n"}, 2.0),
+        ({"build/cpu.max": "garbage\n"}, None),
+        ({}, None),
+    ],
+)
+def test_cgroup_v2_quotas(tmp_path: Path, files: Dict[str, str], limit: Optional[float]) -> None:
+    root, cgroup_file = cgroup_tree(tmp_path, "0::/build\n", files)
+    assert cgroup_cpu_limit(root, cgroup_file) == limit
+
+
+def cfs(quota: str, directory: str = "cpu,cpuacct/docker/build", period: str = "100000\n") -> Dict[str, str]:
+    return {f"{directory}/cpu.cfs_quota_us": quota, f"{directory}/cpu.cfs_period_us": period}
+
+
+@pytest.mark.parametrize(
+    "files, limit",
+    [
+        (cfs("300000\n"), 3.0),
+        (cfs("-1\n"), None),
+        # A quota below one CPU
+        (cfs("25000\n"), 0.25),
+        (cfs("200000\n", "cpu/docker/build"), 2.0),
+        (cfs("100000\n", "cpu,cpuacct/docker"), 1.0),
+        (cfs("300000\n", period=""), None),
+        ({"cpu,cpuacct/docker/build/cpu.cfs_quota_us": "300000\n"}, None),
+        ({}, None),
+    ],
+)
+def test_cgroup_v1_quotas(tmp_path: Path, files: Dict[str, str], limit: Optional[float]) -> None:
+    root, cgroup_file = cgroup_tree(tmp_path, "12:memory:/docker/build\n4:cpu,cpuacct:/docker/build\n", files)
+    assert cgroup_cpu_limit(root, cgroup_file) == limit
+
+
+def test_a_container_reads_the_quota_of_its_mount(tmp_path: Path) -> None:
+    # The cgroup path is the one of the host, below the mount of the container there is only its own cgroup
+    root, cgroup_file = cgroup_tree(tmp_path, "0::/kubepods/pod1/build\n", {"cpu.max": "200000 100000\n"})
+    assert cgroup_cpu_limit(root, cgroup_file) == 2.0
+
+
+def test_without_cgroups_there_is_no_limit(tmp_path: Path) -> None:
+    assert cgroup_cpu_limit(tmp_path, tmp_path / "missing") is None
+
+
+@pytest.mark.parametrize("limit, expected", [(0.5, 1), (1.5, 2), (None, 64)])
+def test_available_cpus_round_the_quota_up(
+    monkeypatch: pytest.MonkeyPatch, limit: Optional[float], expected: int
+) -> None:
+    monkeypatch.setattr(cpus.os, "sched_getaffinity", lambda pid: set(range(64)), raising=False)
+    monkeypatch.setattr(cpus, "cgroup_cpu_limit", lambda: limit)
+    assert available_cpus() == expected
+
+
+@pytest.mark.parametrize(
+    "jobs, archive_jobs, expected",
+    [
+        # A single CPU compresses inline instead of oversubscribing it
+        (1, None, (1, 0)),
+        (1, 2, (1, 0)),
+        (2, None, (1, 1)),
+        (4, None, (3, 1)),
+        (8, None, (6, 2)),
+        (16, None, (12, 4)),
+        (8, 0, (8, 0)),
+        (8, 3, (5, 3)),
+        (8, 20, (1, 7)),
+    ],
+)
+def test_the_budget_is_never_oversubscribed(jobs: int, archive_jobs: Optional[int], expected: Tuple[int, int]) -> None:
+    assert split_budget(jobs, archive_jobs) == expected
+    assert sum(expected) == jobs
@@ -0,0 +1,113 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from pathlib import Path
+
+import pytest
+from cursorgen.parser import open_blob
+
+from CursorConverter.converter import DEFAULT_SIZES
+from CursorConverter.framestore import (
+    INDEX_NAME,
+    INDEX_RECORD,
+    DuplicateReport,
+    FrameStore,
+    frame_digest,
+    frame_store_available,
+    frame_usages,
+    sized_digest,
+)
+from CursorConverter.xcursor import assemble, encode, to_xcursor
+
+CIRNO_DIR = Path(__file__).parent.parent / "CursorConverter" / "Assets" / "win" / "東方マウスカーソル　1～10" / "チルノ"
+
+pytestmark = pytest.mark.skipif(not frame_store_available(), reason="no fcntl")
+
+
+def digest(name: str, size: int = 32) -> bytes:
+    return sized_digest(frame_digest(1, 1, name.encode()), size)
+
+
+def test_frames_stored_by_one_process_are_found_by_another(tmp_path: Path) -> None:
+    writer, reader = FrameStore(tmp_path), FrameStore(tmp_path)
+    assert reader.get(digest("red")) is None
+
+    writer.put(digest("red"), b"\x00\x00\xff\xff" * 4)
+    # Stored twice, kept once
+    reader.put(digest("red"), b"\x00\x00\xff\xff" * 4)
+    assert bytes(reader.get(digest("red")) or b"") == b"\x00\x00\xff\xff" * 4
+    assert bytes(FrameStore(tmp_path).get(digest("red")) or b"") == b"\x00\x00\xff\xff" * 4
+    assert (tmp_path / INDEX_NAME).stat().st_size == INDEX_RECORD.size
+    assert reader.take_stats() == (2, 1, 16)
+    assert reader.take_stats() == (0, 0, 0)
+    writer.close()
+    reader.close()
+
+
+def test_a_reader_maps_the_data_again_when_it_grew(tmp_path: Path) -> None:
+    writer, reader = FrameStore(tmp_path), FrameStore(tmp_path)
+    writer.put(digest("small"), b"s" * 16)
+    small = reader.get(digest("small"))
+    assert small is not None
+
+    big = os.urandom(4 * 1024 * 1024)
+    writer.put(digest("big"), big)
+    assert bytes(reader.get(digest("big")) or b"") == big
+    # Views of the old mapping stay valid
+    assert bytes(small) == b"s" * 16
+    writer.close()
+    reader.close()
+
+
+def test_a_record_cut_off_by_a_killed_writer_is_ignored(tmp_path: Path) -> None:
+    store = FrameStore(tmp_path)
+    store.put(digest("red"), b"r" * 16)
+    with open(tmp_path / INDEX_NAME, "ab") as index:
+        index.write(INDEX_RECORD.pack(digest("blue"), 0, 16)[:10])
+
+    reader = FrameStore(tmp_path)
+    assert reader.get(digest("blue")) is None
+    assert bytes(reader.get(digest("red")) or b"") == b"r" * 16
+    # The next writer drops the partial record before appending its own
+    reader.put(digest("blue"), b"b" * 16)
+    assert (tmp_path / INDEX_NAME).stat().st_size == 2 * INDEX_RECORD.size
+    assert bytes(FrameStore(tmp_path).get(digest("blue")) or b"") == b"b" * 16
+    store.close()
+    reader.close()
+
+
+@pytest.mark.parametrize("path", sorted(CIRNO_DIR.glob("*.ani"))[:3], ids=lambda path: path.stem)
+def test_reused_frames_encode_like_fresh_ones(tmp_path: Path, path: Path) -> None:
+    frames = open_blob(path.read_bytes()).frames
+    expected = to_xcursor(frames, DEFAULT_SIZES)
+
+    first = FrameStore(tmp_path)
+    assert assemble(encode(frames, DEFAULT_SIZES, first), DEFAULT_SIZES) == expected
+    assert first.take_stats()[1] == 0
+    # Another worker takes every frame from the store
+    second = FrameStore(tmp_path)
+    assert assemble(encode(frames, DEFAULT_SIZES, second), DEFAULT_SIZES) == expected
+    lookups, hits, _ = second.take_stats()
+    assert lookups == hits > 0
+    first.close()
+    second.close()
+
+
+def test_the_duplicate_report_counts_frames_shared_by_files_and_themes() -> None:
+    red, blue, green = (1, 1, b"\xff\x00\x00\xff"), (1, 1, b"\x00\x00\xff\xff"), (1, 1, b"\x00\xff\x00\xff")
+    report = DuplicateReport(
+        {
+            Path("cirno/default.ani"): frame_usages([[red], [blue], [red]]),
+            Path("cirno/help.ani"): frame_usages([[red]]),
+            Path("reimu/default.ani"): frame_usages([[blue], [green]]),
+        },
+        (Path("reimu/broken.ani"),),
+    )
+    assert report.describe() == [
+        "3 files show 6 frames, 3 of them distinct, 1 files could not be decoded",
+        "2 frames appear in more than one file, 1 in more than one theme",
+        "0.0 MiB of RGBA frames, 0.0 MiB distinct (50% duplicate art)",
+        "Themes sharing the most frames:",
+        "  1 frames: cirno, reimu",
+    ]
@@ -0,0 +1,80 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import zipfile
+from io import BytesIO
+from pathlib import Path
+from typing import Dict, List, Tuple
+
+import pytest
+from cursorgen.parser import open_blob
+from PIL import Image
+
+from CursorConverter.converter import BuildPlan, convert_theme, prepare_theme
+from CursorConverter.hyprcursor import HYPRCURSORS_DIR, META_NAME, shape_path
+
+CIRNO_DIR = Path(__file__).parent.parent / "CursorConverter" / "Assets" / "win" / "東方マウスカーソル　1～10" / "チルノ"
+
+
+def read_hl(text: str) -> List[Tuple[str, str]]:
+    """The ``key = value`` lines of a hyprlang file, in order."""
+    entries = []
+    for line in text.splitlines():
+        key, value = line.split("=", 1)
+        entries.append((key.strip(), value.strip()))
+    return entries
+
+
+@pytest.fixture(scope="module")
+def theme(tmp_path_factory: pytest.TempPathFactory) -> Tuple[BuildPlan, Path]:
+    output = tmp_path_factory.mktemp("hyprcursor")
+    theme_dir = convert_theme(CIRNO_DIR, output, "Cirno", "Cirno cursors", jobs=1, backend="hyprcursor")
+    return prepare_theme(CIRNO_DIR), theme_dir
+
+
+def test_the_manifest_names_the_theme_and_its_shapes(theme: Tuple[BuildPlan, Path]) -> None:
+    plan, theme_dir = theme
+    manifest = dict(read_hl((theme_dir / "manifest.hl").read_text(encoding="utf-8")))
+    assert manifest == {
+        "name": "Cirno",
+        "description": "Cirno cursors",
+        "version": "1.0",
+        "cursors_directory": HYPRCURSORS_DIR,
+    }
+    shapes = {os.path.basename(plan.mapping[role][0]) + ".hlc" for role in plan.roles}
+    assert set(os.listdir(theme_dir / HYPRCURSORS_DIR)) == shapes
+    # A hyprcursor theme has no xcursor files
+    assert not (theme_dir / "cursors").exists()
+
+
+def test_every_shape_holds_the_frames_of_its_source(theme: Tuple[BuildPlan, Path]) -> None:
+    plan, theme_dir = theme
+    assert plan.roles
+    for role in plan.roles:
+        shape, *aliases = [os.path.basename(name) for name in plan.mapping[role]]
+        frames = open_blob(plan.sources[role].read_bytes()).frames
+        with zipfile.ZipFile(theme_dir / shape_path(shape)) as zipf:
+            meta = read_hl(zipf.read(META_NAME).decode())
+            pngs: Dict[str, Image.Image] = {
+                name: Image.open(BytesIO(zipf.read(name))) for name in zipf.namelist() if name.endswith(".png")
+            }
+        values = dict(meta)
+
+        first = frames[0][0]
+        side = max(first.image.size)
+        assert values["resize_algorithm"] == "nearest"
+        assert float(values["hotspot_x"]) == pytest.approx(first.hotspot[0] / side, rel=1e-5)
+        assert float(values["hotspot_y"]) == pytest.approx(first.hotspot[1] / side, rel=1e-5)
+        assert [value for key, value in meta if key == "define_override"] == aliases
+
+        # One size per image of every frame, in order, with the delay of its frame in an animation
+        sizes = [[part.strip() for part in value.split(",")] for key, value in meta if key == "define_size"]
+        expected = [(max(cursor.image.size), int(frame.delay * 1000)) for frame in frames for cursor in frame]
+        assert len(sizes) == len(expected), role
+        for (size, name, *delay), (expected_size, expected_delay) in zip(sizes, expected):
+            assert int(size) == expected_size
+            assert pngs[name].size == (expected_size, expected_size)
+            assert delay == ([str(expected_delay)] if len(frames) > 1 else [])
+        # Repeated images are stored once
+        assert set(pngs) == {name for _, name, *_ in sizes}
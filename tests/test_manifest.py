@@ -0,0 +1,87 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+import stat
+from pathlib import Path
+from typing import Any, Dict
+
+import pytest
+
+from CursorConverter.manifest import BuildManifest
+from process_cursors import AppConfig, CharacterData, character_fingerprint
+
+CIRNO = CharacterData("Cirno", "Cirno", "東方マウスカーソル　1～10/チルノ")
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> AppConfig:
+    return AppConfig(repo_root=tmp_path, cursor_converter_dir=tmp_path, dist_dir=tmp_path / "dist", num_jobs=1)
+
+
+@pytest.fixture
+def input_dir(tmp_path: Path) -> Path:
+    directory = tmp_path / "チルノ"
+    directory.mkdir()
+    (directory / "通常の選択.ani").write_bytes(b"normal")
+    (directory / "テキスト選択.ani").write_bytes(b"text")
+    return directory
+
+
+def fingerprint(
+    config: AppConfig, input_dir: Path, character: CharacterData = CIRNO, jp_name: str = "チルノ"
+) -> Dict[str, Any]:
+    return character_fingerprint(config, jp_name, character, character.short_character_name, input_dir, "ani")
+
+
+def test_an_unchanged_character_is_up_to_date(config: AppConfig, input_dir: Path) -> None:
+    config.dist_dir.mkdir()
+    archive = config.dist_dir / "Cirno.zip"
+    archive.write_bytes(b"archive")
+    manifest = BuildManifest(config.dist_dir / "manifest.json")
+    manifest.record("Cirno", fingerprint(config, input_dir), archive)
+    manifest.save()
+
+    assert BuildManifest.load(manifest.path).is_up_to_date("Cirno", fingerprint(config, input_dir))
+    archive.write_bytes(b"edited")
+    assert not manifest.is_up_to_date("Cirno", fingerprint(config, input_dir))
+
+
+@pytest.mark.parametrize(
+    "character, jp_name",
+    [
+        (CIRNO._replace(en_name="Cirno the Ice Fairy"), "チルノ"),
+        (CIRNO._replace(short_character_name="Cirno9"), "チルノ"),
+        (CIRNO._replace(path="東方マウスカーソル　11～20/チルノ"), "チルノ"),
+        (CIRNO, "ちるの"),
+    ],
+)
+def test_the_cursor_data_entry_is_part_of_the_fingerprint(
+    config: AppConfig, input_dir: Path, character: CharacterData, jp_name: str
+) -> None:
+    assert fingerprint(config, input_dir, character, jp_name) != fingerprint(config, input_dir)
+
+
+def test_the_comment_written_by_the_backend_is_part_of_the_fingerprint(config: AppConfig, input_dir: Path) -> None:
+    xcursor = fingerprint(config, input_dir)
+    config.backend = "hyprcursor"
+    hyprcursor = fingerprint(config, input_dir)
+    assert xcursor["metadata"].keys() == {"index.theme"}
+    assert hyprcursor["metadata"].keys() == {"manifest.hl"}
+
+
+def test_an_edited_cursor_changes_the_fingerprint(config: AppConfig, input_dir: Path) -> None:
+    before = fingerprint(config, input_dir)
+    (input_dir / "通常の選択.ani").write_bytes(b"edited")
+    assert fingerprint(config, input_dir) != before
+
+
+def test_a_saved_manifest_is_readable_by_everyone(config: AppConfig) -> None:
+    config.dist_dir.mkdir()
+    manifest = BuildManifest(config.dist_dir / "manifest.json")
+    manifest.save()
+    manifest.save()
+
+    assert os.listdir(config.dist_dir) == ["manifest.json"]
+    assert stat.S_IMODE(manifest.path.stat().st_mode) == 0o644
+    assert BuildManifest.load(manifest.path).themes == {}
@@ -0,0 +1,73 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import os
+from pathlib import Path
+from typing import Dict, List, Optional
+
+import pytest
+
+from CursorConverter.converter import DEFINITIONS_JP_JSON, load_rename_map
+from CursorConverter.matcher import NameMatch, NameMatcher
+
+RENAME_MAP: Dict[str, List[str]] = {
+    "text": ["テキスト選択", "テキストの選択"],
+    "help": ["ヘルプ", "テキストの選択", "テキスト"],
+    "busy": ["作業中"],
+    "background": ["バックグラウンド作業中"],
+    "up": ["上下"],
+    "down": ["下向"],
+}
+
+
+def scan(matcher: NameMatcher, name: str) -> Optional[NameMatch]:
+    """The longest-first substring scan the index replaces."""
+    for pattern in matcher.patterns:
+        if pattern not in name:
+            continue
+        ties = [
+            other
+            for other, candidate in enumerate(matcher.patterns)
+            if len(candidate) == len(pattern) and candidate in name
+        ]
+        roles: List[int] = []
+        for other in ties:
+            roles.extend(role for role in matcher.pattern_roles[other] if role not in roles)
+        role, *others = sorted(roles)
+        return NameMatch(matcher.roles[role], pattern, tuple(matcher.roles[other] for other in others))
+    return None
+
+
+@pytest.mark.parametrize(
+    "name, expected",
+    [
+        ("テキスト", NameMatch("help", "テキスト")),
+        ("01_テキスト選択", NameMatch("text", "テキスト選択")),
+        ("バックグラウンド作業中", NameMatch("background", "バックグラウンド作業中")),
+        ("通常の作業中", NameMatch("busy", "作業中")),
+        # Overlapping names of the same length, both roles are reported
+        ("上下向", NameMatch("up", "上下", ("down",))),
+        # A name listed under two roles resolves to the first of them
+        ("テキストの選択", NameMatch("text", "テキストの選択", ("help",))),
+        ("通常の選択", None),
+    ],
+)
+def test_the_longest_name_wins(name: str, expected: Optional[NameMatch]) -> None:
+    assert NameMatcher.compile(RENAME_MAP).match(name) == expected
+
+
+def test_names_shared_by_roles_are_reported() -> None:
+    assert NameMatcher.compile(RENAME_MAP).ambiguous_patterns() == {"テキストの選択": ["text", "help"]}
+
+
+def test_an_empty_map_matches_nothing() -> None:
+    assert NameMatcher.compile({}).match("テキスト") is None
+
+
+def test_every_asset_resolves_like_a_substring_scan() -> None:
+    matcher = NameMatcher.compile(load_rename_map(DEFINITIONS_JP_JSON))
+    assets = Path(__file__).parent.parent / "CursorConverter" / "Assets"
+    names = {os.path.splitext(path.name)[0] for path in assets.rglob("*") if path.is_file()}
+    assert names
+    for name in sorted(names):
+        assert matcher.match(name) == scan(matcher, name), name
@@ -0,0 +1,35 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+
+import pytest
+
+from process_cursors import (
+    AppConfig,
+    assign_theme_names,
+    catalog_theme_names,
+    extract_cursor_sets,
+    load_cursor_data,
+    plan_cursor_data,
+)
+
+REPO_ROOT = Path(__file__).parent.parent
+CURSOR_DATA = load_cursor_data(REPO_ROOT / "CursorConverter" / "config" / "cursor_data.json")
+
+
+@pytest.mark.parametrize("set_name", ["艦これ　修正", "アイドルマスター"])
+def test_a_filtered_build_names_themes_like_a_full_one(set_name: str) -> None:
+    full = assign_theme_names(extract_cursor_sets(CURSOR_DATA))
+    names = catalog_theme_names(CURSOR_DATA)
+    for cursor_set in extract_cursor_sets(CURSOR_DATA, [set_name]):
+        for character_jp in cursor_set.characters:
+            assert names[(cursor_set.name, character_jp)] == full[(cursor_set.name, character_jp)]
+
+
+def test_a_filtered_build_does_not_take_the_archive_of_another_character(tmp_path: Path) -> None:
+    config = AppConfig(
+        repo_root=REPO_ROOT, cursor_converter_dir=REPO_ROOT / "CursorConverter", dist_dir=tmp_path, num_jobs=1
+    )
+    assert list(plan_cursor_data(config, ["艦これ　修正"], ["響"])) == ["Hibiki 3"]
+    assert list(plan_cursor_data(config, ["アイドルマスター"], ["我那覇響"])) == ["Hibiki"]
@@ -0,0 +1,147 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import json
+import os
+import signal
+from functools import partial
+from pathlib import Path
+from typing import List
+
+import pytest
+
+import process_cursors
+from CursorConverter.converter import (
+    ConversionTask,
+    RecyclingPool,
+    TaskResult,
+    create_pool,
+    process,
+)
+from CursorConverter.manifest import BuildJournal
+from process_cursors import (
+    AppConfig,
+    CursorSet,
+    build_settings,
+    extract_cursor_sets,
+    load_cursor_data,
+)
+
+REPO_ROOT = Path(__file__).parent.parent
+CURSOR_CONVERTER_DIR = REPO_ROOT / "CursorConverter"
+
+
+def cursor_sets(*characters: str) -> List[CursorSet]:
+    return extract_cursor_sets(
+        load_cursor_data(CURSOR_CONVERTER_DIR / "config" / "cursor_data.json"), None, list(characters)
+    )
+
+
+@pytest.fixture
+def config(tmp_path: Path) -> AppConfig:
+    return AppConfig(
+        repo_root=REPO_ROOT,
+        cursor_converter_dir=CURSOR_CONVERTER_DIR,
+        dist_dir=tmp_path,
+        num_jobs=1,
+        sizes=[32],
+        task_timeout=1.0,
+    )
+
+
+def recycling_pool(config: AppConfig) -> RecyclingPool:
+    return RecyclingPool(partial(create_pool, config.num_jobs, config.sizes, task_timeout=config.task_timeout))
+
+
+def lose_cirno(task: ConversionTask) -> TaskResult:
+    """Kill the worker on every file of Cirno, the pool never hears of those tasks again."""
+    if "チルノ" in task[0]:
+        os.kill(os.getpid(), signal.SIGKILL)
+    return process(task)
+
+
+def test_a_lost_task_fails_its_character_and_the_workers_are_recycled(
+    config: AppConfig, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    monkeypatch.setattr(process_cursors, "process", lose_cirno)
+    monkeypatch.setattr(process_cursors, "WATCHDOG_GRACE", 0.5)
+    with recycling_pool(config) as pool:
+        stats = process_cursors.schedule_characters(config, cursor_sets("Cirno", "Kaban"), pool)
+
+    assert stats["東方マウスカーソル　1～10"][:2] == (0, 1)
+    assert stats["かばんちゃん"][:2] == (1, 0)
+    assert not (config.dist_dir / "Cirno.zip").exists()
+    assert (config.dist_dir / "Kaban.zip").is_file()
+
+
+def test_archives_are_compressed_inline_without_compression_threads(config: AppConfig) -> None:
+    config.archive_jobs = 0
+    with recycling_pool(config) as pool:
+        stats = process_cursors.schedule_characters(config, cursor_sets("Kaban"), pool)
+
+    assert stats["かばんちゃん"][:2] == (1, 0)
+    assert (config.dist_dir / "Kaban.zip").is_file()
+
+
+def test_a_resumed_build_skips_the_themes_the_journal_finished(config: AppConfig) -> None:
+    path = config.dist_dir / "journal.jsonl"
+    with recycling_pool(config) as pool:
+        journal = BuildJournal.open(path, build_settings(config))
+        process_cursors.schedule_characters(config, cursor_sets("Kaban"), pool, journal=journal)
+        journal.close()
+
+        journal = BuildJournal.open(path, build_settings(config), resume=True)
+        stats = process_cursors.schedule_characters(config, cursor_sets("Kaban"), pool, journal=journal)
+        journal.close()
+    assert stats["かばんちゃん"][:3] == (0, 0, 1)
+
+    # An archive changed since the journal recorded it is built again
+    (config.dist_dir / "Kaban.zip").write_bytes(b"edited")
+    journal = BuildJournal.open(path, build_settings(config), resume=True)
+    assert not journal.is_finished("Kaban", config.dist_dir / "Kaban.zip")
+    journal.close()
+
+
+def test_a_journal_cut_off_in_the_middle_of_a_line_is_resumed_up_to_it(tmp_path: Path) -> None:
+    path = tmp_path / "journal.jsonl"
+    journal = BuildJournal.open(path, {"sizes": [32]})
+    journal.record_task("Cirno", "default")
+    journal.record_task("Cirno", "text")
+    journal.close()
+    path.write_text(path.read_text(encoding="utf-8") + '{"task": ["Cirno", "he', encoding="utf-8")
+
+    journal = BuildJournal.open(path, {"sizes": [32]}, resume=True)
+    assert journal.tasks == {("Cirno", "default"), ("Cirno", "text")}
+    journal.record_task("Cirno", "help")
+    journal.close()
+    # The cut off line is dropped, so the entries written after it can be read again
+    lines = path.read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line) for line in lines[1:]] == [
+        {"task": ["Cirno", "default"]},
+        {"task": ["Cirno", "text"]},
+        {"task": ["Cirno", "help"]},
+    ]
+
+
+def test_a_journal_of_other_settings_is_started_over(tmp_path: Path) -> None:
+    path = tmp_path / "journal.jsonl"
+    journal = BuildJournal.open(path, {"sizes": [32]})
+    journal.record_task("Cirno", "default")
+    journal.close()
+
+    journal = BuildJournal.open(path, {"sizes": [32, 48]}, resume=True)
+    journal.close()
+    assert not journal.tasks
+    assert len(path.read_text(encoding="utf-8").splitlines()) == 1
+
+
+def test_a_resumed_build_needs_the_conversion_cache(
+    monkeypatch: pytest.MonkeyPatch, capsys: pytest.CaptureFixture[str]
+) -> None:
+    monkeypatch.setattr("sys.argv", ["process_cursors.py", "--resume", "--no-cache"])
+    with pytest.raises(SystemExit):
+        process_cursors.parse_arguments()
+    assert "--no-cache" in capsys.readouterr().err
+
+    monkeypatch.setattr("sys.argv", ["process_cursors.py", "--resume"])
+    assert process_cursors.parse_arguments().resume
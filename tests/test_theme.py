@@ -0,0 +1,90 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+import stat
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+
+from CursorConverter.manifest import write_atomic
+from CursorConverter.theme import (
+    ARCHIVE_FORMATS,
+    BackgroundThemeWriter,
+    InlineExecutor,
+    ThemeWriter,
+    open_archive_writer,
+    zstd_available,
+)
+
+# (arcnames, content) of a theme, the first arcname is the file and the others its aliases
+THEME: List[Tuple[List[str], bytes]] = [
+    (["cursors/left_ptr", "cursors/default", "cursors/top_left_arrow"], b"left_ptr" * 100),
+    (["cursors/watch", "cursors/wait"], b"watch" * 100),
+    (["cursors/xterm"], b"xterm" * 100),
+]
+
+
+def build(path: Path, archive_format: str, order: List[int], link_mode: str = "symlink") -> bytes:
+    writer = open_archive_writer(path, archive_format)
+    writer.add_file("index.theme", b'[Icon Theme]\nName="Test"\n')
+    for index in order:
+        arcnames, data = THEME[index]
+        writer.add_xcursor(arcnames, data, link_mode)
+    writer.close()
+    return path.with_name(path.name + ARCHIVE_FORMATS[archive_format]).read_bytes()
+
+
+@pytest.mark.parametrize("archive_format", list(ARCHIVE_FORMATS))
+@pytest.mark.parametrize("link_mode", ["symlink", "hardlink", "copy"])
+def test_archive_bytes_do_not_depend_on_the_order_of_the_cursors(
+    tmp_path: Path, archive_format: str, link_mode: str
+) -> None:
+    if archive_format == "tar.zst" and not zstd_available():
+        pytest.skip("no zstd module")
+    first = build(tmp_path / "first", archive_format, [0, 1, 2], link_mode)
+    second = build(tmp_path / "second", archive_format, [2, 0, 1], link_mode)
+    assert first == second
+
+
+def test_archive_bytes_follow_source_date_epoch(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    default = build(tmp_path / "default", "zip", [0, 1, 2])
+    monkeypatch.setenv("SOURCE_DATE_EPOCH", "1700000000")
+    assert build(tmp_path / "epoch", "zip", [0, 1, 2]) != default
+    assert build(tmp_path / "again", "zip", [0, 1, 2]) == build(tmp_path / "epoch", "zip", [0, 1, 2])
+
+
+def test_failed_archive_leaves_nothing_behind(tmp_path: Path) -> None:
+    writer = open_archive_writer(tmp_path / "theme", "zip")
+    writer.add_file("index.theme", b"")
+    writer.abort()
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_write_atomic_replaces_the_file_with_public_permissions(tmp_path: Path) -> None:
+    path = tmp_path / "SHA256SUMS"
+    path.write_bytes(b"old")
+    write_atomic(path, b"new")
+    assert path.read_bytes() == b"new"
+    assert stat.S_IMODE(path.stat().st_mode) == 0o644
+    assert [entry.name for entry in tmp_path.iterdir()] == ["SHA256SUMS"]
+
+
+def test_a_theme_writer_has_to_write_files_and_symlinks() -> None:
+    class FilesOnly(ThemeWriter):
+        def add_file(self, arcname: str, data: bytes) -> None:
+            pass
+
+    with pytest.raises(TypeError):
+        FilesOnly()  # type: ignore[abstract]
+
+
+def test_an_inline_background_writer_writes_the_same_archive(tmp_path: Path) -> None:
+    writer = BackgroundThemeWriter(open_archive_writer(tmp_path / "inline", "zip"), InlineExecutor())
+    writer.add_file("index.theme", b'[Icon Theme]\nName="Test"\n')
+    for arcnames, data in THEME:
+        writer.add_xcursor(arcnames, data, "symlink")
+    writer.close()
+
+    assert writer.finished.done() and writer.finished.exception() is None
+    assert (tmp_path / "inline.zip").read_bytes() == build(tmp_path / "direct", "zip", [0, 1, 2])
@@ -0,0 +1,63 @@
+#!/usr/bin/env python
+# -*- coding: utf-8 -*-
+
+from pathlib import Path
+from typing import List, Tuple
+
+import pytest
+from cursorgen.parser import XCursorParser, open_blob
+from cursorgen.utils.cursor import CursorFrame, CursorImage
+from cursorgen.writer import to_x11
+from PIL import Image
+
+from CursorConverter.converter import DEFAULT_SIZES
+from CursorConverter.xcursor import to_xcursor
+
+CIRNO_DIR = Path(__file__).parent.parent / "CursorConverter" / "Assets" / "win" / "東方マウスカーソル　1～10" / "チルノ"
+
+
+def toc(blob: bytes) -> List[Tuple[int, int, int]]:
+    """The (type, subtype, position) entries of an xcursor file."""
+    count = XCursorParser.FILE_HEADER.unpack_from(blob)[3]
+    return [
+        XCursorParser.TOC_CHUNK.unpack_from(blob, XCursorParser.FILE_HEADER.size + index * XCursorParser.TOC_CHUNK.size)
+        for index in range(count)
+    ]
+
+
+def images(blob: bytes) -> List[Tuple[float, List[Tuple[int, Tuple[int, int], bytes]]]]:
+    """Delay and (size, hotspot, pixels) of every image of every frame of an xcursor file."""
+    return [
+        (frame.delay, [(cursor.nominal, cursor.hotspot, cursor.image.tobytes()) for cursor in frame])
+        for frame in XCursorParser(blob).frames
+    ]
+
+
+def frame(color: Tuple[int, int, int, int], delay: float = 0.05) -> CursorFrame:
+    return CursorFrame([CursorImage(Image.new("RGBA", (32, 32), color), (3, 5), 32)], delay)
+
+
+@pytest.mark.parametrize("path", sorted(CIRNO_DIR.glob("*.ani"))[:4], ids=lambda path: path.stem)
+def test_the_images_are_the_ones_of_to_x11(path: Path) -> None:
+    frames = open_blob(path.read_bytes()).frames
+    ours, reference = to_xcursor(frames, DEFAULT_SIZES), to_x11(frames, DEFAULT_SIZES)
+    assert [entry[:2] for entry in toc(ours)] == [entry[:2] for entry in toc(reference)]
+    assert images(ours) == images(reference)
+
+
+def test_repeated_chunks_are_stored_once() -> None:
+    red, blue = frame((255, 0, 0, 255)), frame((0, 0, 255, 255))
+    # An animation that loops back to its first frames
+    frames = [red, blue, red, blue, red]
+    ours, reference = to_xcursor(frames, [32, 48]), to_x11(frames, [32, 48])
+
+    assert images(ours) == images(reference)
+    entries = toc(ours)
+    positions = [position for _, _, position in entries]
+    # Two images in two sizes, the later frames point at the chunks of the first two
+    assert len(entries) == 10
+    assert positions[4:] == positions[:4] + positions[:2]
+    assert len(set(positions)) == 4
+    chunks = XCursorParser.IMAGE_HEADER.size * 4 + 4 * (32 * 32 + 48 * 48) * 2
+    assert len(ours) == XCursorParser.FILE_HEADER.size + len(entries) * XCursorParser.TOC_CHUNK.size + chunks
+    assert len(ours) < len(reference)